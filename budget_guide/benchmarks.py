@@ -0,0 +1,216 @@
+import math
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import BudgetBenchmark, BudgetSession
+from .services import BREAKDOWN_FIELDS
+
+
+# "Travellers on <style> spend X on <category>": per (style, category) running
+# count/sum plus a quantile sketch, updated when a plan is finalized. Readers
+# only ever see the cached summary; nothing scans sessions per request.
+
+BENCHMARK_CATEGORIES = BREAKDOWN_FIELDS + ("total",)
+BENCHMARK_PERCENTILES = (25, 50, 75, 90)
+MIN_BENCHMARK_SAMPLES = 5  # below this, only the count is shown
+
+BENCHMARKS_CACHE_KEY = "budget:benchmarks"
+BENCHMARKS_CACHE_TIMEOUT = 60 * 60
+
+
+class QuantileSketch:
+    """
+    Log-bucketed quantile sketch (DDSketch style): every quantile is within
+    RELATIVE_ACCURACY of the true value, the size grows with log(max/min)
+    rather than the number of values, and values can be removed again.
+    """
+    RELATIVE_ACCURACY = 0.02
+    GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+    LOG_GAMMA = math.log(GAMMA)
+
+    def __init__(self, data=None):
+        data = data or {}
+        self.zero = data.get("zero", 0)
+        self.bins = {int(k): n for k, n in data.get("bins", {}).items()}
+
+    def _key(self, value):
+        return math.ceil(math.log(value) / self.LOG_GAMMA)
+
+    def add(self, value, n=1):
+        value = float(value)
+        if value <= 0:
+            self.zero += n
+            return
+        key = self._key(value)
+        self.bins[key] = self.bins.get(key, 0) + n
+        if self.bins[key] <= 0:
+            del self.bins[key]
+
+    def remove(self, value):
+        self.add(value, -1)
+        self.zero = max(self.zero, 0)
+
+    @property
+    def count(self):
+        return self.zero + sum(self.bins.values())
+
+    def quantile(self, q):
+        count = self.count
+        if not count:
+            return None
+        rank = q * (count - 1)
+        seen = self.zero
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                # midpoint of the bucket (gamma^(k-1), gamma^k] in relative terms
+                return 2 * self.GAMMA ** key / (self.GAMMA + 1)
+        return 2 * self.GAMMA ** max(self.bins) / (self.GAMMA + 1)
+
+    def to_dict(self):
+        return {"zero": self.zero, "bins": {str(k): n for k, n in self.bins.items()}}
+
+
+def _amounts(breakdown):
+    amounts = {f: getattr(breakdown, f) for f in BREAKDOWN_FIELDS}
+    amounts["total"] = breakdown.total()
+    return amounts
+
+
+def _apply(row, amount, sign):
+    sketch = QuantileSketch(row.sketch)
+    if sign > 0:
+        sketch.add(amount)
+        row.count += 1
+        row.total += amount
+    else:
+        sketch.remove(amount)
+        row.count = max(row.count - 1, 0)
+        row.total -= amount
+    row.sketch = sketch.to_dict()
+
+
+def record_finalized_session(session, breakdown):
+    """
+    Fold a finalized session's breakdown into its style's benchmarks. A
+    session that was already counted has its previous amounts removed first.
+    """
+    new = None
+    if session.style_id:
+        new = {"style_id": session.style_id, "amounts": {k: str(v) for k, v in _amounts(breakdown).items()}}
+
+    with transaction.atomic():
+        # diff against the locked row: two concurrent finalizes of the same
+        # session must not both see the old snapshot and count it twice
+        old = BudgetSession.objects.select_for_update().values_list("benchmarked", flat=True).get(pk=session.pk)
+        session.benchmarked = old
+        if old == new:
+            return
+
+        style_ids = {s["style_id"] for s in (old, new) if s}
+        # make sure the rows exist, then lock them for the read-modify-write
+        if new:
+            BudgetBenchmark.objects.bulk_create(
+                [BudgetBenchmark(style_id=new["style_id"], category=c) for c in BENCHMARK_CATEGORIES],
+                ignore_conflicts=True,
+            )
+        rows = {
+            (row.style_id, row.category): row
+            for row in BudgetBenchmark.objects.select_for_update().filter(style_id__in=style_ids)
+        }
+        for snapshot, sign in ((old, -1), (new, 1)):
+            if not snapshot:
+                continue
+            for category, amount in snapshot["amounts"].items():
+                row = rows.get((snapshot["style_id"], category))
+                if row is not None:  # old style may have been deleted since
+                    _apply(row, Decimal(amount), sign)
+
+        now = timezone.now()
+        for row in rows.values():
+            row.updated_at = now
+        BudgetBenchmark.objects.bulk_update(list(rows.values()), ["count", "total", "sketch", "updated_at"])
+        session.benchmarked = new
+        session.save(update_fields=["benchmarked"])
+        transaction.on_commit(lambda: cache.delete(BENCHMARKS_CACHE_KEY))
+
+
+def rebuild_benchmarks(batch_size=500):
+    """Recompute every benchmark from the finalized sessions. Returns sessions counted."""
+    rows = {}
+    counted = []
+    sessions = (
+        BudgetSession.objects.filter(current_step__gte=BudgetSession.STEP_FINAL, style__isnull=False)
+        .select_related("breakdown")
+    )
+    for session in sessions.iterator(chunk_size=batch_size):
+        breakdown = getattr(session, "breakdown", None)
+        if breakdown is None:
+            continue
+        amounts = _amounts(breakdown)
+        for category, amount in amounts.items():
+            key = (session.style_id, category)
+            if key not in rows:
+                rows[key] = BudgetBenchmark(style_id=session.style_id, category=category, sketch={})
+            _apply(rows[key], amount, 1)
+        session.benchmarked = {"style_id": session.style_id, "amounts": {k: str(v) for k, v in amounts.items()}}
+        counted.append(session)
+
+    with transaction.atomic():
+        BudgetBenchmark.objects.all().delete()
+        BudgetBenchmark.objects.bulk_create(rows.values(), batch_size=batch_size)
+        BudgetSession.objects.filter(benchmarked__isnull=False).update(benchmarked=None)
+        BudgetSession.objects.bulk_update(counted, ["benchmarked"], batch_size=batch_size)
+    cache.delete(BENCHMARKS_CACHE_KEY)
+    return len(counted)
+
+
+# -------------------------
+# Read side
+# -------------------------
+
+def _money(value):
+    return Decimal(str(value)).quantize(Decimal("0.01"))
+
+
+def _category_stats(row):
+    stats = {"count": row.count}
+    if row.count < MIN_BENCHMARK_SAMPLES:
+        return stats
+    sketch = QuantileSketch(row.sketch)
+    stats["mean"] = _money(row.total / row.count)
+    for p in BENCHMARK_PERCENTILES:
+        stats[f"p{p}"] = _money(sketch.quantile(p / 100))
+    return stats
+
+
+def _build_summary():
+    styles = {}
+    rows = (
+        BudgetBenchmark.objects.filter(style__is_active=True)
+        .select_related("style")
+        .order_by("style__sort_order", "style_id")
+    )
+    for row in rows:
+        entry = styles.setdefault(row.style_id, {
+            "id": row.style_id,
+            "key": row.style.key,
+            "title": row.style.title,
+            "categories": {},
+        })
+        entry["categories"][row.category] = _category_stats(row)
+
+    for entry in styles.values():
+        categories = entry["categories"]
+        entry["categories"] = {c: categories[c] for c in BENCHMARK_CATEGORIES if c in categories}
+    return list(styles.values())
+
+
+def benchmark_summary():
+    """Per-style benchmark stats for every active style (cached)."""
+    return cache.get_or_set(BENCHMARKS_CACHE_KEY, _build_summary, BENCHMARKS_CACHE_TIMEOUT)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from budget_guide.benchmarks import rebuild_benchmarks
+
+
+class Command(BaseCommand):
+    help = "Recompute budget benchmark statistics from all finalized sessions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        counted = rebuild_benchmarks(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt benchmarks from {counted} finalized session(s)."))
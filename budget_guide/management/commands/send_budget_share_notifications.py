@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from budget_guide.sharing import send_pending_share_notifications
+
+
+class Command(BaseCommand):
+    help = "Deliver queued budget share notifications to providers (run once, or as a worker with --loop)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--loop", action="store_true", help="Keep polling the outbox.")
+        parser.add_argument("--sleep", type=float, default=5.0, help="Seconds between polls when idle.")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            processed = send_pending_share_notifications(batch_size=options["batch_size"])
+            total += processed
+            if processed:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["sleep"])
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} share notification(s)."))
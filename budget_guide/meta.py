@@ -0,0 +1,66 @@
+from django.db.models import Prefetch
+
+from function.versioning import VersionedMemo
+
+from .models import BudgetStyle, BudgetExperience, BudgetCategoryRule, BudgetResource
+
+
+# Wizard metadata (styles + their category rules, experiences, resources) only
+# changes through admin edits. It's built once per version and kept in the
+# process; budget_guide.signals bumps the version on every save/delete.
+
+META = VersionedMemo("budget:meta_version")
+
+
+def bump_meta_version():
+    META.bump()
+
+
+def _build_meta(version):
+    from .serializers import (
+        BudgetStyleSerializer, BudgetExperienceSerializer, BudgetResourceSerializer, CategoryRuleSerializer
+    )
+    from .services import RULE_BASE_DAYS, DAILY_CATEGORIES
+
+    styles = BudgetStyle.objects.filter(is_active=True).order_by("sort_order").prefetch_related(
+        Prefetch("category_rules", queryset=BudgetCategoryRule.objects.order_by("id"))
+    )
+    experiences = BudgetExperience.objects.filter(is_active=True).order_by("sort_order")
+    resources = BudgetResource.objects.filter(is_active=True).order_by("sort_order")
+
+    return {
+        "version": version,
+        "styles": [
+            {
+                **BudgetStyleSerializer(style).data,
+                "category_rules": CategoryRuleSerializer(style.category_rules.all(), many=True).data,
+            }
+            for style in styles
+        ],
+        "experiences": BudgetExperienceSerializer(experiences, many=True).data,
+        "resources": BudgetResourceSerializer(resources, many=True).data,
+        # category_rules are priced for this many days; the daily categories
+        # scale with the session's length (budget_guide.services)
+        "rule_base_days": RULE_BASE_DAYS,
+        "daily_categories": list(DAILY_CATEGORIES),
+    }
+
+
+def wizard_meta():
+    """Cached wizard metadata for the current version (see BudgetMetaAPIView)."""
+    return META.get("meta", _build_meta)
+
+
+def meta_etag(meta):
+    return f'"{meta["version"]}"'
+
+
+def style_category_rules(style_id):
+    """Serialized category rules (range hints) of a style; active styles come from the cache."""
+    for style in wizard_meta()["styles"]:
+        if style["id"] == style_id:
+            return style["category_rules"]
+
+    from .serializers import CategoryRuleSerializer
+    rules = BudgetCategoryRule.objects.filter(style_id=style_id).order_by("id")
+    return CategoryRuleSerializer(rules, many=True).data
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.10 on 2026-10-19 03:30
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def keep_latest_session_active(apps, schema_editor):
+    # the wizard used the most recently updated session; keep that one active
+    BudgetSession = apps.get_model("budget_guide", "BudgetSession")
+    latest = {}
+    for session_id, user_id in BudgetSession.objects.order_by("updated_at", "id").values_list("id", "user_id"):
+        latest[user_id] = session_id
+    BudgetSession.objects.exclude(id__in=latest.values()).update(is_active=False, archived_at=F("updated_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget_guide', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budgetsession',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='budgetsession',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddIndex(
+            model_name='budgetsession',
+            index=models.Index(fields=['user', 'updated_at'], name='budget_session_user_upd_idx'),
+        ),
+        migrations.RunPython(keep_latest_session_active, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='budgetsession',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('user',), name='budget_one_active_session'),
+        ),
+    ]
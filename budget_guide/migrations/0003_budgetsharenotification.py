@@ -0,0 +1,40 @@
+# Generated by Django 5.2.10 on 2026-10-19 03:31
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget_guide', '0002_budgetsession_active_flag'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetShareNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='budgetshare',
+            index=models.Index(fields=['provider_user_id', 'created_at', 'id'], name='budget_share_provider_idx'),
+        ),
+        migrations.AddField(
+            model_name='budgetsharenotification',
+            name='share',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='budget_guide.budgetshare'),
+        ),
+        migrations.AddIndex(
+            model_name='budgetsharenotification',
+            index=models.Index(fields=['status', 'id'], name='budget_share_outbox_idx'),
+        ),
+    ]
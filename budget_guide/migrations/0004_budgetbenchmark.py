@@ -0,0 +1,34 @@
+# Generated by Django 5.2.10 on 2026-10-19 03:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget_guide', '0003_budgetsharenotification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budgetsession',
+            name='benchmarked',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='BudgetBenchmark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=30)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('sketch', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('style', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='benchmarks', to='budget_guide.budgetstyle')),
+            ],
+            options={
+                'unique_together': {('style', 'category')},
+            },
+        ),
+    ]
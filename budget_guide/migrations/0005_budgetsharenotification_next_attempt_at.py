@@ -0,0 +1,19 @@
+# Generated by Django 5.2.10 on 2026-10-19 03:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget_guide', '0004_budgetbenchmark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budgetsharenotification',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.10 on 2026-10-19 04:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget_guide', '0005_budgetsharenotification_next_attempt_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='budgetsharenotification',
+            name='budget_share_outbox_idx',
+        ),
+        migrations.AddIndex(
+            model_name='budgetsharenotification',
+            index=models.Index(fields=['status', 'next_attempt_at', 'id'], name='budget_share_outbox_idx'),
+        ),
+    ]
@@ -115,9 +115,27 @@ class BudgetSession(models.Model):
     # final totals
     total_estimate = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
+    # the session the wizard works on; at most one per user
+    is_active = models.BooleanField(default=True)
+    archived_at = models.DateTimeField(null=True, blank=True)
+
+    # what this session contributed to BudgetBenchmark at its last finalize
+    # ({"style_id", "amounts"}), so finalizing again replaces it instead of adding
+    benchmarked = models.JSONField(null=True, blank=True, editable=False)
+
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "updated_at"], name="budget_session_user_upd_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user"], condition=models.Q(is_active=True), name="budget_one_active_session",
+            ),
+        ]
+
     def __str__(self):
         return f"BudgetSession {self.id} user={self.user_id}"
 
@@ -149,8 +167,29 @@ class BudgetSessionBreakdown(models.Model):
         )
 
 
+class BudgetBenchmark(models.Model):
+    """
+    Running statistics of finalized plans per style and breakdown category
+    ("total" for the whole plan). Kept up to date by budget_guide.benchmarks.
+    """
+    style = models.ForeignKey(BudgetStyle, on_delete=models.CASCADE, related_name="benchmarks")
+    category = models.CharField(max_length=30)
+
+    count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    sketch = models.JSONField(default=dict)  # QuantileSketch.to_dict()
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("style", "category")
+
+    def __str__(self):
+        return f"{self.style_id} - {self.category} (n={self.count})"
+
+
 class BudgetShare(models.Model):
-    """Share with Provider (store share record; provider notifications can be added later)"""
+    """Share with Provider (listed in the provider's inbox; the provider is notified via BudgetShareNotification)"""
     session = models.ForeignKey(BudgetSession, on_delete=models.CASCADE, related_name="shares")
     shared_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="shared_budgets")
 
@@ -158,3 +197,41 @@ class BudgetShare(models.Model):
     note = models.CharField(max_length=255, blank=True)
 
     created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # provider inbox: newest first, keyset paginated
+            models.Index(fields=["provider_user_id", "created_at", "id"], name="budget_share_provider_idx"),
+        ]
+
+
+class BudgetShareNotification(models.Model):
+    """
+    Outbox for provider notifications: ShareWithProviderAPIView only queues
+    rows, `manage.py send_budget_share_notifications` delivers them in batches.
+    """
+    STATUS_PENDING = "pending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    share = models.ForeignKey(BudgetShare, on_delete=models.CASCADE, related_name="notifications")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)  # pushed back after a failed send
+
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at", "id"], name="budget_share_outbox_idx"),
+        ]
+
+    def __str__(self):
+        return f"Share notification {self.id} ({self.status})"
@@ -65,10 +65,45 @@ class BudgetSessionSerializer(serializers.ModelSerializer):
             "id", "current_step", "style", "style_id",
             "days", "total_estimate",
             "session_experiences", "breakdown",
+            "is_active", "archived_at",
             "created_at", "updated_at",
         ]
 
 
+class BudgetSessionListSerializer(serializers.ModelSerializer):
+    style = BudgetStyleSerializer(read_only=True)
+
+    class Meta:
+        model = BudgetSession
+        fields = [
+            "id", "style", "days", "current_step", "total_estimate",
+            "is_active", "archived_at", "created_at", "updated_at",
+        ]
+
+
+class ProviderShareSerializer(serializers.ModelSerializer):
+    shared_by = serializers.SerializerMethodField()
+    session = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BudgetShare
+        fields = ["id", "note", "created_at", "shared_by", "session"]
+
+    def get_shared_by(self, obj):
+        return {"id": obj.shared_by_id, "full_name": obj.shared_by.full_name, "email": obj.shared_by.email}
+
+    def get_session(self, obj):
+        session = obj.session
+        breakdown = getattr(session, "breakdown", None)
+        return {
+            "id": session.id,
+            "style": BudgetStyleSerializer(session.style).data if session.style else None,
+            "days": session.days,
+            "total_estimate": session.total_estimate,
+            "breakdown": BudgetBreakdownSerializer(breakdown).data if breakdown else None,
+        }
+
+
 class SetStyleSerializer(serializers.Serializer):
     style_key = serializers.CharField()
 
@@ -77,12 +112,13 @@ class SetDurationSerializer(serializers.Serializer):
     days = serializers.IntegerField(min_value=1, max_value=120)
 
 
+class ScenarioExperienceSerializer(serializers.Serializer):
+    experience_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
 class SetExperiencesSerializer(serializers.Serializer):
-    experiences = serializers.ListField(
-        child=serializers.DictField(),
-        allow_empty=True
-    )
-    # expected dict: { "experience_id": 1, "quantity": 2 }
+    experiences = ScenarioExperienceSerializer(many=True, allow_empty=True)
 
 
 class UpdateBreakdownSerializer(serializers.Serializer):
@@ -97,3 +133,12 @@ class UpdateBreakdownSerializer(serializers.Serializer):
 class ShareWithProviderSerializer(serializers.Serializer):
     provider_user_id = serializers.IntegerField(required=False, allow_null=True)
     note = serializers.CharField(required=False, allow_blank=True)
+
+
+class BudgetScenarioSerializer(serializers.Serializer):
+    # omitted -> DEFAULT_SCENARIO_DAYS + the session's days / the session's selections
+    days = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=120),
+        required=False, allow_empty=False, max_length=12,
+    )
+    experiences = ScenarioExperienceSerializer(many=True, required=False)
@@ -1,51 +1,216 @@
-from decimal import Decimal
-from .models import BudgetCategoryRule, BudgetSessionBreakdown, BudgetSessionExperience
+from decimal import Decimal, ROUND_HALF_UP
 
+from django.db import transaction
 
-def compute_experiences_cost(session):
+from .meta import style_category_rules
+from .models import BudgetCategoryRule, BudgetExperience, BudgetSessionBreakdown, BudgetSessionExperience
+
+
+# Category rule defaults are priced for a trip of RULE_BASE_DAYS days; the
+# per-day categories are scaled to the session's length, flights and the
+# selected experiences are not.
+RULE_BASE_DAYS = 7
+DAILY_CATEGORIES = (
+    BudgetCategoryRule.CAT_ACCOM,
+    BudgetCategoryRule.CAT_TRANSPORT,
+    BudgetCategoryRule.CAT_FOOD,
+)
+EMERGENCY_RATE = Decimal("0.10")
+BREAKDOWN_FIELDS = ("flights", "accommodation", "transportation", "food", "experiences", "emergency")
+
+CENT = Decimal("0.01")
+
+
+def _money(value):
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+# -------------------------
+# Pure calculation (no queries)
+# -------------------------
+
+def experiences_cost(selections):
     """
-    Uses selected experiences ranges:
-    - take midpoint of each experience range * quantity
+    selections: iterable of (min_cost, max_cost, quantity).
+    Midpoint of each experience range * quantity.
     """
     total = Decimal("0")
-    for se in BudgetSessionExperience.objects.filter(session=session).select_related("experience"):
-        exp = se.experience
-        mid = (exp.min_cost + exp.max_cost) / 2
-        total += (mid * se.quantity)
+    for min_cost, max_cost, quantity in selections:
+        total += (min_cost + max_cost) / 2 * quantity
     return total
 
 
-def generate_default_breakdown(session):
+def calculate_breakdown(rules, selections, days=RULE_BASE_DAYS):
     """
-    Use style-based default rules, plus computed experiences cost,
-    and emergency buffer = 10% of subtotal by default.
+    rules: {category: default_cost}; selections: see experiences_cost().
+    Returns {field: amount} for every BREAKDOWN_FIELDS entry plus "total".
     """
-    rules = {r.category: r for r in BudgetCategoryRule.objects.filter(style=session.style)}
-    flights = rules.get("flights").default_cost if rules.get("flights") else Decimal("0")
-    accommodation = rules.get("accommodation").default_cost if rules.get("accommodation") else Decimal("0")
-    transportation = rules.get("transportation").default_cost if rules.get("transportation") else Decimal("0")
-    food = rules.get("food").default_cost if rules.get("food") else Decimal("0")
+    scale = Decimal(days) / RULE_BASE_DAYS
 
-    experiences_cost = compute_experiences_cost(session)
-    if rules.get("experiences"):
+    amounts = {}
+    for category in ("flights", "accommodation", "transportation", "food"):
+        cost = rules.get(category, Decimal("0"))
+        amounts[category] = _money(cost * scale if category in DAILY_CATEGORIES else cost)
+
+    selected = experiences_cost(selections)
+    if "experiences" in rules:
         # take max(default, computed) so user selections matter
-        experiences = max(rules["experiences"].default_cost, experiences_cost)
+        amounts["experiences"] = _money(max(rules["experiences"], selected))
+    else:
+        amounts["experiences"] = _money(selected)
+
+    if "emergency" in rules:
+        amounts["emergency"] = _money(rules["emergency"])
     else:
-        experiences = experiences_cost
+        amounts["emergency"] = _money(sum(amounts.values()) * EMERGENCY_RATE)
+
+    amounts["total"] = sum(amounts[f] for f in BREAKDOWN_FIELDS)
+    return amounts
+
+
+def simulate_scenarios(styles, selections, days_values):
+    """
+    What-if comparison: every style x every trip length, from preloaded data.
+    styles: [{"id", "key", "title", "category_rules": [{"category", "min_cost",
+    "max_cost", "default_cost"}]}] (wizard meta shape);
+    selections: [(min_cost, max_cost, quantity)].
+
+    Each style's rules are split once into the three price levels; every
+    (style, days) cell is then just calculate_breakdown() over those dicts.
+    Returns (per-style scenarios, matrix of estimate/low/high totals).
+    """
+    low_selections = [(lo, lo, q) for lo, _, q in selections]
+    high_selections = [(hi, hi, q) for _, hi, q in selections]
+
+    results = []
+    matrix = {"styles": [s["key"] for s in styles], "days": list(days_values), "estimate": [], "low": [], "high": []}
+    for style in styles:
+        levels = {
+            level: {r["category"]: Decimal(str(r[field])) for r in style["category_rules"]}
+            for level, field in (("estimate", "default_cost"), ("low", "min_cost"), ("high", "max_cost"))
+        }
+
+        scenarios = []
+        for days in days_values:
+            estimate = calculate_breakdown(levels["estimate"], selections, days)
+            low = calculate_breakdown(levels["low"], low_selections, days)["total"]
+            high = calculate_breakdown(levels["high"], high_selections, days)["total"]
+            scenarios.append({"days": days, "breakdown": estimate, "low": low, "high": high})
+
+        for key in ("estimate", "low", "high"):
+            matrix[key].append([
+                sc["breakdown"]["total"] if key == "estimate" else sc[key] for sc in scenarios
+            ])
+        results.append({"id": style["id"], "key": style["key"], "title": style["title"], "scenarios": scenarios})
+    return results, matrix
+
+
+# -------------------------
+# Loading / persistence
+# -------------------------
+
+def load_style_rules(style_id):
+    """{category: default_cost} for a style (from the wizard meta cache)."""
+    return {r["category"]: Decimal(str(r["default_cost"])) for r in style_category_rules(style_id)}
 
-    subtotal = flights + accommodation + transportation + food + experiences
-    emergency = rules.get("emergency").default_cost if rules.get("emergency") else (subtotal * Decimal("0.10"))
 
-    breakdown, _ = BudgetSessionBreakdown.objects.get_or_create(session=session)
-    breakdown.flights = flights
-    breakdown.accommodation = accommodation
-    breakdown.transportation = transportation
-    breakdown.food = food
-    breakdown.experiences = experiences
-    breakdown.emergency = emergency
-    breakdown.save()
+def session_category_rules(style_id, days):
+    """
+    A style's category rule hints priced for a `days`-day trip, so the
+    min/max/default shown next to the breakdown match what it was built with.
+    """
+    scale = Decimal(days) / RULE_BASE_DAYS
+    rules = []
+    for rule in style_category_rules(style_id):
+        rule = dict(rule)
+        if rule["category"] in DAILY_CATEGORIES:
+            for field in ("min_cost", "max_cost", "default_cost"):
+                rule[field] = str(_money(Decimal(str(rule[field])) * scale))
+        rules.append(rule)
+    return rules
+
+
+def load_selections(session):
+    return list(
+        BudgetSessionExperience.objects.filter(session=session)
+        .values_list("experience__min_cost", "experience__max_cost", "quantity")
+    )
+
+
+def compute_experiences_cost(session):
+    return experiences_cost(load_selections(session))
+
+
+def save_session_experiences(session, items):
+    """
+    Make the session's selection equal to `items` (validated
+    ScenarioExperienceSerializer data: [{"experience_id", "quantity"}])
+    by diffing against the stored rows: one query validates the ids, one loads
+    the current rows, then only the inserts/updates/deletes are written in bulk.
+    Unknown or inactive experiences are skipped; a repeated id keeps its last
+    quantity. Returns the resulting selections (see experiences_cost()).
+    """
+    wanted = {item["experience_id"]: item["quantity"] for item in items}
+
+    experiences = BudgetExperience.objects.filter(id__in=wanted, is_active=True).in_bulk()
+    wanted = {exp_id: qty for exp_id, qty in wanted.items() if exp_id in experiences}
 
-    session.total_estimate = breakdown.total()
-    session.save(update_fields=["total_estimate"])
+    with transaction.atomic():
+        current = {
+            se.experience_id: se
+            for se in BudgetSessionExperience.objects.select_for_update().filter(session=session)
+        }
 
+        to_create = [
+            BudgetSessionExperience(session=session, experience_id=exp_id, quantity=qty)
+            for exp_id, qty in wanted.items() if exp_id not in current
+        ]
+        to_update = []
+        for exp_id, se in current.items():
+            if exp_id in wanted and se.quantity != wanted[exp_id]:
+                se.quantity = wanted[exp_id]
+                to_update.append(se)
+        to_delete = [se.id for exp_id, se in current.items() if exp_id not in wanted]
+
+        if to_delete:
+            BudgetSessionExperience.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            BudgetSessionExperience.objects.bulk_update(to_update, ["quantity"])
+        if to_create:
+            BudgetSessionExperience.objects.bulk_create(to_create)
+
+    return [
+        (experiences[exp_id].min_cost, experiences[exp_id].max_cost, qty)
+        for exp_id, qty in wanted.items()
+    ]
+
+
+def save_breakdown(session, amounts, current_step=None):
+    """
+    Persist calculated amounts: upsert the breakdown row and write the
+    session total (and step) in one transaction.
+    """
+    values = {f: amounts[f] for f in BREAKDOWN_FIELDS}
+    with transaction.atomic():
+        breakdown, _ = BudgetSessionBreakdown.objects.update_or_create(session=session, defaults=values)
+
+        session.total_estimate = amounts["total"]
+        fields = ["total_estimate", "updated_at"]
+        if current_step is not None:
+            session.current_step = max(session.current_step, current_step)
+            fields.append("current_step")
+        session.save(update_fields=fields)
+
+    session.breakdown = breakdown
     return breakdown
+
+
+def generate_default_breakdown(session, current_step=None):
+    """
+    Use style-based default rules (scaled to session.days), plus computed
+    experiences cost, and emergency buffer = 10% of subtotal by default.
+    """
+    amounts = calculate_breakdown(
+        load_style_rules(session.style_id), load_selections(session), session.days
+    )
+    return save_breakdown(session, amounts, current_step)
@@ -0,0 +1,80 @@
+from email.utils import formataddr
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import transaction
+
+from function.outbox import deliver_outbox
+from function.permissions import provider_users
+
+from .models import BudgetShare, BudgetShareNotification
+
+
+class ShareError(ValueError):
+    pass
+
+
+def share_with_provider(session, shared_by, provider_user_id=None, note=""):
+    """
+    Store the share and queue the provider's notification (delivered by the
+    worker). Raises ShareError if provider_user_id isn't a provider.
+    """
+    if provider_user_id and not provider_users().filter(id=provider_user_id).exists():
+        raise ShareError("provider_user_id is not a provider.")
+
+    with transaction.atomic():
+        share = BudgetShare.objects.create(
+            session=session,
+            shared_by=shared_by,
+            provider_user_id=provider_user_id,
+            note=note,
+        )
+        if provider_user_id:
+            BudgetShareNotification.objects.create(share=share)
+    return share
+
+
+# -------------------------
+# Delivery (outbox worker)
+# -------------------------
+
+def _share_email(share, provider):
+    sender = share.shared_by
+    sender_name = getattr(sender, "full_name", "") or sender.email
+    session = share.session
+    style = session.style.title if session.style else "a trip"
+    body = (
+        f"{sender_name} shared a {session.days}-day budget plan ({style}, "
+        f"estimated {session.total_estimate}) with you on Our Roots.\n\n"
+    )
+    if share.note:
+        body += f"Their note: {share.note}\n\n"
+    body += "Open the app to see the full breakdown."
+    return EmailMessage(
+        subject=f"{sender_name} shared a budget plan with you",
+        body=body,
+        from_email=formataddr(("Our Roots", settings.EMAIL_HOST_USER)),
+        to=[provider.email],
+    )
+
+
+def _share_emails(batch):
+    providers = provider_users().in_bulk({n.share.provider_user_id for n in batch})
+    # a provider that no longer exists (or lost the role) gets no message: the row is failed
+    return {
+        n.id: _share_email(n.share, providers[n.share.provider_user_id])
+        for n in batch if n.share.provider_user_id in providers
+    }
+
+
+def send_pending_share_notifications(batch_size=100, max_attempts=5):
+    """
+    Deliver one batch of due provider notifications (see deliver_outbox()).
+    Returns the number of rows processed (0 = nothing due).
+    """
+    return deliver_outbox(
+        BudgetShareNotification.objects.select_related("share__shared_by", "share__session__style"),
+        _share_emails,
+        batch_size=batch_size,
+        max_attempts=max_attempts,
+    )
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+
+from .meta import bump_meta_version
+from .models import BudgetStyle, BudgetExperience, BudgetCategoryRule, BudgetResource
+
+
+META_MODELS = (BudgetStyle, BudgetExperience, BudgetCategoryRule, BudgetResource)
+
+
+def budget_meta_changed(sender, **kwargs):
+    bump_meta_version()
+
+
+for _model in META_MODELS:
+    post_save.connect(budget_meta_changed, sender=_model, dispatch_uid=f"budget_meta_saved_{_model.__name__}")
+    post_delete.connect(budget_meta_changed, sender=_model, dispatch_uid=f"budget_meta_deleted_{_model.__name__}")
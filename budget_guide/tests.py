@@ -1,3 +1,534 @@
-from django.test import TestCase
+import random
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from cultural_providers.models import CulturalProvider
+from function.permissions import PROVIDER_ROLE, is_provider
+
+from .benchmarks import QuantileSketch, record_finalized_session
+from .models import (
+    BudgetBenchmark, BudgetCategoryRule, BudgetExperience, BudgetResource, BudgetSession, BudgetSessionExperience,
+    BudgetShare, BudgetShareNotification, BudgetStyle
+)
+from .services import (
+    BREAKDOWN_FIELDS, DAILY_CATEGORIES, RULE_BASE_DAYS, calculate_breakdown, experiences_cost,
+    save_session_experiences
+)
+from .sharing import send_pending_share_notifications
+
+
+# default_cost per category for a 7-day trip; min/max are -/+ 20%
+CATALOGUE = {
+    "budget": {"flights": 1000, "accommodation": 700, "transportation": 140, "food": 350},
+    "premium": {"flights": 2000, "accommodation": 2100, "transportation": 700, "food": 1050,
+                "experiences": 300, "emergency": 500},
+}
+
+
+def create_catalogue():
+    """Two styles, two experiences and a resource; returns (styles by key, experiences)."""
+    styles = {}
+    for i, (key, rules) in enumerate(CATALOGUE.items()):
+        style = BudgetStyle.objects.create(key=key, title=key.title(), sort_order=i)
+        BudgetCategoryRule.objects.bulk_create([
+            BudgetCategoryRule(
+                style=style, category=category,
+                min_cost=Decimal(cost) * Decimal("0.8"), max_cost=Decimal(cost) * Decimal("1.2"), default_cost=cost,
+            )
+            for category, cost in rules.items()
+        ])
+        styles[key] = style
+    experiences = [
+        BudgetExperience.objects.create(title="Tour", min_cost=40, max_cost=60, sort_order=1),
+        BudgetExperience.objects.create(title="Workshop", min_cost=100, max_cost=200, sort_order=2),
+    ]
+    BudgetResource.objects.create(title="Packing list")
+    return styles, experiences
+
+
+def api_client(email="a@example.com"):
+    user = get_user_model().objects.create_user(email=email, password="x")
+    client = APIClient()
+    client.force_authenticate(user)
+    return user, client
+
+
+class QuantileSketchTests(SimpleTestCase):
+    def exact(self, values, q):
+        ordered = sorted(values)
+        return ordered[int(q * (len(ordered) - 1))]
+
+    def assertRelativelyClose(self, estimate, exact):
+        self.assertLessEqual(abs(estimate - exact), exact * QuantileSketch.RELATIVE_ACCURACY + 1e-9)
+
+    def test_quantiles_within_relative_accuracy(self):
+        rng = random.Random(7)
+        values = [rng.lognormvariate(7, 1) for _ in range(5000)]
+        sketch = QuantileSketch()
+        for v in values:
+            sketch.add(v)
+
+        self.assertEqual(sketch.count, len(values))
+        for q in (0.01, 0.25, 0.5, 0.75, 0.9, 0.99):
+            with self.subTest(q=q):
+                self.assertRelativelyClose(sketch.quantile(q), self.exact(values, q))
+
+    def test_size_grows_with_range_not_count(self):
+        sketch = QuantileSketch()
+        for i in range(10000):
+            sketch.add(100 + i % 900)
+        # values span 100..999: about log(10) / log(GAMMA) buckets
+        self.assertLess(len(sketch.bins), 60)
+
+    def test_empty_sketch_has_no_quantiles(self):
+        self.assertIsNone(QuantileSketch().quantile(0.5))
+
+    def test_zero_and_negative_values_count_as_zero(self):
+        sketch = QuantileSketch()
+        for v in (0, -5, 0, 100):
+            sketch.add(v)
+
+        self.assertEqual(sketch.zero, 3)
+        self.assertEqual(sketch.quantile(0.5), 0.0)
+        self.assertRelativelyClose(sketch.quantile(1), 100)
+
+    def test_remove_undoes_add(self):
+        sketch = QuantileSketch()
+        for v in (10, 20, 30, 0):
+            sketch.add(v)
+        for v in (30, 0):
+            sketch.remove(v)
+
+        self.assertEqual(sketch.count, 2)
+        self.assertEqual(sketch.zero, 0)
+        self.assertRelativelyClose(sketch.quantile(1), 20)
+
+    def test_removing_a_missing_zero_does_not_go_negative(self):
+        sketch = QuantileSketch()
+        sketch.remove(0)
+        self.assertEqual(sketch.count, 0)
+
+    def test_round_trips_through_json_dict(self):
+        sketch = QuantileSketch()
+        for v in (5, 50, 500, 0):
+            sketch.add(v)
+
+        restored = QuantileSketch(sketch.to_dict())
+
+        self.assertEqual(restored.to_dict(), sketch.to_dict())
+        self.assertEqual(restored.quantile(0.75), sketch.quantile(0.75))
+
+
+class BudgetMetaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.styles, self.experiences = create_catalogue()
+        _, self.client = api_client()
+
+    def meta(self, **headers):
+        return self.client.get("/api/budget/meta/", headers=headers)
+
+    def test_lists_active_styles_with_their_rules(self):
+        BudgetStyle.objects.create(key="hidden", title="Hidden", is_active=False)
+
+        data = self.meta().data
+
+        self.assertEqual([s["key"] for s in data["styles"]], ["budget", "premium"])
+        self.assertEqual(
+            [r["category"] for r in data["styles"][0]["category_rules"]],
+            ["flights", "accommodation", "transportation", "food"],
+        )
+        self.assertEqual(len(data["experiences"]), 2)
+        self.assertEqual(len(data["resources"]), 1)
+
+    def test_warm_meta_and_revalidation_do_not_query(self):
+        etag = self.meta()["ETag"]
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.meta().status_code, 200)
+            self.assertEqual(self.meta(if_none_match=etag).status_code, 304)
+
+    def test_admin_edits_change_the_etag(self):
+        etag = self.meta()["ETag"]
+
+        self.experiences[0].title = "Walking tour"
+        self.experiences[0].save()
+        response = self.meta(if_none_match=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["experiences"][0]["title"], "Walking tour")
+
+        BudgetCategoryRule.objects.filter(style=self.styles["budget"], category="food").delete()
+        self.assertEqual(len(self.meta().data["styles"][0]["category_rules"]), 3)
+
+
+def rules_of(key):
+    return {category: Decimal(cost) for category, cost in CATALOGUE[key].items()}
+
+
+class CalculateBreakdownTests(SimpleTestCase):
+    def test_week_trip_uses_the_rule_defaults(self):
+        amounts = calculate_breakdown(rules_of("budget"), [(Decimal(40), Decimal(60), 2)])
+
+        self.assertEqual(amounts["accommodation"], Decimal("700.00"))
+        self.assertEqual(amounts["experiences"], Decimal("100.00"))
+        # no emergency rule: 10% of everything else
+        self.assertEqual(amounts["emergency"], Decimal("229.00"))
+        self.assertEqual(amounts["total"], Decimal("2519.00"))
+
+    def test_only_daily_categories_scale_with_days(self):
+        amounts = calculate_breakdown(rules_of("budget"), [(Decimal(40), Decimal(60), 2)], days=14)
+
+        self.assertEqual(amounts["flights"], Decimal("1000.00"))
+        self.assertEqual(
+            [amounts[c] for c in DAILY_CATEGORIES], [Decimal("1400.00"), Decimal("280.00"), Decimal("700.00")]
+        )
+        self.assertEqual(amounts["experiences"], Decimal("100.00"))
+        self.assertEqual(amounts["emergency"], Decimal("348.00"))
+
+    def test_experiences_rule_is_a_floor_and_emergency_rule_is_fixed(self):
+        rules = rules_of("premium")
+
+        low = calculate_breakdown(rules, [(Decimal(100), Decimal(200), 1)], days=3)
+        high = calculate_breakdown(rules, [(Decimal(100), Decimal(200), 3)], days=3)
+
+        self.assertEqual(low["experiences"], Decimal("300.00"))
+        self.assertEqual(high["experiences"], Decimal("450.00"))
+        self.assertEqual(low["emergency"], Decimal("500.00"))
+        self.assertEqual(high["total"], sum(high[f] for f in BREAKDOWN_FIELDS))
+
+
+class BudgetWizardBreakdownTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.styles, self.experiences = create_catalogue()
+        _, self.client = api_client()
+
+    def post(self, path, data=None):
+        return self.client.post(f"/api/budget/{path}/", data or {}, format="json")
+
+    def test_breakdown_and_hints_are_priced_for_the_session_days(self):
+        self.post("set-duration", {"days": 14})
+        hints = {r["category"]: r for r in self.post("set-style", {"style_key": "budget"}).data["category_rules"]}
+        self.post("set-experiences", {"experiences": [{"experience_id": self.experiences[0].id, "quantity": 2}]})
+
+        data = self.post("generate-breakdown").data
+        breakdown = data["session"]["breakdown"]
+
+        self.assertEqual(Decimal(breakdown["accommodation"]), Decimal("1400.00"))
+        self.assertEqual(Decimal(data["session"]["total_estimate"]), Decimal("3828.00"))
+        self.assertEqual(Decimal(hints["accommodation"]["default_cost"]), Decimal("1400.00"))
+        self.assertEqual(Decimal(hints["accommodation"]["max_cost"]), Decimal("1680.00"))
+        self.assertEqual(Decimal(hints["flights"]["default_cost"]), Decimal("1000.00"))
+        for row in data["category_rules"]:
+            with self.subTest(category=row["category"]):
+                self.assertLessEqual(Decimal(row["min_cost"]), Decimal(breakdown[row["category"]]))
+                self.assertGreaterEqual(Decimal(row["max_cost"]), Decimal(breakdown[row["category"]]))
+
+    def test_meta_says_how_to_scale_the_raw_hints(self):
+        data = self.client.get("/api/budget/meta/").data
+        self.assertEqual(data["rule_base_days"], RULE_BASE_DAYS)
+        self.assertEqual(data["daily_categories"], list(DAILY_CATEGORIES))
+
+    def test_requires_a_style_first(self):
+        self.assertEqual(self.post("generate-breakdown").status_code, 400)
+
+
+class BudgetScenariosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.styles, self.experiences = create_catalogue()
+        _, self.client = api_client()
+        self.client.post("/api/budget/set-style/", {"style_key": "budget"}, format="json")
+        self.client.post(
+            "/api/budget/set-experiences/",
+            {"experiences": [{"experience_id": self.experiences[0].id, "quantity": 2}]},
+            format="json",
+        )
+
+    def scenarios(self, **data):
+        return self.client.post("/api/budget/scenarios/", data, format="json")
+
+    def test_defaults_cover_the_standard_lengths_and_the_sessions(self):
+        self.client.post("/api/budget/set-duration/", {"days": 10}, format="json")
+
+        data = self.scenarios().data
+
+        self.assertEqual(data["days"], [3, 7, 10, 14, 21])
+        self.assertEqual(data["matrix"]["styles"], ["budget", "premium"])
+        self.assertEqual([len(row) for row in data["matrix"]["estimate"]], [5, 5])
+
+    def test_estimates_match_the_wizard_breakdown(self):
+        self.client.post("/api/budget/set-duration/", {"days": 14}, format="json")
+        total = self.client.post("/api/budget/generate-breakdown/").data["session"]["total_estimate"]
+
+        data = self.scenarios(days=[14]).data
+
+        self.assertEqual(data["matrix"]["estimate"][0], [Decimal(total)])
+        scenario = data["styles"][0]["scenarios"][0]
+        self.assertLessEqual(scenario["low"], scenario["breakdown"]["total"])
+        self.assertGreaterEqual(scenario["high"], scenario["breakdown"]["total"])
+
+    def test_explicit_experiences_replace_the_sessions(self):
+        data = self.scenarios(
+            days=[7], experiences=[{"experience_id": self.experiences[1].id, "quantity": 1}, {"experience_id": 999}]
+        ).data
+
+        breakdown = data["styles"][0]["scenarios"][0]["breakdown"]
+        self.assertEqual(breakdown["experiences"], Decimal("150.00"))
+
+    def test_query_count_does_not_grow_with_days(self):
+        self.scenarios(days=[7])  # warm the meta cache
+
+        with CaptureQueriesContext(connection) as one:
+            self.scenarios(days=[7])
+        with CaptureQueriesContext(connection) as many:
+            self.scenarios(days=list(range(1, 13)))
+
+        self.assertEqual(len(one), len(many))
+
+    def test_rejects_invalid_days(self):
+        self.assertEqual(self.scenarios(days=[0]).status_code, 400)
+        self.assertEqual(self.scenarios(days=[]).status_code, 400)
+
+
+class SessionExperiencesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.styles, self.experiences = create_catalogue()
+        self.extra = BudgetExperience.objects.create(title="Cooking class", min_cost=20, max_cost=40)
+        self.user, self.client = api_client()
+        self.client.post("/api/budget/set-style/", {"style_key": "budget"}, format="json")
+        self.session = BudgetSession.objects.get(user=self.user, is_active=True)
+
+    def stored(self):
+        return dict(
+            BudgetSessionExperience.objects.filter(session=self.session).values_list("experience_id", "quantity")
+        )
+
+    def save(self, *pairs):
+        return save_session_experiences(self.session, [{"experience_id": e.id, "quantity": q} for e, q in pairs])
+
+    def test_selection_becomes_the_requested_set(self):
+        tour, workshop = self.experiences
+        self.save((tour, 1), (workshop, 2))
+        kept = BudgetSessionExperience.objects.get(session=self.session, experience=tour).id
+
+        selections = self.save((tour, 3), (self.extra, 1))
+
+        self.assertEqual(self.stored(), {tour.id: 3, self.extra.id: 1})
+        # rows that stay are updated in place, not recreated
+        self.assertTrue(BudgetSessionExperience.objects.filter(id=kept, quantity=3).exists())
+        self.assertEqual(experiences_cost(selections), Decimal(180))
+
+    def test_unchanged_selection_writes_nothing(self):
+        self.save((self.experiences[0], 1))
+        with self.assertNumQueries(4):  # validate ids, savepoint, lock current rows, release
+            self.save((self.experiences[0], 1))
+
+    def test_repeated_ids_keep_the_last_quantity_and_inactive_are_skipped(self):
+        self.extra.is_active = False
+        self.extra.save()
+
+        self.save((self.experiences[0], 1), (self.experiences[0], 4), (self.extra, 1))
+
+        self.assertEqual(self.stored(), {self.experiences[0].id: 4})
+
+    def test_endpoint_validates_items_and_suggests_a_cost(self):
+        url = "/api/budget/set-experiences/"
+        tour = self.experiences[0]
+
+        for body in ([{"experience_id": tour.id, "quantity": 0}], [{"quantity": 1}], ["x"]):
+            with self.subTest(body=body):
+                self.assertEqual(self.client.post(url, {"experiences": body}, format="json").status_code, 400)
+
+        response = self.client.post(url, {"experiences": [{"experience_id": tour.id, "quantity": 2}]}, format="json")
+        self.assertEqual(response.data["suggested_experiences_cost"], Decimal(100))
+        self.assertEqual(self.stored(), {tour.id: 2})
+
+
+class BudgetSessionManagementTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_catalogue()
+        self.user, self.client = api_client()
+        self.first = self.client.get("/api/budget/session/").data["id"]
+
+    def active_ids(self):
+        return list(BudgetSession.objects.filter(user=self.user, is_active=True).values_list("id", flat=True))
+
+    def test_starting_a_session_archives_the_active_one(self):
+        second = self.client.post("/api/budget/session/").data["id"]
+
+        self.assertEqual(self.active_ids(), [second])
+        self.assertIsNotNone(BudgetSession.objects.get(id=self.first).archived_at)
+
+    def test_database_allows_one_active_session_per_user(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BudgetSession.objects.create(user=self.user, is_active=True)
+
+    def test_activate_switches_the_wizard_to_a_saved_plan(self):
+        second = self.client.post("/api/budget/session/").data["id"]
+
+        response = self.client.post(f"/api/budget/sessions/{self.first}/activate/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.active_ids(), [self.first])
+        self.assertEqual(self.client.get("/api/budget/session/").data["id"], self.first)
+        self.assertFalse(BudgetSession.objects.get(id=second).is_active)
+
+    def test_activate_loses_a_race_with_409(self):
+        archived = self.client.post("/api/budget/session/").data["id"]
+        self.client.post(f"/api/budget/sessions/{self.first}/activate/")
+
+        def racing_archive(user):
+            # the current session is archived, then another request starts one
+            BudgetSession.objects.filter(user=user, is_active=True).update(is_active=False)
+            BudgetSession.objects.create(user=user, is_active=True)
+
+        with mock.patch("budget_guide.views._archive_active_session", racing_archive):
+            response = self.client.post(f"/api/budget/sessions/{archived}/activate/")
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.active_ids(), [self.first])
+
+    def test_archive_then_wizard_starts_a_new_session(self):
+        self.client.post(f"/api/budget/sessions/{self.first}/archive/")
+
+        self.assertEqual(self.active_ids(), [])
+        self.assertNotEqual(self.client.get("/api/budget/session/").data["id"], self.first)
+
+    def test_list_filters_archived_and_hides_other_users(self):
+        second = self.client.post("/api/budget/session/").data["id"]
+        api_client("b@example.com")[1].get("/api/budget/session/")
+
+        def ids(**params):
+            return [s["id"] for s in self.client.get("/api/budget/sessions/", params).data["results"]]
+
+        self.assertEqual(sorted(ids()), sorted([self.first, second]))
+        self.assertEqual(ids(archived="1"), [self.first])
+        self.assertEqual(ids(archived="0"), [second])
+        self.assertEqual(self.client.post("/api/budget/sessions/99999/activate/").status_code, 404)
+
+
+class ProviderShareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_catalogue()
+        User = get_user_model()
+        self.user, self.client = api_client()
+        self.provider = User.objects.create_user(email="p@example.com", password="x", role=PROVIDER_ROLE)
+        self.profile_provider = User.objects.create_user(email="cp@example.com", password="x")
+        CulturalProvider.objects.create(user=self.profile_provider, name="C", bio="b", country="GH", city="Accra")
+
+        self.client.post("/api/budget/set-style/", {"style_key": "budget"}, format="json")
+        self.client.post("/api/budget/generate-breakdown/")
+
+    def share(self, provider_user_id, note=""):
+        data = {"note": note}
+        if provider_user_id is not None:
+            data["provider_user_id"] = provider_user_id
+        return self.client.post("/api/budget/share/", data, format="json")
+
+    def inbox(self, user, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get("/api/budget/provider/shares/", params)
+
+    def test_only_providers_can_receive_shares(self):
+        self.assertEqual(self.share(self.provider.id).status_code, 201)
+        self.assertEqual(self.share(self.profile_provider.id).status_code, 201)
+        self.assertEqual(self.share(self.user.id).status_code, 400)
+        self.assertEqual(self.share(None).status_code, 201)  # a plain share, nobody to notify
+
+        self.assertEqual(BudgetShare.objects.count(), 3)
+        self.assertEqual(BudgetShareNotification.objects.count(), 2)
+
+    def test_provider_check_covers_role_and_profile(self):
+        self.assertTrue(is_provider(self.provider))
+        self.assertTrue(is_provider(self.profile_provider))
+        self.assertFalse(is_provider(self.user))
+
+    def test_inbox_pages_newest_first_for_providers_only(self):
+        for i in range(3):
+            self.share(self.provider.id, note=f"n{i}")
+
+        first = self.inbox(self.provider, limit=2).data
+        second = self.inbox(self.provider, limit=2, cursor=first["next_cursor"]).data
+
+        self.assertEqual([s["note"] for s in first["results"] + second["results"]], ["n2", "n1", "n0"])
+        self.assertIsNone(second["next_cursor"])
+        self.assertEqual(self.inbox(self.profile_provider).data["results"], [])
+        self.assertEqual(self.inbox(self.user).status_code, 403)
+
+    def test_inbox_query_count_does_not_grow_with_shares(self):
+        self.share(self.provider.id)
+        with CaptureQueriesContext(connection) as one:
+            self.inbox(self.provider)
+        for _ in range(4):
+            self.share(self.provider.id)
+        with CaptureQueriesContext(connection) as five:
+            self.inbox(self.provider)
+
+        self.assertEqual(len(one), len(five))
+
+    def test_worker_emails_providers_and_fails_lost_ones(self):
+        self.share(self.provider.id, note="Have a look")
+        self.share(self.profile_provider.id)
+        CulturalProvider.objects.filter(user=self.profile_provider).delete()
+
+        self.assertEqual(send_pending_share_notifications(), 2)
+
+        self.assertEqual([m.to for m in mail.outbox], [["p@example.com"]])
+        self.assertIn("Have a look", mail.outbox[0].body)
+        self.assertEqual(
+            dict(BudgetShareNotification.objects.values_list("share__provider_user_id", "status")),
+            {
+                self.provider.id: BudgetShareNotification.STATUS_SENT,
+                self.profile_provider.id: BudgetShareNotification.STATUS_FAILED,
+            },
+        )
+
+
+class BenchmarkRecordingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.styles, _ = create_catalogue()
+        self.user, self.client = api_client()
+        self.client.post("/api/budget/set-style/", {"style_key": "budget"}, format="json")
+        self.client.post("/api/budget/generate-breakdown/")
+
+    def benchmark(self, category="total"):
+        return BudgetBenchmark.objects.get(style=self.styles["budget"], category=category)
+
+    def test_refinalizing_replaces_the_sessions_previous_amounts(self):
+        self.client.post("/api/budget/finalize/")
+        self.client.post("/api/budget/finalize/")
+        self.assertEqual(self.benchmark().count, 1)
+
+        self.client.post("/api/budget/set-duration/", {"days": 14}, format="json")
+        self.client.post("/api/budget/generate-breakdown/")
+        self.client.post("/api/budget/finalize/")
+
+        benchmark = self.benchmark()
+        session = BudgetSession.objects.get(user=self.user, is_active=True)
+        self.assertEqual(benchmark.count, 1)
+        self.assertEqual(benchmark.total, session.total_estimate)
+
+    def test_stale_session_object_does_not_count_twice(self):
+        session = BudgetSession.objects.get(user=self.user, is_active=True)
+        stale = BudgetSession.objects.get(pk=session.pk)
+
+        record_finalized_session(session, session.breakdown)
+        record_finalized_session(stale, stale.breakdown)  # still sees benchmarked=None
+
+        self.assertEqual(self.benchmark().count, 1)
@@ -7,6 +7,9 @@ urlpatterns = [
 
     # session management
     path("session/", views.BudgetSessionAPIView.as_view()),
+    path("sessions/", views.BudgetSessionListAPIView.as_view()),
+    path("sessions/<int:session_id>/activate/", views.ActivateBudgetSessionAPIView.as_view()),
+    path("sessions/<int:session_id>/archive/", views.ArchiveBudgetSessionAPIView.as_view()),
 
     # wizard steps
     path("set-style/", views.SetStyleAPIView.as_view()),
@@ -16,6 +19,13 @@ urlpatterns = [
     path("update-breakdown/", views.UpdateBreakdownAPIView.as_view()),
     path("finalize/", views.FinalizeBudgetAPIView.as_view()),
 
+    # how finalized plans compare, per style/category
+    path("benchmarks/", views.BudgetBenchmarksAPIView.as_view()),
+
+    # what-if comparison across styles and trip lengths
+    path("scenarios/", views.BudgetScenariosAPIView.as_view()),
+
     # sharing
     path("share/", views.ShareWithProviderAPIView.as_view()),
+    path("provider/shares/", views.ProviderShareInboxAPIView.as_view()),
 ]
@@ -1,48 +1,88 @@
-from django.db import transaction
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 
-from .models import (
-    BudgetStyle, BudgetExperience, BudgetCategoryRule,
-    BudgetSession, BudgetSessionExperience, BudgetSessionBreakdown,
-    BudgetResource, BudgetShare
-)
+from function.pagination import InvalidCursor, get_page_size, paginate_keyset
+from function.permissions import IsProvider
+
+from .models import BudgetStyle, BudgetSession, BudgetSessionBreakdown, BudgetShare
+from .sharing import ShareError, share_with_provider
 from .serializers import (
-    BudgetStyleSerializer, BudgetExperienceSerializer, CategoryRuleSerializer,
-    BudgetSessionSerializer, BudgetResourceSerializer,
+    BudgetSessionSerializer, BudgetSessionListSerializer,
     SetStyleSerializer, SetDurationSerializer, SetExperiencesSerializer,
-    UpdateBreakdownSerializer, ShareWithProviderSerializer
+    UpdateBreakdownSerializer, ShareWithProviderSerializer, BudgetScenarioSerializer,
+    ProviderShareSerializer,
+)
+from .benchmarks import benchmark_summary, record_finalized_session
+from .meta import wizard_meta, meta_etag
+from .services import (
+    generate_default_breakdown, experiences_cost, load_selections, save_session_experiences,
+    session_category_rules, simulate_scenarios
 )
-from .services import generate_default_breakdown, compute_experiences_cost
 
 
 def _get_or_create_active_session(user):
-    # simplest: one active session (latest)
-    session = BudgetSession.objects.filter(user=user).order_by("-updated_at").first()
-    if not session:
-        session = BudgetSession.objects.create(user=user, current_step=1, days=7)
-    return session
+    # one active session per user (partial unique index on user where is_active)
+    session = BudgetSession.objects.filter(user=user, is_active=True).first()
+    if session:
+        return session
+    try:
+        with transaction.atomic():
+            return BudgetSession.objects.create(user=user, current_step=1, days=7)
+    except IntegrityError:
+        # a concurrent request created it first
+        return BudgetSession.objects.get(user=user, is_active=True)
+
+
+def _archive_active_session(user):
+    """
+    Archive the user's active session. Call inside a transaction: the user row
+    is locked first, so concurrent activate/start requests of the same user
+    run one after the other instead of both passing the archive and then
+    colliding on budget_one_active_session.
+    """
+    get_user_model().objects.select_for_update().filter(pk=user.pk).values_list("pk").first()
+    BudgetSession.objects.filter(user=user, is_active=True).update(
+        is_active=False, archived_at=timezone.now(), updated_at=timezone.now()
+    )
+
+
+def _start_session(user):
+    """Archive the current active session (if any) and start a fresh one."""
+    try:
+        with transaction.atomic():
+            _archive_active_session(user)
+            return BudgetSession.objects.create(user=user, current_step=1, days=7)
+    except IntegrityError:
+        # a first wizard call created the active session meanwhile; use it
+        return BudgetSession.objects.get(user=user, is_active=True)
 
 
 class BudgetMetaAPIView(APIView):
     """
-    Returns right-side resources + styles + experiences (for wizard screens).
+    Returns right-side resources + styles (with their category rule hints)
+    + experiences (for wizard screens). Served from the meta cache; the ETag
+    only changes when an admin edits this data.
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        styles = BudgetStyle.objects.filter(is_active=True).order_by("sort_order")
-        experiences = BudgetExperience.objects.filter(is_active=True).order_by("sort_order")
-        resources = BudgetResource.objects.filter(is_active=True).order_by("sort_order")
-
-        return Response({
-            "styles": BudgetStyleSerializer(styles, many=True).data,
-            "experiences": BudgetExperienceSerializer(experiences, many=True).data,
-            "resources": BudgetResourceSerializer(resources, many=True).data,
-        })
+        meta = wizard_meta()
+        etag = meta_etag(meta)
+        if request.headers.get("If-None-Match") == etag:
+            response = Response(status=304)
+        else:
+            response = Response(meta)
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        return response
 
 
 class BudgetSessionAPIView(APIView):
@@ -54,12 +94,84 @@ class BudgetSessionAPIView(APIView):
 
     def post(self, request):
         """
-        Start fresh session (optional).
+        Start fresh session (optional). The previous one is archived.
         """
-        session = BudgetSession.objects.create(user=request.user, current_step=1, days=7)
+        session = _start_session(request.user)
         return Response(BudgetSessionSerializer(session).data, status=201)
 
 
+SESSION_LIST_ORDERING = ["-updated_at", "-id"]
+
+
+class BudgetSessionListAPIView(APIView):
+    """
+    GET /api/budget/sessions/?archived=0|1&cursor=&limit=
+    The user's saved budget plans, most recently updated first.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        qs = BudgetSession.objects.filter(user=request.user).select_related("style")
+        archived = request.query_params.get("archived")
+        if archived in ("1", "true", "yes"):
+            qs = qs.filter(is_active=False)
+        elif archived in ("0", "false", "no"):
+            qs = qs.filter(is_active=True)
+
+        try:
+            sessions, next_cursor = paginate_keyset(
+                qs,
+                SESSION_LIST_ORDERING,
+                cursor=request.query_params.get("cursor"),
+                page_size=get_page_size(request),
+            )
+        except InvalidCursor as e:
+            return Response({"detail": str(e)}, status=400)
+
+        return Response({
+            "results": BudgetSessionListSerializer(sessions, many=True).data,
+            "next_cursor": next_cursor,
+        })
+
+
+class ActivateBudgetSessionAPIView(APIView):
+    """
+    POST /api/budget/sessions/<id>/activate/
+    Reopen a saved plan in the wizard (the current one is archived).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, session_id: int):
+        session = get_object_or_404(BudgetSession, id=session_id, user=request.user)
+        if not session.is_active:
+            try:
+                with transaction.atomic():
+                    _archive_active_session(request.user)
+                    session.is_active = True
+                    session.archived_at = None
+                    session.save(update_fields=["is_active", "archived_at", "updated_at"])
+            except IntegrityError:
+                # a first wizard call created an active session meanwhile
+                return Response({"detail": "Another session was activated, try again."}, status=409)
+        return Response(BudgetSessionSerializer(session).data)
+
+
+class ArchiveBudgetSessionAPIView(APIView):
+    """
+    POST /api/budget/sessions/<id>/archive/
+    Archiving the active plan makes the next wizard call start a new one.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, session_id: int):
+        session = get_object_or_404(BudgetSession, id=session_id, user=request.user)
+        if session.is_active:
+            session.is_active = False
+            session.archived_at = timezone.now()
+            session.save(update_fields=["is_active", "archived_at", "updated_at"])
+        return Response(BudgetSessionListSerializer(session).data)
+
+
 class SetStyleAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -71,13 +183,12 @@ class SetStyleAPIView(APIView):
         style = get_object_or_404(BudgetStyle, key=serializer.validated_data["style_key"], is_active=True)
         session.style = style
         session.current_step = max(session.current_step, 1)
-        session.save(update_fields=["style", "current_step"])
+        session.save(update_fields=["style", "current_step", "updated_at"])
 
         # After style set, return category rules hints too
-        rules = BudgetCategoryRule.objects.filter(style=style)
         return Response({
             "session": BudgetSessionSerializer(session).data,
-            "category_rules": CategoryRuleSerializer(rules, many=True).data,
+            "category_rules": session_category_rules(style.id, session.days),
         })
 
 
@@ -91,7 +202,7 @@ class SetDurationAPIView(APIView):
 
         session.days = serializer.validated_data["days"]
         session.current_step = max(session.current_step, 2)
-        session.save(update_fields=["days", "current_step"])
+        session.save(update_fields=["days", "current_step", "updated_at"])
         return Response(BudgetSessionSerializer(session).data)
 
 
@@ -109,28 +220,15 @@ class SetExperiencesAPIView(APIView):
         serializer = SetExperiencesSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        items = serializer.validated_data["experiences"]
-
-        with transaction.atomic():
-            BudgetSessionExperience.objects.filter(session=session).delete()
-            for item in items:
-                exp_id = item.get("experience_id")
-                qty = int(item.get("quantity", 1))
-                if not exp_id:
-                    continue
-                exp = BudgetExperience.objects.filter(id=exp_id, is_active=True).first()
-                if not exp:
-                    continue
-                BudgetSessionExperience.objects.create(session=session, experience=exp, quantity=max(qty, 1))
+        selections = save_session_experiences(session, serializer.validated_data["experiences"])
 
         session.current_step = max(session.current_step, 3)
-        session.save(update_fields=["current_step"])
+        session.save(update_fields=["current_step", "updated_at"])
 
         # Suggest experiences cost so UI can show it
-        exp_cost = compute_experiences_cost(session)
         return Response({
             "session": BudgetSessionSerializer(session).data,
-            "suggested_experiences_cost": exp_cost
+            "suggested_experiences_cost": experiences_cost(selections)
         })
 
 
@@ -145,14 +243,11 @@ class GenerateCostBreakdownAPIView(APIView):
         if not session.style:
             return Response({"detail": "Select travel style first."}, status=400)
 
-        breakdown = generate_default_breakdown(session)
-        session.current_step = max(session.current_step, 4)
-        session.save(update_fields=["current_step"])
+        generate_default_breakdown(session, current_step=4)
 
-        style_rules = BudgetCategoryRule.objects.filter(style=session.style)
         return Response({
             "session": BudgetSessionSerializer(session).data,
-            "category_rules": CategoryRuleSerializer(style_rules, many=True).data,
+            "category_rules": session_category_rules(session.style_id, session.days),
         })
 
 
@@ -175,7 +270,7 @@ class UpdateBreakdownAPIView(APIView):
         breakdown.save()
         session.total_estimate = breakdown.total()
         session.current_step = max(session.current_step, 4)
-        session.save(update_fields=["total_estimate", "current_step"])
+        session.save(update_fields=["total_estimate", "current_step", "updated_at"])
 
         return Response(BudgetSessionSerializer(session).data)
 
@@ -191,9 +286,11 @@ class FinalizeBudgetAPIView(APIView):
         if not hasattr(session, "breakdown"):
             return Response({"detail": "Generate cost breakdown first."}, status=400)
 
-        session.current_step = 5
-        session.total_estimate = session.breakdown.total()
-        session.save(update_fields=["current_step", "total_estimate"])
+        with transaction.atomic():
+            session.current_step = 5
+            session.total_estimate = session.breakdown.total()
+            session.save(update_fields=["current_step", "total_estimate", "updated_at"])
+            record_finalized_session(session, session.breakdown)
 
         return Response({
             "detail": "Budget finalized.",
@@ -201,6 +298,63 @@ class FinalizeBudgetAPIView(APIView):
         })
 
 
+class BudgetBenchmarksAPIView(APIView):
+    """
+    GET /api/budget/benchmarks/?style=<key>
+    What finalized plans of each style spend per category (count, mean and
+    percentiles). Stats with too few plans behind them only show the count.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        styles = benchmark_summary()
+        style_key = request.query_params.get("style")
+        if style_key:
+            styles = [s for s in styles if s["key"] == style_key]
+        return Response({"styles": styles})
+
+
+DEFAULT_SCENARIO_DAYS = (3, 7, 14, 21)
+
+
+class BudgetScenariosAPIView(APIView):
+    """
+    POST /api/budget/scenarios/
+    Compare every active style across several trip lengths in one call:
+    estimate breakdown per (style, days) plus low/high totals from the
+    category rules' min/max ranges. Nothing is saved on the session.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        session = _get_or_create_active_session(request.user)
+        serializer = BudgetScenarioSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        days_values = sorted(set(data.get("days") or (*DEFAULT_SCENARIO_DAYS, session.days)))
+
+        meta = wizard_meta()
+        if "experiences" in data:
+            # active experiences are in the meta cache; unknown/inactive ids are skipped
+            known = {e["id"]: e for e in meta["experiences"]}
+            selections = [
+                (Decimal(str(known[i["experience_id"]]["min_cost"])),
+                 Decimal(str(known[i["experience_id"]]["max_cost"])),
+                 i["quantity"])
+                for i in data["experiences"] if i["experience_id"] in known
+            ]
+        else:
+            selections = load_selections(session)
+
+        styles, matrix = simulate_scenarios(meta["styles"], selections, days_values)
+        return Response({
+            "days": days_values,
+            "styles": styles,
+            "matrix": matrix,
+        })
+
+
 class ShareWithProviderAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -212,13 +366,47 @@ class ShareWithProviderAPIView(APIView):
         serializer = ShareWithProviderSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        share = BudgetShare.objects.create(
-            session=session,
-            shared_by=request.user,
-            provider_user_id=serializer.validated_data.get("provider_user_id"),
-            note=serializer.validated_data.get("note", ""),
-        )
+        try:
+            share = share_with_provider(
+                session,
+                request.user,
+                provider_user_id=serializer.validated_data.get("provider_user_id"),
+                note=serializer.validated_data.get("note", ""),
+            )
+        except ShareError as e:
+            return Response({"detail": str(e)}, status=400)
         return Response({
             "detail": "Shared with provider.",
             "share_id": share.id
         }, status=201)
+
+
+PROVIDER_INBOX_ORDERING = ["-created_at", "-id"]
+
+
+class ProviderShareInboxAPIView(APIView):
+    """
+    GET /api/budget/provider/shares/?cursor=&limit=
+    Budget plans shared with the requesting provider, newest first.
+    """
+    permission_classes = [IsAuthenticated, IsProvider]
+
+    def get(self, request):
+        qs = (
+            BudgetShare.objects.filter(provider_user_id=request.user.id)
+            .select_related("shared_by", "session__style", "session__breakdown")
+        )
+        try:
+            shares, next_cursor = paginate_keyset(
+                qs,
+                PROVIDER_INBOX_ORDERING,
+                cursor=request.query_params.get("cursor"),
+                page_size=get_page_size(request),
+            )
+        except InvalidCursor as e:
+            return Response({"detail": str(e)}, status=400)
+
+        return Response({
+            "results": ProviderShareSerializer(shares, many=True).data,
+            "next_cursor": next_cursor,
+        })
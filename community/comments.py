@@ -0,0 +1,47 @@
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from function.pagination import paginate_keyset
+
+from .models import PostComment
+
+
+# Threads read oldest first; "id" makes the keyset unique.
+COMMENT_ORDERING = ["created_on", "id"]
+COMMENTS_PAGE_SIZE = 30
+MAX_COMMENTS_PREVIEW = 5
+
+
+def comments_page(post, cursor=None, page_size=COMMENTS_PAGE_SIZE):
+    """
+    One page of a post's comments with their users joined: (comments,
+    next_cursor). The caller resolves `post` through feed.visible_posts().
+    """
+    qs = PostComment.objects.filter(post=post).select_related("user")
+    return paginate_keyset(qs, COMMENT_ORDERING, cursor=cursor, page_size=page_size)
+
+
+def latest_comments(post_ids, n):
+    """
+    {post_id: its latest n comments, oldest first} for a whole page of posts
+    in one query (ROW_NUMBER per post, newest first, keep the top n).
+    """
+    if not post_ids or n <= 0:
+        return {}
+    rows = (
+        PostComment.objects.filter(post_id__in=post_ids)
+        .select_related("user")
+        .annotate(
+            rank=Window(
+                RowNumber(),
+                partition_by=[F("post_id")],
+                order_by=[F("created_on").desc(), F("id").desc()],
+            )
+        )
+        .filter(rank__lte=n)
+        .order_by("post_id", "created_on", "id")
+    )
+    previews = {}
+    for comment in rows:
+        previews.setdefault(comment.post_id, []).append(comment)
+    return previews
@@ -0,0 +1,39 @@
+from django.db.models import OuterRef, Q
+from django.db.models.functions import Lower
+
+from function.pagination import paginate_keyset
+
+from .feed import count_of, is_member_of
+from .models import CommunityGroup, CommunityPost, GroupMember
+
+
+# Directory order: name (case-insensitive), then id; backed by community_group_name_idx.
+DIRECTORY_ORDERING = ["name_key", "id"]
+DIRECTORY_PAGE_SIZE = 20
+
+
+def directory_queryset(user, search=None):
+    """
+    Groups the user can see (public ones, plus private ones they belong to)
+    with member_count, post_count and is_member, as one SQL statement.
+    `search` is a case-insensitive name prefix.
+    """
+    groups = (
+        CommunityGroup.objects.annotate(
+            name_key=Lower("name"),
+            is_member=is_member_of(user),
+        )
+        .filter(Q(is_private=False) | Q(is_member=True))
+    )
+    if search:
+        groups = groups.filter(name_key__startswith=search.strip().lower())
+
+    return groups.annotate(
+        member_count=count_of(GroupMember.objects.filter(group=OuterRef("pk")), "group"),
+        post_count=count_of(CommunityPost.objects.filter(group=OuterRef("pk"), is_deleted=False), "group"),
+    )
+
+
+def directory_page(user, search=None, cursor=None, page_size=DIRECTORY_PAGE_SIZE):
+    """One page of the group directory: (groups, next_cursor). Raises InvalidCursor."""
+    return paginate_keyset(directory_queryset(user, search), DIRECTORY_ORDERING, cursor=cursor, page_size=page_size)
@@ -0,0 +1,59 @@
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from function.pagination import paginate_keyset
+
+from .models import CommunityPost, GroupMember, PostComment, PostReaction
+
+
+# Feed order: pinned posts first, then newest. "id" makes the keyset unique.
+FEED_ORDERING = ["-is_pinned", "-created_on", "-id"]
+FEED_PAGE_SIZE = 20
+
+
+def count_of(qs, parent="post"):
+    # correlated subquery, so counting doesn't GROUP BY the whole outer query
+    return Coalesce(
+        Subquery(qs.order_by().values(parent).annotate(c=Count("id")).values("c")[:1]),
+        0,
+    )
+
+
+def is_member_of(user, group="pk"):
+    """Exists() for "user belongs to the group at OuterRef(group)"."""
+    return Exists(GroupMember.objects.filter(group=OuterRef(group), user=user))
+
+
+def visible_posts(user):
+    """
+    Live posts the user may read: no group, a public group, or a private
+    group they belong to (the directory's visibility rule).
+    """
+    return CommunityPost.objects.filter(is_deleted=False).filter(
+        Q(group__isnull=True) | Q(group__is_private=False) | is_member_of(user, "group_id")
+    )
+
+
+def feed_queryset(user, group_id=None):
+    """
+    Visible posts (see visible_posts()) with everything a feed card needs, as
+    one SQL statement: author (joined), reactions_count (sum of the per-type
+    counters), comments_count and the caller's own reaction type
+    (my_reaction, None if they haven't reacted).
+    """
+    posts = visible_posts(user)
+    if group_id:
+        posts = posts.filter(group_id=group_id)
+
+    return posts.select_related("author").annotate(
+        reactions_count=F("like_count") + F("support_count") + F("insightful_count"),
+        comments_count=count_of(PostComment.objects.filter(post=OuterRef("pk"))),
+        my_reaction=Subquery(
+            PostReaction.objects.filter(post=OuterRef("pk"), user=user).values("reaction_type")[:1]
+        ),
+    )
+
+
+def feed_page(user, group_id=None, cursor=None, page_size=FEED_PAGE_SIZE):
+    """One page of the feed: (posts, next_cursor). Raises InvalidCursor."""
+    return paginate_keyset(feed_queryset(user, group_id), FEED_ORDERING, cursor=cursor, page_size=page_size)
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from community.timeline import backfill_timelines
+
+
+class Command(BaseCommand):
+    help = "Fan existing group posts out to members' home timelines (small groups) or mark them merge-on-read."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--group", type=int, action="append", dest="group_ids", help="Only this group id (repeatable).")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        written = backfill_timelines(group_ids=options["group_ids"], batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} timeline entr{'y' if written == 1 else 'ies'}."))
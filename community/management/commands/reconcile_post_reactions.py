@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from community.reactions import reconcile_reaction_counters
+
+
+class Command(BaseCommand):
+    help = "Recount like/support/insightful counters on community posts from their reactions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        fixed = reconcile_reaction_counters(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Corrected reaction counters on {fixed} post(s)."))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.10 on 2026-10-19 03:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='communitypost',
+            index=models.Index(fields=['is_pinned', 'created_on', 'id'], name='community_post_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='communitypost',
+            index=models.Index(fields=['group', 'is_pinned', 'created_on', 'id'], name='community_post_group_feed_idx'),
+        ),
+    ]
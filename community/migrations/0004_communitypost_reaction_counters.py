@@ -0,0 +1,50 @@
+# Generated by Django 5.2.10 on 2026-10-19 03:36
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_reaction_counters(apps, schema_editor):
+    # existing posts start at 0; count their reactions once
+    PostReaction = apps.get_model("community", "PostReaction")
+    CommunityPost = apps.get_model("community", "CommunityPost")
+    counters = {"like": "like_count", "support": "support_count", "insightful": "insightful_count"}
+
+    counts = {}
+    for post_id, reaction_type, n in (
+        PostReaction.objects.order_by().values_list("post_id", "reaction_type").annotate(n=Count("id"))
+    ):
+        if reaction_type in counters:
+            counts.setdefault(post_id, {})[counters[reaction_type]] = n
+
+    posts = list(CommunityPost.objects.filter(id__in=counts).only("id"))
+    for post in posts:
+        for field in counters.values():
+            setattr(post, field, counts[post.id].get(field, 0))
+    CommunityPost.objects.bulk_update(posts, list(counters.values()), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0003_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='communitypost',
+            name='insightful_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='communitypost',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='communitypost',
+            name='support_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_reaction_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.10 on 2026-10-19 03:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0004_communitypost_reaction_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='postcomment',
+            index=models.Index(fields=['post', 'created_on', 'id'], name='community_comment_thread_idx'),
+        ),
+    ]
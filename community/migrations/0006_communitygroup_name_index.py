@@ -0,0 +1,20 @@
+# Generated by Django 5.2.10 on 2026-10-19 03:37
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0005_postcomment_thread_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='communitygroup',
+            index=models.Index(django.db.models.functions.text.Lower('name'), models.F('id'), name='community_group_name_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+# Prefix search (lower(name) LIKE 'abc%') can't use community_group_name_idx
+# on PostgreSQL unless the database runs in the C locale; text_pattern_ops
+# makes it indexable. Other backends have no operator classes, so the index
+# is only created there (and isn't part of the model state).
+CREATE_PREFIX_INDEX = (
+    'CREATE INDEX community_group_name_prefix_idx '
+    'ON community_communitygroup ((LOWER("name")) text_pattern_ops)'
+)
+DROP_PREFIX_INDEX = "DROP INDEX IF EXISTS community_group_name_prefix_idx"
+
+
+def add_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_PREFIX_INDEX)
+
+
+def remove_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_PREFIX_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0006_communitygroup_name_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_prefix_index, remove_prefix_index),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Lower
 from django.conf import settings
 
 User = settings.AUTH_USER_MODEL
@@ -17,6 +19,14 @@ class CommunityGroup(models.Model):
     created_on = models.DateTimeField(auto_now_add=True)
     updated_on = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # directory order (community.directory); the PostgreSQL-only
+            # text_pattern_ops index for the name prefix search is created by
+            # migration 0007
+            models.Index(Lower("name"), F("id"), name="community_group_name_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -59,9 +69,41 @@ class CommunityPost(models.Model):
     is_pinned = models.BooleanField(default=False)
     is_deleted = models.BooleanField(default=False)
 
+    # reaction counts per PostReaction.reaction_type, kept by community.reactions
+    like_count = models.PositiveIntegerField(default=0)
+    support_count = models.PositiveIntegerField(default=0)
+    insightful_count = models.PositiveIntegerField(default=0)
+
+    # copied into members' TimelineEntry rows at write time (small groups);
+    # False = read from the group directly when building "my feed"
+    fanned_out = models.BooleanField(default=False)
+
     created_on = models.DateTimeField(auto_now_add=True)
     updated_on = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # feed order (community.feed.FEED_ORDERING), overall and per group
+            models.Index(fields=["is_pinned", "created_on", "id"], name="community_post_feed_idx"),
+            models.Index(fields=["group", "is_pinned", "created_on", "id"], name="community_post_group_feed_idx"),
+        ]
+
+
+
+
+class TimelineEntry(models.Model):
+    """A group post in a member's home timeline (see community.timeline)."""
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="community_timeline")
+    post = models.ForeignKey(CommunityPost, on_delete=models.CASCADE, related_name="timeline_entries")
+    created_on = models.DateTimeField()  # the post's, so the timeline sorts without a join
+
+    class Meta:
+        unique_together = ("user", "post")
+        indexes = [
+            models.Index(fields=["user", "created_on", "post"], name="community_timeline_idx"),
+        ]
+
 
 
 
@@ -73,6 +115,12 @@ class PostComment(models.Model):
 
     created_on = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # a post's thread in order (community.comments)
+            models.Index(fields=["post", "created_on", "id"], name="community_comment_thread_idx"),
+        ]
+
 
 
 
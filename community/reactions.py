@@ -0,0 +1,74 @@
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import CommunityPost, PostReaction
+
+
+# PostReaction.reaction_type -> CommunityPost counter field
+REACTION_COUNTERS = {
+    "like": "like_count",
+    "support": "support_count",
+    "insightful": "insightful_count",
+}
+
+
+def _bump(post_id, add=None, remove=None):
+    updates = {}
+    if add:
+        updates[REACTION_COUNTERS[add]] = F(REACTION_COUNTERS[add]) + 1
+    if remove:
+        updates[REACTION_COUNTERS[remove]] = Greatest(F(REACTION_COUNTERS[remove]) - 1, 0)
+    if updates:
+        CommunityPost.objects.filter(id=post_id).update(**updates)
+
+
+def set_reaction(user, post, reaction_type):
+    """Create or change the user's reaction; counters move in the same transaction."""
+    with transaction.atomic():
+        reaction = PostReaction.objects.select_for_update().filter(post=post, user=user).first()
+        if reaction is None:
+            reaction = PostReaction.objects.create(post=post, user=user, reaction_type=reaction_type)
+            _bump(post.id, add=reaction_type)
+        elif reaction.reaction_type != reaction_type:
+            previous = reaction.reaction_type
+            reaction.reaction_type = reaction_type
+            reaction.save(update_fields=["reaction_type"])
+            _bump(post.id, add=reaction_type, remove=previous)
+    return reaction
+
+
+def remove_reaction(user, post):
+    """Delete the user's reaction (if any). Returns True if one was removed."""
+    with transaction.atomic():
+        reaction = PostReaction.objects.select_for_update().filter(post=post, user=user).first()
+        if reaction is None:
+            return False
+        reaction.delete()
+        _bump(post.id, remove=reaction.reaction_type)
+    return True
+
+
+def reconcile_reaction_counters(batch_size=500):
+    """
+    Recount every post's reaction counters from PostReaction (one GROUP BY)
+    and fix the ones that drifted. Returns the number of posts corrected.
+    """
+    actual = {}
+    for post_id, reaction_type, n in (
+        PostReaction.objects.order_by().values_list("post_id", "reaction_type").annotate(n=Count("id"))
+    ):
+        if reaction_type in REACTION_COUNTERS:
+            actual.setdefault(post_id, {})[REACTION_COUNTERS[reaction_type]] = n
+
+    fields = list(REACTION_COUNTERS.values())
+    fixed = []
+    for post in CommunityPost.objects.only("id", *fields).iterator(chunk_size=batch_size):
+        counts = actual.get(post.id, {})
+        if any(getattr(post, f) != counts.get(f, 0) for f in fields):
+            for f in fields:
+                setattr(post, f, counts.get(f, 0))
+            fixed.append(post)
+
+    CommunityPost.objects.bulk_update(fixed, fields, batch_size=batch_size)
+    return len(fixed)
@@ -11,13 +11,29 @@ class CommunityGroupSerializer(serializers.ModelSerializer):
 
 
 
+class GroupDirectorySerializer(CommunityGroupSerializer):
+    """Directory card; expects the annotations added by community.directory.directory_queryset."""
+    member_count = serializers.IntegerField(read_only=True)
+    post_count = serializers.IntegerField(read_only=True)
+    is_member = serializers.BooleanField(read_only=True)
+
+
+
 class CommunityPostSerializer(serializers.ModelSerializer):
     author_name = serializers.CharField(source="author.full_name", read_only=True)
 
     class Meta:
         model = CommunityPost
-        fields = "__all__"
-        read_only_fields = ("author", "created_on")
+        exclude = ("fanned_out",)
+        read_only_fields = ("author", "created_on", "like_count", "support_count", "insightful_count")
+
+
+
+class FeedPostSerializer(CommunityPostSerializer):
+    """Feed card; expects the annotations added by community.feed.feed_queryset."""
+    reactions_count = serializers.IntegerField(read_only=True)
+    comments_count = serializers.IntegerField(read_only=True)
+    my_reaction = serializers.CharField(read_only=True, allow_null=True)
 
 
 
@@ -36,3 +52,8 @@ class PostReactionSerializer(serializers.ModelSerializer):
         model = PostReaction
         fields = "__all__"
         read_only_fields = ("user",)
+
+
+class ReactionTargetSerializer(serializers.Serializer):
+    """DELETE /api/community/reactions/ target (body or ?post=)."""
+    post = serializers.IntegerField()
@@ -0,0 +1,19 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from .models import GroupMember
+from .timeline import member_joined, member_left
+
+
+def group_member_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        # after commit, so a post fanned out concurrently is seen as fanned_out
+        transaction.on_commit(lambda: member_joined(instance.group_id, instance.user_id))
+
+
+def group_member_deleted(sender, instance, **kwargs):
+    member_left(instance.group_id, instance.user_id)
+
+
+post_save.connect(group_member_saved, sender=GroupMember, dispatch_uid="community_group_member_saved")
+post_delete.connect(group_member_deleted, sender=GroupMember, dispatch_uid="community_group_member_deleted")
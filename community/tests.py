@@ -1,3 +1,364 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .comments import latest_comments
+from .models import CommunityGroup, CommunityPost, GroupMember, PostComment, PostReaction, TimelineEntry
+from .reactions import reconcile_reaction_counters, remove_reaction, set_reaction
+from .timeline import backfill_timelines
+
+
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+class CommunityTestCase(TestCase):
+    """
+    alice belongs to the private group, bob doesn't; both can see the public
+    group and posts without a group.
+    """
+
+    def setUp(self):
+        User = get_user_model()
+        self.alice = User.objects.create_user(email="alice@example.com", password="x")
+        self.bob = User.objects.create_user(email="bob@example.com", password="x")
+        self.public = CommunityGroup.objects.create(name="Public", created_by=self.alice)
+        self.private = CommunityGroup.objects.create(name="Private", created_by=self.alice, is_private=True)
+        GroupMember.objects.create(group=self.private, user=self.alice, role="admin")
+
+    def post(self, content, group=None, **fields):
+        return CommunityPost.objects.create(author=self.alice, content=content, group=group, **fields)
+
+
+class CommunityFeedTests(CommunityTestCase):
+    def setUp(self):
+        super().setUp()
+        self.loose = self.post("loose")
+        self.in_public = self.post("public", self.public)
+        self.in_private = self.post("private", self.private)
+        self.pinned = self.post("pinned", is_pinned=True)
+        self.post("deleted", is_deleted=True)
+
+    def feed(self, user, **params):
+        return api_client(user).get("/api/community/posts/", params)
+
+    def ids(self, response):
+        return [p["id"] for p in response.data["results"]]
+
+    def card(self, user, post, **params):
+        return next(p for p in self.feed(user, **params).data["results"] if p["id"] == post.id)
+
+    def test_pinned_first_then_newest(self):
+        self.assertEqual(
+            self.ids(self.feed(self.alice)),
+            [self.pinned.id, self.in_private.id, self.in_public.id, self.loose.id],
+        )
+
+    def test_pages_cover_the_feed_once(self):
+        first = self.feed(self.alice, limit=3)
+        second = self.feed(self.alice, limit=3, cursor=first.data["next_cursor"])
+
+        self.assertEqual(self.ids(first) + self.ids(second), self.ids(self.feed(self.alice)))
+        self.assertIsNone(second.data["next_cursor"])
+        self.assertEqual(self.feed(self.alice, cursor="nope").status_code, 400)
+
+    def test_cards_carry_counts_and_my_reaction(self):
+        PostReaction.objects.create(post=self.loose, user=self.bob, reaction_type="like")
+        CommunityPost.objects.filter(id=self.loose.id).update(like_count=1, support_count=2)
+        PostComment.objects.create(post=self.loose, user=self.bob, comment="hi")
+
+        card = self.card(self.bob, self.loose)
+
+        self.assertEqual((card["reactions_count"], card["comments_count"]), (3, 1))
+        self.assertEqual(card["my_reaction"], "like")
+        self.assertIsNone(self.card(self.alice, self.loose)["my_reaction"])
+
+    def test_a_page_is_one_query(self):
+        client = api_client(self.alice)
+        with self.assertNumQueries(1):
+            client.get("/api/community/posts/")
+
+    def test_comments_preview_embeds_the_latest_comments(self):
+        for i in range(4):
+            PostComment.objects.create(post=self.loose, user=self.bob, comment=f"c{i}")
+
+        card = self.card(self.alice, self.loose, comments_preview=2)
+
+        self.assertEqual([c["comment"] for c in card["latest_comments"]], ["c2", "c3"])
+
+    def test_group_filter(self):
+        self.assertEqual(self.ids(self.feed(self.alice, group_id=self.public.id)), [self.in_public.id])
+        self.assertEqual(self.feed(self.alice, group_id="abc").status_code, 400)
+
+    def test_private_group_posts_are_hidden_from_non_members(self):
+        self.assertNotIn(self.in_private.id, self.ids(self.feed(self.bob)))
+        self.assertEqual(self.ids(self.feed(self.bob, group_id=self.private.id)), [])
+        self.assertIn(self.in_private.id, self.ids(self.feed(self.alice)))
+
+
+class HomeTimelineTests(CommunityTestCase):
+    def setUp(self):
+        super().setUp()
+        self.carol = get_user_model().objects.create_user(email="carol@example.com", password="x")
+        GroupMember.objects.create(group=self.public, user=self.alice)
+
+    def create_post(self, group, content="hi"):
+        response = api_client(self.alice).post(
+            "/api/community/posts/create/", {"group": group.id, "content": content}, format="json"
+        )
+        return CommunityPost.objects.get(id=response.data["id"])
+
+    def timeline(self, user, **params):
+        return [p["id"] for p in api_client(user).get("/api/community/feed/", params).data["results"]]
+
+    def join(self, group, user):
+        with self.captureOnCommitCallbacks(execute=True):
+            return GroupMember.objects.create(group=group, user=user)
+
+    def test_small_group_posts_are_fanned_out_to_members(self):
+        post = self.create_post(self.public)
+
+        self.assertTrue(post.fanned_out)
+        self.assertEqual(list(TimelineEntry.objects.values_list("user_id", flat=True)), [self.alice.id])
+        self.assertEqual(self.timeline(self.alice), [post.id])
+        self.assertEqual(self.timeline(self.bob), [])
+
+    def test_large_group_posts_are_merged_at_read_time(self):
+        with mock.patch("community.timeline.FANOUT_MAX_MEMBERS", 0):
+            merged = self.create_post(self.public, "merged")
+        fanned = self.create_post(self.private, "fanned")
+
+        self.assertFalse(merged.fanned_out)
+        self.assertEqual(self.timeline(self.alice), [fanned.id, merged.id])
+
+    def test_pages_across_both_sources(self):
+        posts = []
+        for i in range(5):
+            with mock.patch("community.timeline.FANOUT_MAX_MEMBERS", 0 if i % 2 else 500):
+                posts.append(self.create_post(self.public, f"p{i}"))
+
+        first = api_client(self.alice).get("/api/community/feed/", {"limit": 3}).data
+        second = self.timeline(self.alice, limit=3, cursor=first["next_cursor"])
+
+        self.assertEqual([p["id"] for p in first["results"]] + second, [p.id for p in reversed(posts)])
+
+    def test_new_member_sees_earlier_posts_and_leaving_removes_them(self):
+        post = self.create_post(self.public)
+
+        membership = self.join(self.public, self.carol)
+        self.assertEqual(self.timeline(self.carol), [post.id])
+
+        membership.delete()
+        self.assertEqual(self.timeline(self.carol), [])
+        self.assertFalse(TimelineEntry.objects.filter(user=self.carol).exists())
+
+    def test_group_outgrowing_the_limit_switches_to_merge_on_read(self):
+        post = self.create_post(self.public)
+
+        with mock.patch("community.timeline.FANOUT_MAX_MEMBERS", 1):
+            self.join(self.public, self.carol)
+
+        post.refresh_from_db()
+        self.assertFalse(post.fanned_out)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.timeline(self.carol), [post.id])
+        self.assertEqual(self.timeline(self.alice), [post.id])
+
+    def test_deleted_posts_drop_out(self):
+        post = self.create_post(self.public)
+        CommunityPost.objects.filter(id=post.id).update(is_deleted=True)
+        self.assertEqual(self.timeline(self.alice), [])
+
+    def test_backfill_fans_out_existing_posts(self):
+        post = self.post("old", self.public)
+        GroupMember.objects.create(group=self.public, user=self.carol)  # outside a commit hook
+
+        written = backfill_timelines()
+
+        self.assertEqual(written, 2)
+        self.assertEqual(set(TimelineEntry.objects.values_list("user_id", flat=True)), {self.alice.id, self.carol.id})
+        self.assertEqual(self.timeline(self.carol), [post.id])
+
+
+class ReactionCounterTests(CommunityTestCase):
+    def setUp(self):
+        super().setUp()
+        self.target = self.post("react to me", self.public)
+
+    def counts(self):
+        self.target.refresh_from_db()
+        return (self.target.like_count, self.target.support_count, self.target.insightful_count)
+
+    def react(self, user, **data):
+        return api_client(user).post("/api/community/reactions/", data, format="json")
+
+    def test_set_change_and_remove_move_the_counters(self):
+        set_reaction(self.alice, self.target, "like")
+        set_reaction(self.bob, self.target, "like")
+        self.assertEqual(self.counts(), (2, 0, 0))
+
+        set_reaction(self.bob, self.target, "like")
+        self.assertEqual(self.counts(), (2, 0, 0))
+
+        set_reaction(self.bob, self.target, "insightful")
+        self.assertEqual(self.counts(), (1, 0, 1))
+
+        self.assertTrue(remove_reaction(self.alice, self.target))
+        self.assertFalse(remove_reaction(self.alice, self.target))
+        self.assertEqual(self.counts(), (0, 0, 1))
+        self.assertEqual(PostReaction.objects.count(), 1)
+
+    def test_reconcile_fixes_drifted_counters(self):
+        set_reaction(self.alice, self.target, "support")
+        other = self.post("untouched", self.public)
+        CommunityPost.objects.filter(id=self.target.id).update(support_count=7, like_count=3)
+
+        self.assertEqual(reconcile_reaction_counters(), 1)
+        self.assertEqual(self.counts(), (0, 1, 0))
+        self.assertEqual(reconcile_reaction_counters(), 0)
+        other.refresh_from_db()
+        self.assertEqual(other.like_count, 0)
+
+    def test_api_round_trip(self):
+        self.assertEqual(self.react(self.bob, post=self.target.id, reaction_type="support").status_code, 200)
+        self.assertEqual(self.counts(), (0, 1, 0))
+
+        response = api_client(self.bob).delete("/api/community/reactions/", {"post": self.target.id}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.counts(), (0, 0, 0))
+
+    def test_bad_targets_are_rejected(self):
+        for post in ("abc", 999999, None):
+            with self.subTest(post=post):
+                self.assertEqual(self.react(self.bob, post=post, reaction_type="like").status_code, 400)
+        self.assertEqual(self.react(self.bob, post=self.target.id, reaction_type="meh").status_code, 400)
+        self.assertEqual(api_client(self.bob).delete("/api/community/reactions/?post=abc").status_code, 400)
+
+    def test_private_posts_are_out_of_reach_for_outsiders(self):
+        secret = self.post("members only", self.private)
+
+        self.assertEqual(self.react(self.bob, post=secret.id, reaction_type="like").status_code, 400)
+        set_reaction(self.alice, secret, "like")
+        response = api_client(self.bob).delete("/api/community/reactions/", {"post": secret.id}, format="json")
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(PostReaction.objects.filter(post=secret).count(), 1)
+        self.assertEqual(self.react(self.alice, post=secret.id, reaction_type="support").status_code, 200)
+
+
+class PostCommentsTests(CommunityTestCase):
+    def setUp(self):
+        super().setUp()
+        self.target = self.post("discuss", self.public)
+        self.comments = [
+            PostComment.objects.create(post=self.target, user=self.bob, comment=f"c{i}") for i in range(5)
+        ]
+
+    def thread(self, user, post, **params):
+        return api_client(user).get(f"/api/community/posts/{post.id}/comments/", params)
+
+    def test_thread_reads_oldest_first_across_pages(self):
+        first = self.thread(self.alice, self.target, limit=3).data
+        second = self.thread(self.alice, self.target, limit=3, cursor=first["next_cursor"]).data
+
+        self.assertEqual(
+            [c["comment"] for c in first["results"] + second["results"]],
+            [c.comment for c in self.comments],
+        )
+        self.assertIsNone(second["next_cursor"])
+        self.assertEqual(self.thread(self.alice, self.target, cursor="junk").status_code, 400)
+
+    def test_latest_comments_per_post_in_one_query(self):
+        other = self.post("quiet", self.public)
+        empty = self.post("silent", self.public)
+        PostComment.objects.create(post=other, user=self.alice, comment="only")
+
+        with self.assertNumQueries(1):
+            previews = latest_comments([self.target.id, other.id, empty.id], 2)
+
+        self.assertEqual([c.comment for c in previews[self.target.id]], ["c3", "c4"])
+        self.assertEqual([c.comment for c in previews[other.id]], ["only"])
+        self.assertNotIn(empty.id, previews)
+        self.assertEqual(latest_comments([self.target.id], 0), {})
+
+    def test_private_threads_are_hidden_from_outsiders(self):
+        secret = self.post("members only", self.private)
+        PostComment.objects.create(post=secret, user=self.alice, comment="shh")
+
+        self.assertEqual(self.thread(self.bob, secret).status_code, 404)
+        self.assertEqual(self.thread(self.alice, secret).data["results"][0]["comment"], "shh")
+
+    def test_outsiders_cannot_comment_on_private_posts(self):
+        secret = self.post("members only", self.private)
+        add = "/api/community/comments/create/"
+
+        response = api_client(self.bob).post(add, {"post": secret.id, "comment": "let me in"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PostComment.objects.filter(post=secret).exists())
+
+        response = api_client(self.alice).post(add, {"post": secret.id, "comment": "welcome"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["user"], self.alice.id)
+
+
+class GroupDirectoryTests(CommunityTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hiking = CommunityGroup.objects.create(name="hiking Club", created_by=self.bob)
+        self.history = CommunityGroup.objects.create(name="History Buffs", created_by=self.bob)
+        GroupMember.objects.create(group=self.hiking, user=self.alice)
+        GroupMember.objects.create(group=self.hiking, user=self.bob)
+        self.post("trail", self.hiking)
+        self.post("gone", self.hiking, is_deleted=True)
+
+    def directory(self, user, **params):
+        return api_client(user).get("/api/community/groups/", params)
+
+    def names(self, response):
+        return [g["name"] for g in response.data["results"]]
+
+    def test_sorted_by_name_ignoring_case(self):
+        self.assertEqual(
+            self.names(self.directory(self.alice)),
+            ["hiking Club", "History Buffs", "Private", "Public"],
+        )
+
+    def test_prefix_search_ignores_case(self):
+        self.assertEqual(self.names(self.directory(self.alice, q="HI")), ["hiking Club", "History Buffs"])
+        self.assertEqual(self.names(self.directory(self.alice, q="hik")), ["hiking Club"])
+        self.assertEqual(self.names(self.directory(self.alice, q="%")), [])
+
+    def test_counts_and_membership(self):
+        groups = {g["name"]: g for g in self.directory(self.bob).data["results"]}
+
+        self.assertEqual(
+            (groups["hiking Club"]["member_count"], groups["hiking Club"]["post_count"]), (2, 1)
+        )
+        self.assertTrue(groups["hiking Club"]["is_member"])
+        self.assertFalse(groups["Public"]["is_member"])
+        self.assertEqual(groups["History Buffs"]["member_count"], 0)
+
+    def test_private_groups_only_listed_for_members(self):
+        self.assertNotIn("Private", self.names(self.directory(self.bob)))
+        self.assertNotIn("Private", self.names(self.directory(self.bob, q="pri")))
+        self.assertEqual(self.names(self.directory(self.alice, q="pri")), ["Private"])
+
+    def test_pages_cover_the_directory_once(self):
+        first = self.directory(self.alice, limit=3).data
+        second = self.directory(self.alice, limit=3, cursor=first["next_cursor"]).data
+
+        self.assertEqual(
+            [g["name"] for g in first["results"] + second["results"]],
+            ["hiking Club", "History Buffs", "Private", "Public"],
+        )
+        self.assertIsNone(second["next_cursor"])
+        self.assertEqual(self.directory(self.alice, cursor="junk").status_code, 400)
 
-# Create your tests here.
+    def test_one_query_per_page(self):
+        client = api_client(self.alice)
+        with self.assertNumQueries(1):
+            client.get("/api/community/groups/")
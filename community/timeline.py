@@ -0,0 +1,149 @@
+from itertools import islice
+
+from django.db import transaction
+
+from function.pagination import cursor_values, encode_cursor, keyset_filter
+
+from .feed import feed_queryset
+from .models import CommunityGroup, CommunityPost, GroupMember, TimelineEntry
+
+
+# Home timeline ("my feed"): posts from every group the user belongs to.
+# Hybrid: a post in a group of at most FANOUT_MAX_MEMBERS members is copied
+# into each member's TimelineEntry rows when it's created (fan-out on write);
+# posts of bigger groups stay fanned_out=False and are merged in at read time.
+
+FANOUT_MAX_MEMBERS = 500
+TIMELINE_PAGE_SIZE = 20
+FANOUT_BATCH_SIZE = 1000
+
+
+def fan_out_post(post):
+    """Copy a new group post into its members' timelines if the group is small. Returns True if it did."""
+    if not post.group_id:
+        return False
+    member_ids = list(
+        GroupMember.objects.filter(group_id=post.group_id)
+        .values_list("user_id", flat=True)[:FANOUT_MAX_MEMBERS + 1]
+    )
+    if len(member_ids) > FANOUT_MAX_MEMBERS:
+        return False
+
+    with transaction.atomic():
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=user_id, post=post, created_on=post.created_on) for user_id in member_ids],
+            batch_size=FANOUT_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        CommunityPost.objects.filter(id=post.id).update(fanned_out=True)
+    post.fanned_out = True
+    return True
+
+
+def timeline_page(user, cursor=None, page_size=TIMELINE_PAGE_SIZE):
+    """
+    One page of the user's home timeline, newest first: (posts, next_cursor).
+    Both sources are read with the same (created_on, id) keyset and merged,
+    so a page is three queries however many groups the user is in.
+    Raises InvalidCursor.
+    """
+    values = cursor_values(CommunityPost.objects.all(), ["-created_on", "-id"], cursor) if cursor else None
+
+    entries = TimelineEntry.objects.filter(user=user, post__is_deleted=False)
+    merged = CommunityPost.objects.filter(group__members__user=user, fanned_out=False, is_deleted=False)
+    if values:
+        entries = entries.filter(keyset_filter(["-created_on", "-post_id"], values))
+        merged = merged.filter(keyset_filter(["-created_on", "-id"], values))
+
+    candidates = set(entries.order_by("-created_on", "-post_id").values_list("created_on", "post_id")[:page_size + 1])
+    candidates |= set(merged.order_by("-created_on", "-id").values_list("created_on", "id")[:page_size + 1])
+
+    rows = sorted(candidates, reverse=True)[:page_size + 1]
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+
+    by_id = {p.id: p for p in feed_queryset(user).filter(id__in=[post_id for _, post_id in rows])}
+    posts = [by_id[post_id] for _, post_id in rows if post_id in by_id]
+    return posts, (encode_cursor(rows[-1]) if has_next else None)
+
+
+# -------------------------
+# Membership changes (community.signals)
+# -------------------------
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _merge_on_read(group_id):
+    """Drop a group's timeline entries; its posts are merged in at read time from now on."""
+    with transaction.atomic():
+        TimelineEntry.objects.filter(post__group_id=group_id).delete()
+        CommunityPost.objects.filter(group_id=group_id, fanned_out=True).update(fanned_out=False)
+
+
+def member_joined(group_id, user_id):
+    """
+    Copy the group's fanned-out posts into a new member's timeline. A group
+    that has grown past FANOUT_MAX_MEMBERS is switched to merge-on-read
+    instead, so its later posts aren't fanned out either.
+    """
+    fanned = CommunityPost.objects.filter(group_id=group_id, fanned_out=True)
+    if not fanned.exists():
+        return  # nothing was copied for this group (no posts, or merged on read)
+
+    if GroupMember.objects.filter(group_id=group_id)[:FANOUT_MAX_MEMBERS + 1].count() > FANOUT_MAX_MEMBERS:
+        _merge_on_read(group_id)
+        return
+
+    live = fanned.filter(is_deleted=False).values_list("id", "created_on")
+    entries = (
+        TimelineEntry(user_id=user_id, post_id=post_id, created_on=created_on)
+        for post_id, created_on in live.iterator()
+    )
+    for chunk in _chunks(entries, FANOUT_BATCH_SIZE):
+        TimelineEntry.objects.bulk_create(chunk, ignore_conflicts=True)
+
+
+def member_left(group_id, user_id):
+    """Remove a former member's copies of the group's posts."""
+    TimelineEntry.objects.filter(user_id=user_id, post__group_id=group_id).delete()
+
+
+# -------------------------
+# Backfill (existing posts / memberships)
+# -------------------------
+
+def backfill_timelines(group_ids=None, batch_size=FANOUT_BATCH_SIZE):
+    """
+    Bring timelines in line with current memberships: small groups get every
+    live post fanned out to every member, large groups are switched to
+    merge-on-read. Returns the number of entries written.
+    """
+    groups = CommunityGroup.objects.all()
+    if group_ids:
+        groups = groups.filter(id__in=group_ids)
+
+    written = 0
+    for group in groups.iterator():
+        member_ids = list(GroupMember.objects.filter(group=group).values_list("user_id", flat=True))
+        posts = CommunityPost.objects.filter(group=group)
+
+        if len(member_ids) > FANOUT_MAX_MEMBERS:
+            _merge_on_read(group.id)
+            continue
+
+        live = list(posts.filter(is_deleted=False).values_list("id", "created_on"))
+        entries = (
+            TimelineEntry(user_id=user_id, post_id=post_id, created_on=created_on)
+            for post_id, created_on in live
+            for user_id in member_ids
+        )
+        with transaction.atomic():
+            for chunk in _chunks(entries, batch_size):
+                TimelineEntry.objects.bulk_create(chunk, ignore_conflicts=True)
+                written += len(chunk)
+            posts.update(fanned_out=True)
+    return written
@@ -9,8 +9,10 @@ urlpatterns = [
     # Posts
     path("posts/create/", CreatePostAPIView.as_view(), name="community-post-create"),
     path("posts/", ListPostsAPIView.as_view(), name="community-post-list"),
+    path("feed/", MyFeedAPIView.as_view(), name="community-my-feed"),
 
     # Comments
+    path("posts/<int:post_id>/comments/", PostCommentsAPIView.as_view(), name="community-post-comments"),
     path("comments/create/", AddCommentAPIView.as_view(), name="community-comment-create"),
 
     # Reactions
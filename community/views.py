@@ -4,10 +4,37 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 
+from function.pagination import InvalidCursor, get_page_size
+
+from .comments import COMMENTS_PAGE_SIZE, MAX_COMMENTS_PREVIEW, comments_page, latest_comments
+from .directory import DIRECTORY_PAGE_SIZE, directory_page
+from .feed import FEED_PAGE_SIZE, feed_page, visible_posts
+from .reactions import set_reaction, remove_reaction
+from .timeline import TIMELINE_PAGE_SIZE, fan_out_post, timeline_page
 from .models import *
 from .serializers import *
 
 
+def _feed_response(request, posts, next_cursor):
+    """
+    Feed payload; ?comments_preview=N (up to MAX_COMMENTS_PREVIEW) embeds each
+    post's latest N comments, fetched for the whole page in one query.
+    """
+    results = FeedPostSerializer(posts, many=True).data
+    try:
+        preview = min(int(request.query_params.get("comments_preview", 0)), MAX_COMMENTS_PREVIEW)
+    except (TypeError, ValueError):
+        preview = 0
+
+    if preview > 0:
+        previews = latest_comments([p.id for p in posts], preview)
+        for post, data in zip(posts, results):
+            data["latest_comments"] = PostCommentSerializer(previews.get(post.id, []), many=True).data
+
+    return Response({"results": results, "next_cursor": next_cursor})
+
+
+
 class CreateCommunityGroupAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -30,8 +57,21 @@ class ListCommunityGroupsAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        groups = CommunityGroup.objects.all()
-        return Response(CommunityGroupSerializer(groups, many=True).data)
+        # ?q= name prefix search; private groups only show up for their members
+        try:
+            groups, next_cursor = directory_page(
+                request.user,
+                search=request.query_params.get("q"),
+                cursor=request.query_params.get("cursor"),
+                page_size=get_page_size(request, default=DIRECTORY_PAGE_SIZE),
+            )
+        except InvalidCursor as e:
+            return Response({"detail": str(e)}, status=400)
+
+        return Response({
+            "results": GroupDirectorySerializer(groups, many=True).data,
+            "next_cursor": next_cursor,
+        })
 
 
 
@@ -41,7 +81,8 @@ class CreatePostAPIView(APIView):
     def post(self, request):
         serializer = CommunityPostSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save(author=request.user)
+        post = serializer.save(author=request.user)
+        fan_out_post(post)
         return Response(serializer.data, status=201)
 
 
@@ -50,13 +91,68 @@ class ListPostsAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        group_id = request.query_params.get("group_id")
-        posts = CommunityPost.objects.filter(is_deleted=False)
+        # pinned first, then newest; one query per page whatever its size
+        try:
+            group_id = int(request.query_params.get("group_id") or 0) or None
+        except (TypeError, ValueError):
+            return Response({"detail": "group_id must be an integer."}, status=400)
+
+        try:
+            posts, next_cursor = feed_page(
+                request.user,
+                group_id=group_id,
+                cursor=request.query_params.get("cursor"),
+                page_size=get_page_size(request, default=FEED_PAGE_SIZE),
+            )
+        except InvalidCursor as e:
+            return Response({"detail": str(e)}, status=400)
+
+        return _feed_response(request, posts, next_cursor)
+
+
+class MyFeedAPIView(APIView):
+    """
+    GET /api/community/feed/?cursor=&limit=
+    Home timeline: newest posts from every group the caller belongs to.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            posts, next_cursor = timeline_page(
+                request.user,
+                cursor=request.query_params.get("cursor"),
+                page_size=get_page_size(request, default=TIMELINE_PAGE_SIZE),
+            )
+        except InvalidCursor as e:
+            return Response({"detail": str(e)}, status=400)
+
+        return _feed_response(request, posts, next_cursor)
+
 
-        if group_id:
-            posts = posts.filter(group_id=group_id)
 
-        return Response(CommunityPostSerializer(posts, many=True).data)
+class PostCommentsAPIView(APIView):
+    """
+    GET /api/community/posts/<post_id>/comments/?cursor=&limit=
+    A post's comments, oldest first (404 for posts the caller can't see).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, post_id):
+        post = get_object_or_404(visible_posts(request.user), id=post_id)
+        try:
+            comments, next_cursor = comments_page(
+                post,
+                cursor=request.query_params.get("cursor"),
+                page_size=get_page_size(request, default=COMMENTS_PAGE_SIZE),
+            )
+        except InvalidCursor as e:
+            return Response({"detail": str(e)}, status=400)
+
+        return Response({
+            "results": PostCommentSerializer(comments, many=True).data,
+            "next_cursor": next_cursor,
+        })
 
 
 
@@ -65,6 +161,8 @@ class AddCommentAPIView(APIView):
 
     def post(self, request):
         serializer = PostCommentSerializer(data=request.data)
+        # same visibility as the thread: no commenting on posts the caller can't read
+        serializer.fields["post"].queryset = visible_posts(request.user)
         serializer.is_valid(raise_exception=True)
         serializer.save(user=request.user)
         return Response(serializer.data, status=201)
@@ -76,12 +174,20 @@ class ReactPostAPIView(APIView):
 
     def post(self, request):
         serializer = PostReactionSerializer(data=request.data)
+        serializer.fields["post"].queryset = visible_posts(request.user)
         serializer.is_valid(raise_exception=True)
 
-        reaction, created = PostReaction.objects.update_or_create(
-            post=serializer.validated_data["post"],
-            user=request.user,
-            defaults={"reaction_type": serializer.validated_data["reaction_type"]},
+        set_reaction(
+            request.user,
+            serializer.validated_data["post"],
+            serializer.validated_data["reaction_type"],
         )
 
         return Response({"message": "Reaction saved"})
+
+    def delete(self, request):
+        serializer = ReactionTargetSerializer(data=request.data or request.query_params)
+        serializer.is_valid(raise_exception=True)
+        post = get_object_or_404(visible_posts(request.user), id=serializer.validated_data["post"])
+        remove_reaction(request.user, post)
+        return Response({"message": "Reaction removed"})
@@ -99,6 +99,17 @@ DATABASES = {
     }
 }
 
+# Version tokens of cached content (journey, budget meta), benchmark
+# summaries and trip exports live here, so every worker must share it:
+# point CACHE_BACKEND/CACHE_LOCATION at memcached or redis when running
+# more than one process.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -154,6 +165,10 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles', 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Trip real-time push: broker class behind trips.realtime (swap for a
+# cross-process implementation when running more than one ASGI worker)
+TRIPS_REALTIME_BROKER = "trips.realtime.InMemoryBroker"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
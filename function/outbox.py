@@ -0,0 +1,74 @@
+import logging
+from datetime import timedelta
+
+from django.core.mail import get_connection
+from django.db import transaction
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+# Outbox models (TripInviteNotification, BudgetShareNotification) share the
+# same shape: status (pending/sent/failed), attempts, next_attempt_at, sent_at.
+# A failed send is retried after RETRY_BASE_DELAY * 2^(attempts - 1), so a
+# broken address or a flaky SMTP server doesn't burn every attempt at once.
+
+RETRY_BASE_DELAY = timedelta(minutes=1)
+
+
+def next_attempt_at(attempts, now=None):
+    return (now or timezone.now()) + RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0)
+
+
+def deliver_outbox(queryset, build_messages, batch_size=100, max_attempts=5):
+    """
+    Deliver one batch of due outbox rows over a single SMTP connection.
+
+    queryset: the outbox model's rows (with any select_related the messages
+    need); build_messages(batch) returns {row.id: EmailMessage}, a missing or
+    None message marks the row failed (nothing to retry).
+
+    If the connection can't be opened the rows are left pending untouched and
+    0 is returned, so a polling worker sleeps instead of dying. Returns the
+    number of rows processed (0 = nothing due).
+    """
+    model = queryset.model
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            queryset.select_for_update(skip_locked=True, of=("self",))
+            .filter(status=model.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by("id")[:batch_size]
+        )
+        if not batch:
+            return 0
+
+        messages = build_messages(batch)
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception:
+            logger.exception("%s: could not open the mail connection", model._meta.label)
+            return 0
+
+        try:
+            for n in batch:
+                message = messages.get(n.id)
+                if message is None:
+                    n.status = model.STATUS_FAILED
+                    continue
+                n.attempts += 1
+                try:
+                    connection.send_messages([message])
+                    n.status = model.STATUS_SENT
+                    n.sent_at = now
+                except Exception:
+                    if n.attempts >= max_attempts:
+                        n.status = model.STATUS_FAILED
+                    else:
+                        n.next_attempt_at = next_attempt_at(n.attempts, now)
+        finally:
+            connection.close()
+
+        model.objects.bulk_update(batch, ["status", "attempts", "sent_at", "next_attempt_at"])
+    return len(batch)
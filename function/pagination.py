@@ -0,0 +1,120 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+# Keyset ("cursor") pagination helpers shared by the list endpoints.
+# A cursor is the opaque, url-safe encoding of the ordering values of a row.
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values):
+    raw = json.dumps([_plain(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    """Cursor string -> list of `size` ordering values (raises InvalidCursor)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise InvalidCursor("Invalid cursor.")
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor("Invalid cursor.")
+    return values
+
+
+def _ordering_field(qs, name):
+    if name in qs.query.annotations:
+        return qs.query.annotations[name].output_field
+    try:
+        return qs.model._meta.get_field(name)
+    except FieldDoesNotExist:
+        raise InvalidCursor("Invalid cursor.")
+
+
+def cursor_values(qs, ordering, cursor):
+    """
+    Decode a cursor for `ordering` over qs and convert every value with its
+    field's to_python(), so a tampered cursor raises InvalidCursor rather
+    than failing inside the ORM.
+    """
+    values = decode_cursor(cursor, len(ordering))
+    converted = []
+    for field, value in zip(ordering, values):
+        if value is None or isinstance(value, (list, dict)):
+            raise InvalidCursor("Invalid cursor.")
+        try:
+            converted.append(_ordering_field(qs, field.lstrip("-")).to_python(value))
+        except (ValidationError, TypeError, ValueError):
+            raise InvalidCursor("Invalid cursor.")
+    return converted
+
+
+def cursor_for(obj, ordering):
+    """Cursor pointing at obj for an ordering like ["-created_on", "-id"]."""
+    values = []
+    for field in ordering:
+        name = field.lstrip("-")
+        values.append(obj[name] if isinstance(obj, dict) else getattr(obj, name))
+    return encode_cursor(values)
+
+
+def keyset_filter(ordering, values, after=True):
+    """
+    Q matching rows strictly after (or before) the cursor position in `ordering`.
+    The last ordering field must be unique (normally "id"/"-id").
+    """
+    q = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip("-")
+        descending = field.startswith("-")
+        lookup = "lt" if descending == after else "gt"
+
+        step = Q(**{f"{name}__{lookup}": values[i]})
+        for prev_field, prev_value in zip(ordering[:i], values[:i]):
+            step &= Q(**{prev_field.lstrip("-"): prev_value})
+        q |= step
+    return q
+
+
+def get_page_size(request, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    try:
+        size = int(request.query_params.get("limit", default))
+    except (TypeError, ValueError):
+        size = default
+    return max(min(size, maximum), 1)
+
+
+def paginate_keyset(qs, ordering, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    One page of qs in `ordering`, starting after `cursor`.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    qs = qs.order_by(*ordering)
+    if cursor:
+        qs = qs.filter(keyset_filter(ordering, cursor_values(qs, ordering, cursor)))
+
+    rows = list(qs[:page_size + 1])
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    return rows, (cursor_for(rows[-1], ordering) if has_next else None)
@@ -1,6 +1,29 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Q
 from rest_framework.permissions import BasePermission
 
 
+PROVIDER_ROLE = "provider"
+
+
+def provider_users():
+    """Users that act as providers: role "provider" or a CulturalProvider profile."""
+    return get_user_model().objects.filter(Q(role=PROVIDER_ROLE) | Q(culturalprovider__isnull=False))
+
+
+def is_provider(user):
+    if not (user and user.is_authenticated):
+        return False
+    return provider_users().filter(pk=user.pk).exists()
+
+
 class IsAdminUserCustom(BasePermission):
     def has_permission(self, request, view):
         return bool(request.user and request.user.is_staff)
+
+
+class IsProvider(BasePermission):
+    message = "Only providers can do this."
+
+    def has_permission(self, request, view):
+        return is_provider(request.user)
@@ -0,0 +1,41 @@
+import uuid
+
+from django.core.cache import cache
+
+
+class VersionedMemo:
+    """
+    Process-wide memo of data built from admin-edited content.
+
+    A version token under `key` in the default cache is rotated on every
+    content change (see the apps' signals); each get() compares it with the
+    token the memo was built for and rebuilds when it moved. With more than
+    one worker the cache must be shared (settings.CACHES).
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self._memo = (None, {})  # (version, {name: data})
+
+    def version(self):
+        version = cache.get(self.key)
+        if version is None:
+            # first use (or evicted): any new token just forces a rebuild
+            cache.add(self.key, uuid.uuid4().hex, None)
+            version = cache.get(self.key)
+        return version
+
+    def bump(self):
+        cache.set(self.key, uuid.uuid4().hex, None)
+
+    def get(self, name, build):
+        """build(version) once per version; the result is shared by the process."""
+        version = self.version()
+        memo_version, data = self._memo
+        if memo_version != version:
+            # swap in a fresh dict; a build racing with the bump lands in the old one
+            data = {}
+            self._memo = (version, data)
+        if name not in data:
+            data[name] = build(version)
+        return data[name]
@@ -0,0 +1,152 @@
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count
+
+from function.versioning import VersionedMemo
+
+from .models import (
+    JourneyStage, GuidedExercise, ReadinessChecklistItem,
+    UserStageProgress, UserExerciseProgress, UserChecklistProgress
+)
+
+
+# Journey content (stages, exercises, emotions, resources, checklist) only
+# changes through admin edits, so it's built once per content version and
+# reused by the process; journey.signals bumps the version on every content
+# save/delete.
+
+CONTENT = VersionedMemo("journey:content_version")
+
+
+def bump_content_version():
+    CONTENT.bump()
+
+
+def cached_content(name, build):
+    """Process-wide memo of build() for the current content version."""
+    return CONTENT.get(name, lambda version: build())
+
+
+def _build_overview_stages():
+    from .serializers import JourneyStageContentSerializer
+
+    stages = JourneyStage.objects.filter(is_active=True).order_by("number")
+    return JourneyStageContentSerializer(stages, many=True).data
+
+
+def overview_stages():
+    return cached_content("overview", _build_overview_stages)
+
+
+def _build_stage_detail(number):
+    from .serializers import StageContentSerializer
+
+    stage = (
+        JourneyStage.objects.filter(number=number, is_active=True)
+        .prefetch_related("exercises", "emotions", "resources", "checklist_items")
+        .first()
+    )
+    return StageContentSerializer(stage).data if stage else None
+
+
+def stage_detail(number):
+    """Cached stage content (no user state), or None if missing/inactive."""
+    return cached_content(f"stage:{number}", lambda: _build_stage_detail(number))
+
+
+def _build_stage_totals():
+    totals = {}
+    for model in (GuidedExercise, ReadinessChecklistItem):
+        for stage_id, n in model.objects.order_by().values_list("stage").annotate(n=Count("id")):
+            totals[stage_id] = totals.get(stage_id, 0) + n
+    return totals
+
+
+def stage_item_totals():
+    """{stage_id: exercises + checklist items}, the denominator of stage percent."""
+    return cached_content("totals", _build_stage_totals)
+
+
+# -------------------------
+# Offline bundle (all active stage content in one document)
+# -------------------------
+
+def _build_bundle(version):
+    from .serializers import StageContentSerializer
+
+    stages = StageContentSerializer(
+        JourneyStage.objects.filter(is_active=True)
+        .order_by("number")
+        .prefetch_related("exercises", "emotions", "resources", "checklist_items"),
+        many=True,
+    ).data
+
+    # everything but the closing per-request base_url member; the gzip
+    # stream is kept open after the head so each request only compresses
+    # its own tail
+    head = json.dumps(
+        {"version": version, "stages": stages}, cls=DjangoJSONEncoder, separators=(",", ":")
+    ).encode()[:-1]
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    return {
+        "etag": f'"{version}"',
+        "head": head,
+        "gzip_head": compressor.compress(head),
+        "compressor": compressor,
+    }
+
+
+def content_bundle(base_url):
+    """
+    {"etag", "body", "gzip"}: the serialized bundle and its gzip encoding.
+    Stage content is built once per content version; only the trailing
+    "base_url" (what the relative resource file_url values resolve
+    against) is added per request.
+    """
+    bundle = CONTENT.get("bundle", _build_bundle)
+    tail = b',"base_url":' + json.dumps(base_url).encode() + b"}"
+    compressor = bundle["compressor"].copy()
+    return {
+        "etag": bundle["etag"],
+        "body": bundle["head"] + tail,
+        "gzip": bundle["gzip_head"] + compressor.compress(tail) + compressor.flush(),
+    }
+
+
+EMPTY_PROGRESS = {"percent_complete": 0, "is_completed": False}
+
+
+def stage_progress_map(user, stage_ids=None):
+    """{stage_id: progress payload} for all of the user's stages in one query."""
+    qs = UserStageProgress.objects.filter(user=user)
+    if stage_ids is not None:
+        qs = qs.filter(stage_id__in=stage_ids)
+    return {
+        stage_id: {"percent_complete": percent, "is_completed": bool(completed_at)}
+        for stage_id, percent, completed_at in qs.values_list("stage_id", "percent_complete", "completed_at")
+    }
+
+
+def user_stage_state(user, stage_id):
+    """
+    The user's progress, completed exercise ids and checked checklist item ids
+    for one stage: three indexed queries, however many items the stage has.
+    """
+    p = UserStageProgress.objects.filter(user=user, stage_id=stage_id).values_list(
+        "percent_complete", "completed_at"
+    ).first()
+    progress = {"percent_complete": p[0], "is_completed": bool(p[1])} if p else EMPTY_PROGRESS
+
+    completed = set(
+        UserExerciseProgress.objects.filter(
+            user=user, exercise__stage_id=stage_id, is_completed=True
+        ).values_list("exercise_id", flat=True)
+    )
+    checked = set(
+        UserChecklistProgress.objects.filter(
+            user=user, item__stage_id=stage_id, is_checked=True
+        ).values_list("item_id", flat=True)
+    )
+    return progress, completed, checked
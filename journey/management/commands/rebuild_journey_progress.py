@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from journey.progress import rebuild_stage_progress
+
+
+class Command(BaseCommand):
+    help = "Recount journey stage done counters/percent from exercise and checklist progress."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", dest="user_ids", help="Only this user id (repeatable).")
+
+    def handle(self, *args, **options):
+        written = rebuild_stage_progress(user_ids=options["user_ids"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} stage progress row(s)."))
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.10 on 2026-10-19 03:25
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.utils import timezone
+
+
+def backfill_done_count(apps, schema_editor):
+    # existing rows start at 0; recount them from the exercise/checklist rows
+    # (same derivation as journey.progress.rebuild_stage_progress)
+    GuidedExercise = apps.get_model("journey", "GuidedExercise")
+    ReadinessChecklistItem = apps.get_model("journey", "ReadinessChecklistItem")
+    UserStageProgress = apps.get_model("journey", "UserStageProgress")
+    UserExerciseProgress = apps.get_model("journey", "UserExerciseProgress")
+    UserChecklistProgress = apps.get_model("journey", "UserChecklistProgress")
+
+    totals = Counter()
+    for model in (GuidedExercise, ReadinessChecklistItem):
+        for stage_id, n in model.objects.order_by().values_list("stage").annotate(n=Count("id")):
+            totals[stage_id] += n
+
+    done = Counter()
+    for user_id, stage_id in UserExerciseProgress.objects.filter(is_completed=True).values_list(
+        "user_id", "exercise__stage_id"
+    ):
+        done[(user_id, stage_id)] += 1
+    for user_id, stage_id in UserChecklistProgress.objects.filter(is_checked=True).values_list(
+        "user_id", "item__stage_id"
+    ):
+        done[(user_id, stage_id)] += 1
+
+    now = timezone.now()
+
+    def derive(p, count):
+        total = totals[p.stage_id]
+        p.done_count = count
+        p.percent_complete = max(p.percent_complete, min(100, count * 100 // total) if total else 0)
+        p.completed_at = (p.completed_at or now) if p.percent_complete >= 100 else None
+
+    existing = []
+    for p in UserStageProgress.objects.all().iterator():
+        derive(p, done.pop((p.user_id, p.stage_id), 0))
+        existing.append(p)
+
+    missing = []
+    for (user_id, stage_id), count in done.items():
+        p = UserStageProgress(user_id=user_id, stage_id=stage_id, percent_complete=0)
+        derive(p, count)
+        missing.append(p)
+
+    UserStageProgress.objects.bulk_update(existing, ["done_count", "percent_complete", "completed_at"], batch_size=500)
+    UserStageProgress.objects.bulk_create(missing, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journey', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstageprogress',
+            name='done_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_done_count, migrations.RunPython.noop),
+    ]
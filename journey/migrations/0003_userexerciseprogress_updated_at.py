@@ -0,0 +1,19 @@
+# Generated by Django 5.2.10 on 2026-10-19 03:27
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journey', '0002_userstageprogress_done_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userexerciseprogress',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
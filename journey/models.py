@@ -107,6 +107,8 @@ class UserStageProgress(models.Model):
     stage = models.ForeignKey(JourneyStage, on_delete=models.CASCADE, related_name="user_progress")
 
     percent_complete = models.PositiveIntegerField(default=0)  # 0..100
+    # completed exercises + checked checklist items, kept by journey.progress
+    done_count = models.PositiveIntegerField(default=0)
     started_at = models.DateTimeField(default=timezone.now)
     completed_at = models.DateTimeField(null=True, blank=True)
 
@@ -123,6 +125,7 @@ class UserExerciseProgress(models.Model):
 
     is_completed = models.BooleanField(default=False)
     completed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(default=timezone.now)  # last state change (sync conflict resolution)
 
     class Meta:
         unique_together = ("user", "exercise")
@@ -0,0 +1,268 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.db.models.lookups import GreaterThanOrEqual
+from django.utils import timezone
+
+from .content import EMPTY_PROGRESS, stage_item_totals, stage_progress_map
+from .models import (
+    GuidedExercise, ReadinessChecklistItem,
+    UserStageProgress, UserExerciseProgress, UserChecklistProgress,
+)
+
+
+# Stage progress engine.
+# UserStageProgress.done_count counts the user's completed exercises + checked
+# checklist items; toggles move it by +/-1 instead of recounting. Percent rule
+# (same for exercises and checklist items):
+#   percent_complete = max(stored percent, done * 100 // total)   # keep highest
+#   completed_at     = set when percent reaches 100, cleared below 100
+
+
+def percent_for(done, total):
+    return min(100, done * 100 // total) if total else 0
+
+
+def apply_stage_delta(user, stage_id, delta, now=None):
+    """
+    Move the user's done counter for a stage by `delta` and re-derive
+    percent/completed_at in the same UPDATE. Creates the row on first write.
+    """
+    if not delta:
+        return
+    now = now or timezone.now()
+    total = stage_item_totals().get(stage_id, 0)
+
+    done = Greatest(F("done_count") + delta, Value(0))
+    updates = {"done_count": done}
+    if total:
+        percent = Greatest(F("percent_complete"), Least((F("done_count") + delta) * 100 / total, Value(100)))
+        updates["percent_complete"] = percent
+        updates["completed_at"] = Case(
+            When(GreaterThanOrEqual(percent, 100), then=Coalesce(F("completed_at"), Value(now))),
+            default=Value(None),
+        )
+
+    qs = UserStageProgress.objects.filter(user=user, stage_id=stage_id)
+    if qs.update(**updates):
+        return
+
+    initial = max(delta, 0)
+    percent = percent_for(initial, total)
+    try:
+        with transaction.atomic():
+            UserStageProgress.objects.create(
+                user=user,
+                stage_id=stage_id,
+                done_count=initial,
+                percent_complete=percent,
+                completed_at=now if percent >= 100 else None,
+            )
+    except IntegrityError:
+        # created concurrently - apply to that row instead
+        qs.update(**updates)
+
+
+def _set_flag(model, lookup, flag, value, on_change):
+    """
+    Write a user's exercise/checklist flag; returns True if it actually changed.
+    Flipping an existing row is a single conditional UPDATE.
+    """
+    changed = model.objects.filter(**lookup).exclude(**{flag: value}).update(**{flag: value}, **on_change)
+    if not changed and value:
+        _, changed = model.objects.get_or_create(**lookup, defaults={flag: True, **on_change})
+    return bool(changed)
+
+
+def set_exercise_completed(user, exercise, is_completed, now=None):
+    now = now or timezone.now()
+    with transaction.atomic():
+        changed = _set_flag(
+            UserExerciseProgress,
+            {"user": user, "exercise": exercise},
+            "is_completed", is_completed,
+            {"completed_at": now if is_completed else None, "updated_at": now},
+        )
+        if changed:
+            apply_stage_delta(user, exercise.stage_id, 1 if is_completed else -1, now)
+    return changed
+
+
+def set_checklist_checked(user, item, is_checked, now=None):
+    now = now or timezone.now()
+    with transaction.atomic():
+        changed = _set_flag(
+            UserChecklistProgress,
+            {"user": user, "item": item},
+            "is_checked", is_checked,
+            {"updated_at": now},
+        )
+        if changed:
+            apply_stage_delta(user, item.stage_id, 1 if is_checked else -1, now)
+    return changed
+
+
+# -------------------------
+# Batch sync (offline clients replaying queued toggles)
+# -------------------------
+
+# kind -> (item model, progress model, item FK name, flag)
+_SYNC_KINDS = {
+    "exercises": (GuidedExercise, UserExerciseProgress, "exercise", "is_completed"),
+    "checklist": (ReadinessChecklistItem, UserChecklistProgress, "item", "is_checked"),
+}
+
+
+def _latest_per_item(changes):
+    # several queued toggles of the same item: only the newest one matters
+    latest = {}
+    for change in changes:
+        current = latest.get(change["id"])
+        if current is None or change["updated_at"] >= current["updated_at"]:
+            latest[change["id"]] = change
+    return latest
+
+
+def _sync_kind(user, kind, changes, now, deltas):
+    """
+    Apply one kind of change (last writer wins on updated_at) with one
+    bulk_create + one bulk_update. Returns (state rows, unknown ids);
+    stage counter deltas are accumulated into `deltas`.
+    """
+    item_model, model, fk, flag = _SYNC_KINDS[kind]
+    latest = _latest_per_item(changes)
+    stages = dict(item_model.objects.filter(id__in=latest).values_list("id", "stage_id"))
+    unknown = sorted(set(latest) - set(stages))
+
+    existing = {
+        getattr(row, f"{fk}_id"): row
+        for row in model.objects.select_for_update().filter(user=user, **{f"{fk}_id__in": stages})
+    }
+
+    to_create, to_update = [], []
+    for item_id, stage_id in stages.items():
+        change = latest[item_id]
+        value = change["value"]
+        stamp = min(change["updated_at"], now)  # don't let a fast client clock lock the row
+        row = existing.get(item_id)
+
+        if row is None:
+            row = model(user=user, **{f"{fk}_id": item_id, flag: value, "updated_at": stamp})
+            if kind == "exercises":
+                row.completed_at = stamp if value else None
+            existing[item_id] = row
+            to_create.append(row)
+            if value:
+                deltas[stage_id] += 1
+            continue
+
+        if row.updated_at >= stamp:
+            continue  # the server already has a newer write
+
+        if getattr(row, flag) != value:
+            deltas[stage_id] += 1 if value else -1
+        setattr(row, flag, value)
+        row.updated_at = stamp
+        if kind == "exercises":
+            row.completed_at = stamp if value else None
+        to_update.append(row)
+
+    model.objects.bulk_create(to_create)
+    fields = [flag, "updated_at"] + (["completed_at"] if kind == "exercises" else [])
+    model.objects.bulk_update(to_update, fields)
+
+    for stage_id in stages.values():
+        deltas.setdefault(stage_id, 0)
+
+    state = [
+        {"id": item_id, flag: getattr(existing[item_id], flag), "updated_at": existing[item_id].updated_at}
+        for item_id in sorted(stages)
+    ]
+    return state, unknown
+
+
+def sync_progress(user, exercises=(), checklist=(), now=None):
+    """
+    Apply a batch of offline exercise/checklist changes ({"id", "value",
+    "updated_at"}) in one transaction. Stage counters are adjusted once per
+    affected stage. Returns the reconciled state of every item sent plus the
+    progress of the affected stages.
+    """
+    now = now or timezone.now()
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                deltas = Counter()
+                exercise_state, unknown_exercises = _sync_kind(user, "exercises", exercises, now, deltas)
+                checklist_state, unknown_items = _sync_kind(user, "checklist", checklist, now, deltas)
+                for stage_id, delta in deltas.items():
+                    apply_stage_delta(user, stage_id, delta, now)
+            break
+        except IntegrityError:
+            # a concurrent toggle created one of our rows; the retry sees it
+            if attempt:
+                raise
+
+    progress = stage_progress_map(user, deltas)
+    return {
+        "exercises": exercise_state,
+        "checklist": checklist_state,
+        "stages": [
+            {"stage_id": stage_id, **progress.get(stage_id, EMPTY_PROGRESS)}
+            for stage_id in sorted(deltas)
+        ],
+        "unknown": {"exercises": unknown_exercises, "checklist": unknown_items},
+    }
+
+
+# -------------------------
+# Rebuild (repair counters from the per-item rows)
+# -------------------------
+
+def rebuild_stage_progress(user_ids=None, batch_size=500):
+    """
+    Recount done_count for every (user, stage) from the exercise/checklist
+    rows and re-derive percent/completed_at. Returns rows written.
+    """
+    ex = UserExerciseProgress.objects.filter(is_completed=True)
+    ck = UserChecklistProgress.objects.filter(is_checked=True)
+    rows = UserStageProgress.objects.only("user_id", "stage_id", "percent_complete", "completed_at")
+    if user_ids:
+        ex, ck, rows = ex.filter(user_id__in=user_ids), ck.filter(user_id__in=user_ids), rows.filter(user_id__in=user_ids)
+
+    done = Counter()
+    for user_id, stage_id in ex.values_list("user_id", "exercise__stage_id"):
+        done[(user_id, stage_id)] += 1
+    for user_id, stage_id in ck.values_list("user_id", "item__stage_id"):
+        done[(user_id, stage_id)] += 1
+
+    totals = stage_item_totals()
+    now = timezone.now()
+
+    def derive(p, count):
+        p.done_count = count
+        p.percent_complete = max(p.percent_complete, percent_for(count, totals.get(p.stage_id, 0)))
+        if p.percent_complete >= 100:
+            p.completed_at = p.completed_at or now
+        else:
+            p.completed_at = None
+
+    existing = []
+    for p in rows.iterator():
+        derive(p, done.pop((p.user_id, p.stage_id), 0))
+        existing.append(p)
+
+    missing = []
+    for (user_id, stage_id), count in done.items():
+        p = UserStageProgress(user_id=user_id, stage_id=stage_id)
+        derive(p, count)
+        missing.append(p)
+
+    with transaction.atomic():
+        UserStageProgress.objects.bulk_update(
+            existing, ["done_count", "percent_complete", "completed_at"], batch_size=batch_size
+        )
+        UserStageProgress.objects.bulk_create(missing, batch_size=batch_size, ignore_conflicts=True)
+    return len(existing) + len(missing)
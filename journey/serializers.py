@@ -1,42 +1,23 @@
 from rest_framework import serializers
 from django.utils import timezone
-from .models import (
-    JourneyStage, GuidedExercise, EmotionTopic, StageResource, ReadinessChecklistItem,
-    UserStageProgress, UserExerciseProgress, UserChecklistProgress
-)
+from .models import JourneyStage, GuidedExercise, EmotionTopic, StageResource, ReadinessChecklistItem
 
 
-class JourneyStageListSerializer(serializers.ModelSerializer):
-    progress = serializers.SerializerMethodField()
+class JourneyStageContentSerializer(serializers.ModelSerializer):
+    """Overview card content only (cached process-wide by journey.content)."""
 
     class Meta:
         model = JourneyStage
         fields = [
             "id", "number", "title", "subtitle", "description",
             "bullet_1", "bullet_2", "bullet_3",
-            "progress"
         ]
 
-    def get_progress(self, stage):
-        user = self.context["request"].user
-        p = UserStageProgress.objects.filter(user=user, stage=stage).first()
-        return {
-            "percent_complete": p.percent_complete if p else 0,
-            "is_completed": bool(p and p.completed_at),
-        }
-
-
-class GuidedExerciseSerializer(serializers.ModelSerializer):
-    user_status = serializers.SerializerMethodField()
 
+class GuidedExerciseContentSerializer(serializers.ModelSerializer):
     class Meta:
         model = GuidedExercise
-        fields = ["id", "title", "duration_minutes", "content", "sort_order", "user_status"]
-
-    def get_user_status(self, obj):
-        user = self.context["request"].user
-        p = UserExerciseProgress.objects.filter(user=user, exercise=obj).first()
-        return {"is_completed": bool(p and p.is_completed)}
+        fields = ["id", "title", "duration_minutes", "content", "sort_order"]
 
 
 class EmotionTopicSerializer(serializers.ModelSerializer):
@@ -62,58 +43,34 @@ class StageResourceSerializer(serializers.ModelSerializer):
         return None
 
 
-class ChecklistItemSerializer(serializers.ModelSerializer):
-    user_status = serializers.SerializerMethodField()
-
+class ChecklistItemContentSerializer(serializers.ModelSerializer):
     class Meta:
         model = ReadinessChecklistItem
-        fields = ["id", "text", "hint", "sort_order", "user_status"]
-
-    def get_user_status(self, obj):
-        user = self.context["request"].user
-        p = UserChecklistProgress.objects.filter(user=user, item=obj).first()
-        return {"is_checked": bool(p and p.is_checked)}
+        fields = ["id", "text", "hint", "sort_order"]
 
 
-class StageDetailSerializer(serializers.ModelSerializer):
-    progress = serializers.SerializerMethodField()
-    exercises = serializers.SerializerMethodField()
+class StageContentSerializer(serializers.ModelSerializer):
+    """
+    Stage detail without any per-user state (cached process-wide by
+    journey.content; resource file_url is left relative).
+    Expects exercises/emotions/resources/checklist_items to be prefetched.
+    """
+    exercises = GuidedExerciseContentSerializer(many=True, read_only=True)
     emotions = EmotionTopicSerializer(many=True, read_only=True)
-    resources = serializers.SerializerMethodField()
-    checklist_items = serializers.SerializerMethodField()
+    resources = StageResourceSerializer(many=True, read_only=True)
+    checklist_items = ChecklistItemContentSerializer(many=True, read_only=True)
 
     class Meta:
         model = JourneyStage
         fields = [
             "id", "number", "title", "subtitle", "description",
             "bullet_1", "bullet_2", "bullet_3",
-            "progress",
             "exercises",
             "emotions",
             "resources",
             "checklist_items",
         ]
 
-    def get_progress(self, stage):
-        user = self.context["request"].user
-        p = UserStageProgress.objects.filter(user=user, stage=stage).first()
-        return {
-            "percent_complete": p.percent_complete if p else 0,
-            "is_completed": bool(p and p.completed_at),
-        }
-
-    def get_exercises(self, stage):
-        qs = stage.exercises.all()
-        return GuidedExerciseSerializer(qs, many=True, context=self.context).data
-
-    def get_resources(self, stage):
-        qs = stage.resources.all()
-        return StageResourceSerializer(qs, many=True, context=self.context).data
-
-    def get_checklist_items(self, stage):
-        qs = stage.checklist_items.all()
-        return ChecklistItemSerializer(qs, many=True, context=self.context).data
-
 
 class UpdateStageProgressSerializer(serializers.Serializer):
     percent_complete = serializers.IntegerField(min_value=0, max_value=100)
@@ -125,3 +82,23 @@ class ToggleExerciseSerializer(serializers.Serializer):
 
 class ToggleChecklistSerializer(serializers.Serializer):
     is_checked = serializers.BooleanField()
+
+
+class SyncExerciseChangeSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    is_completed = serializers.BooleanField()
+    updated_at = serializers.DateTimeField()  # when the change was made on the device
+
+
+class SyncChecklistChangeSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    is_checked = serializers.BooleanField()
+    updated_at = serializers.DateTimeField()
+
+
+MAX_SYNC_CHANGES = 500  # per list; clients with a longer queue sync in chunks
+
+
+class ProgressSyncSerializer(serializers.Serializer):
+    exercises = SyncExerciseChangeSerializer(many=True, required=False, max_length=MAX_SYNC_CHANGES)
+    checklist = SyncChecklistChangeSerializer(many=True, required=False, max_length=MAX_SYNC_CHANGES)
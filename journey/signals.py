@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+
+from .content import bump_content_version
+from .models import JourneyStage, GuidedExercise, EmotionTopic, StageResource, ReadinessChecklistItem
+
+
+CONTENT_MODELS = (JourneyStage, GuidedExercise, EmotionTopic, StageResource, ReadinessChecklistItem)
+
+
+def journey_content_changed(sender, **kwargs):
+    bump_content_version()
+
+
+for _model in CONTENT_MODELS:
+    post_save.connect(journey_content_changed, sender=_model, dispatch_uid=f"journey_content_saved_{_model.__name__}")
+    post_delete.connect(journey_content_changed, sender=_model, dispatch_uid=f"journey_content_deleted_{_model.__name__}")
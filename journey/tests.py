@@ -1,3 +1,340 @@
+import gzip
+import json
+from datetime import timedelta
+from urllib.parse import urljoin
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import (
+    JourneyStage, GuidedExercise, ReadinessChecklistItem, StageResource,
+    UserStageProgress, UserExerciseProgress, UserChecklistProgress
+)
+from .progress import rebuild_stage_progress, set_exercise_completed, sync_progress
+
+
+class SyncProgressTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="a@example.com", password="x")
+        self.stage = JourneyStage.objects.create(number=1, title="Stage 1")
+        self.exercises = [
+            GuidedExercise.objects.create(stage=self.stage, title=f"E{i}", content="c", sort_order=i)
+            for i in range(2)
+        ]
+        self.items = [
+            ReadinessChecklistItem.objects.create(stage=self.stage, text=f"C{i}", sort_order=i)
+            for i in range(2)
+        ]
+        self.now = timezone.now()
+
+    def at(self, minutes):
+        return self.now + timedelta(minutes=minutes)
+
+    def progress(self):
+        return UserStageProgress.objects.get(user=self.user, stage=self.stage)
+
+    def test_applies_changes_and_updates_stage_counter(self):
+        result = sync_progress(
+            self.user,
+            exercises=[{"id": self.exercises[0].id, "value": True, "updated_at": self.at(-5)}],
+            checklist=[{"id": item.id, "value": True, "updated_at": self.at(-5)} for item in self.items],
+            now=self.now,
+        )
+
+        self.assertEqual(result["stages"], [{"stage_id": self.stage.id, "percent_complete": 75, "is_completed": False}])
+        self.assertEqual(self.progress().done_count, 3)
+        self.assertTrue(UserExerciseProgress.objects.get(user=self.user, exercise=self.exercises[0]).is_completed)
+        self.assertEqual(UserChecklistProgress.objects.filter(user=self.user, is_checked=True).count(), 2)
+
+    def test_newest_of_repeated_changes_wins(self):
+        exercise_id = self.exercises[0].id
+        result = sync_progress(
+            self.user,
+            exercises=[
+                {"id": exercise_id, "value": True, "updated_at": self.at(-2)},
+                {"id": exercise_id, "value": False, "updated_at": self.at(-5)},
+            ],
+            now=self.now,
+        )
+
+        self.assertTrue(result["exercises"][0]["is_completed"])
+        self.assertEqual(self.progress().done_count, 1)
+
+    def test_stale_change_does_not_override_newer_server_write(self):
+        set_exercise_completed(self.user, self.exercises[0], True)
+
+        result = sync_progress(
+            self.user,
+            exercises=[{"id": self.exercises[0].id, "value": False, "updated_at": self.at(-10)}],
+        )
+
+        self.assertTrue(result["exercises"][0]["is_completed"])
+        self.assertEqual(self.progress().done_count, 1)
+
+    def test_future_timestamp_is_clamped_to_now(self):
+        sync_progress(
+            self.user,
+            exercises=[{"id": self.exercises[0].id, "value": True, "updated_at": self.at(600)}],
+            now=self.now,
+        )
+
+        row = UserExerciseProgress.objects.get(user=self.user, exercise=self.exercises[0])
+        self.assertEqual(row.updated_at, self.now)
+
+    def test_unknown_ids_are_reported(self):
+        result = sync_progress(
+            self.user,
+            exercises=[{"id": 99999, "value": True, "updated_at": self.at(-1)}],
+            now=self.now,
+        )
+
+        self.assertEqual(result["unknown"], {"exercises": [99999], "checklist": []})
+        self.assertEqual(result["stages"], [])
+
+    def test_percent_keeps_its_highest_value(self):
+        all_done = [{"id": e.id, "value": True, "updated_at": self.at(-5)} for e in self.exercises]
+        checked = [{"id": i.id, "value": True, "updated_at": self.at(-5)} for i in self.items]
+        sync_progress(self.user, exercises=all_done, checklist=checked, now=self.now)
+        self.assertIsNotNone(self.progress().completed_at)
+
+        undone = [{"id": e.id, "value": False, "updated_at": self.at(-1)} for e in self.exercises]
+        sync_progress(self.user, exercises=undone, now=self.now)
+
+        progress = self.progress()
+        self.assertEqual(progress.done_count, 2)
+        self.assertEqual(progress.percent_complete, 100)
+        self.assertIsNotNone(progress.completed_at)
+
+    def test_rebuild_matches_synced_counters(self):
+        sync_progress(
+            self.user,
+            exercises=[{"id": self.exercises[1].id, "value": True, "updated_at": self.at(-5)}],
+            checklist=[{"id": self.items[0].id, "value": True, "updated_at": self.at(-5)}],
+            now=self.now,
+        )
+        UserStageProgress.objects.update(done_count=0)
+
+        rebuild_stage_progress()
+
+        self.assertEqual(self.progress().done_count, 2)
+
+
+class ProgressSyncAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(email="a@example.com", password="x"))
+
+    def test_rejects_malformed_changes(self):
+        response = self.client.post("/api/journey/progress/sync/", {"exercises": [{"id": 1}]}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+class JourneyOverviewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="a@example.com", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.stages = [JourneyStage.objects.create(number=n, title=f"Stage {n}") for n in range(1, 4)]
+        UserStageProgress.objects.create(user=self.user, stage=self.stages[1], percent_complete=40)
+
+    def overview(self):
+        return self.client.get("/api/journey/stages/").data
+
+    def test_merges_the_callers_progress_into_cached_cards(self):
+        data = self.overview()
+
+        self.assertEqual([s["number"] for s in data], [1, 2, 3])
+        self.assertEqual(data[1]["progress"], {"percent_complete": 40, "is_completed": False})
+        self.assertEqual(data[0]["progress"], {"percent_complete": 0, "is_completed": False})
+
+    def test_warm_overview_is_one_query(self):
+        self.overview()
+        with self.assertNumQueries(1):
+            self.overview()
+
+    def test_content_edits_show_up_immediately(self):
+        self.overview()
+
+        self.stages[2].title = "Renamed"
+        self.stages[2].save()
+        self.stages[0].is_active = False
+        self.stages[0].save()
+
+        data = self.overview()
+        self.assertEqual([s["title"] for s in data], ["Stage 2", "Renamed"])
+
+
+class StageDetailTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="a@example.com", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.stage = JourneyStage.objects.create(number=1, title="Stage 1")
+        self.exercises = [
+            GuidedExercise.objects.create(stage=self.stage, title=f"E{i}", content="c", sort_order=i) for i in range(3)
+        ]
+        self.items = [
+            ReadinessChecklistItem.objects.create(stage=self.stage, text=f"C{i}", sort_order=i) for i in range(3)
+        ]
+        StageResource.objects.create(stage=self.stage, resource_type="download", title="R", file="journey/r.pdf")
+
+    def detail(self, number=1):
+        return self.client.get(f"/api/journey/stages/{number}/")
+
+    def test_marks_the_callers_completed_and_checked_items(self):
+        UserExerciseProgress.objects.create(user=self.user, exercise=self.exercises[1], is_completed=True)
+        UserChecklistProgress.objects.create(user=self.user, item=self.items[2], is_checked=True)
+
+        data = self.detail().data
+
+        self.assertEqual([e["user_status"]["is_completed"] for e in data["exercises"]], [False, True, False])
+        self.assertEqual([c["user_status"]["is_checked"] for c in data["checklist_items"]], [False, False, True])
+        self.assertEqual(data["progress"], {"percent_complete": 0, "is_completed": False})
+
+    def test_warm_detail_is_three_queries_and_writes_nothing(self):
+        self.detail()
+        with self.assertNumQueries(3):
+            self.detail()
+        self.assertFalse(UserStageProgress.objects.exists())
+
+    def test_resource_file_url_is_absolute(self):
+        resource = self.detail().data["resources"][0]
+        self.assertTrue(resource["file_url"].startswith("http://testserver/"))
+        self.assertTrue(resource["file_url"].endswith("journey/r.pdf"))
+
+    def test_missing_or_inactive_stage_is_404(self):
+        self.assertEqual(self.detail(99).status_code, 404)
+
+        self.stage.is_active = False
+        self.stage.save()
+        self.assertEqual(self.detail().status_code, 404)
+
+
+class IncrementalStagePercentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="a@example.com", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.stage = JourneyStage.objects.create(number=1, title="Stage 1")
+        self.exercises = [
+            GuidedExercise.objects.create(stage=self.stage, title=f"E{i}", content="c", sort_order=i) for i in range(2)
+        ]
+        self.items = [
+            ReadinessChecklistItem.objects.create(stage=self.stage, text=f"C{i}", sort_order=i) for i in range(2)
+        ]
+
+    def toggle_exercise(self, exercise, value):
+        return self.client.post(f"/api/journey/exercises/{exercise.id}/toggle/", {"is_completed": value}, format="json")
+
+    def toggle_item(self, item, value):
+        return self.client.post(f"/api/journey/checklist/{item.id}/toggle/", {"is_checked": value}, format="json")
+
+    def progress(self):
+        return UserStageProgress.objects.get(user=self.user, stage=self.stage)
+
+    def test_toggles_move_the_counter_by_one(self):
+        self.toggle_exercise(self.exercises[0], True)
+        self.toggle_item(self.items[0], True)
+
+        progress = self.progress()
+        self.assertEqual((progress.done_count, progress.percent_complete), (2, 50))
+        self.assertIsNone(progress.completed_at)
+
+    def test_repeating_a_toggle_does_not_count_twice(self):
+        self.toggle_exercise(self.exercises[0], True)
+        self.toggle_exercise(self.exercises[0], True)
+        self.toggle_item(self.items[0], False)  # never checked: no change
+
+        self.assertEqual(self.progress().done_count, 1)
+
+    def test_completion_is_stamped_at_one_hundred_percent(self):
+        for exercise in self.exercises:
+            self.toggle_exercise(exercise, True)
+        for item in self.items:
+            self.toggle_item(item, True)
+
+        progress = self.progress()
+        self.assertEqual((progress.done_count, progress.percent_complete), (4, 100))
+        self.assertIsNotNone(progress.completed_at)
+
+    def test_untoggling_keeps_the_highest_percent(self):
+        self.toggle_exercise(self.exercises[0], True)
+        self.toggle_exercise(self.exercises[1], True)
+        self.toggle_exercise(self.exercises[0], False)
+
+        progress = self.progress()
+        self.assertEqual((progress.done_count, progress.percent_complete), (1, 50))
+
+    def test_toggle_cost_does_not_grow_with_the_stage(self):
+        def toggle_queries(value):
+            with CaptureQueriesContext(connection) as queries:
+                self.toggle_exercise(self.exercises[0], value)
+            return len(queries)
+
+        self.toggle_exercise(self.exercises[0], True)
+        self.toggle_exercise(self.exercises[1], True)  # progress row exists, totals cached
+        small = toggle_queries(False)
+
+        self.toggle_exercise(self.exercises[0], True)
+        for i in range(10):
+            GuidedExercise.objects.create(stage=self.stage, title=f"X{i}", content="c", sort_order=10 + i)
+        self.toggle_exercise(self.exercises[1], False)  # re-warm the totals after the content change
+
+        self.assertEqual(toggle_queries(False), small)
+
+
+class JourneyBundleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(email="a@example.com", password="x"))
+        for n in (1, 2):
+            stage = JourneyStage.objects.create(number=n, title=f"Stage {n}")
+            GuidedExercise.objects.create(stage=stage, title=f"E{n}", content="c")
+        StageResource.objects.create(stage=stage, resource_type="download", title="R", file="journey/r.pdf")
+
+    def bundle(self, **headers):
+        return self.client.get("/api/journey/bundle/", headers=headers)
+
+    def test_gzip_and_plain_bodies_match(self):
+        plain = self.bundle()
+        compressed = self.bundle(accept_encoding="gzip")
+
+        self.assertEqual(compressed["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertIn("Accept-Encoding", plain["Vary"])
+
+        data = json.loads(plain.content)
+        self.assertEqual([s["number"] for s in data["stages"]], [1, 2])
+        self.assertEqual(data["stages"][1]["exercises"][0]["title"], "E2")
+
+    def test_resource_urls_resolve_against_base_url(self):
+        data = json.loads(self.bundle().content)
+        resource = data["stages"][1]["resources"][0]
+
+        self.assertEqual(data["base_url"], "http://testserver/")
+        self.assertEqual(
+            urljoin(data["base_url"], resource["file_url"]),
+            self.client.get("/api/journey/stages/2/").data["resources"][0]["file_url"],
+        )
+
+    def test_etag_revalidates_until_content_changes(self):
+        etag = self.bundle()["ETag"]
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.bundle(if_none_match=etag).status_code, 304)
 
-# Create your tests here.
+        JourneyStage.objects.filter(number=1).first().save()
+        response = self.bundle(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
@@ -5,6 +5,9 @@ urlpatterns = [
     # Overview page (6 cards + progress bar)
     path("stages/", views.JourneyOverviewAPIView.as_view()),
 
+    # All stage content in one versioned download (offline use)
+    path("bundle/", views.JourneyBundleAPIView.as_view()),
+
     # Stage detail page
     path("stages/<int:stage_number>/", views.StageDetailAPIView.as_view()),
 
@@ -14,4 +17,7 @@ urlpatterns = [
     # Toggle completion
     path("exercises/<int:exercise_id>/toggle/", views.ToggleExerciseCompletionAPIView.as_view()),
     path("checklist/<int:item_id>/toggle/", views.ToggleChecklistItemAPIView.as_view()),
+
+    # Batch replay of offline toggles
+    path("progress/sync/", views.ProgressSyncAPIView.as_view()),
 ]
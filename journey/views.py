@@ -1,17 +1,18 @@
 from django.utils import timezone
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_vary_headers
 from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 
-from .models import (
-    JourneyStage, GuidedExercise, ReadinessChecklistItem,
-    UserStageProgress, UserExerciseProgress, UserChecklistProgress
-)
+from .models import JourneyStage, GuidedExercise, ReadinessChecklistItem, UserStageProgress
+from .content import EMPTY_PROGRESS, content_bundle, overview_stages, stage_detail, stage_progress_map, user_stage_state
+from .progress import set_exercise_completed, set_checklist_checked, sync_progress
 from .serializers import (
-    JourneyStageListSerializer, StageDetailSerializer,
-    UpdateStageProgressSerializer, ToggleExerciseSerializer, ToggleChecklistSerializer
+    UpdateStageProgressSerializer, ToggleExerciseSerializer, ToggleChecklistSerializer,
+    ProgressSyncSerializer,
 )
 
 
@@ -24,17 +25,73 @@ class JourneyOverviewAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        stages = JourneyStage.objects.filter(is_active=True).order_by("number")
-        return Response(JourneyStageListSerializer(stages, many=True, context={"request": request}).data)
+        # stage cards come from the process-wide content cache; the user's
+        # progress for every stage is one query
+        stages = overview_stages()
+        progress = stage_progress_map(request.user)
+        return Response([
+            {**stage, "progress": progress.get(stage["id"], EMPTY_PROGRESS)}
+            for stage in stages
+        ])
+
+
+class JourneyBundleAPIView(APIView):
+    """
+    GET /api/journey/bundle/
+    Every active stage with its full content, for clients that keep the
+    journey offline. Resource file_url values are relative; "base_url" is
+    the absolute URL they resolve against (stage detail returns them
+    already resolved). The ETag
+    changes only when journey content is edited, so a client revalidates
+    with If-None-Match and gets 304 until then.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        bundle = content_bundle(request.build_absolute_uri("/"))
+
+        if request.headers.get("If-None-Match") == bundle["etag"]:
+            response = HttpResponse(status=304)
+        elif "gzip" in request.headers.get("Accept-Encoding", ""):
+            response = HttpResponse(bundle["gzip"], content_type="application/json")
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(bundle["body"], content_type="application/json")
+
+        response["ETag"] = bundle["etag"]
+        response["Cache-Control"] = "private, no-cache"
+        patch_vary_headers(response, ["Accept-Encoding"])
+        return response
+
+
+STAGE_DETAIL_LISTS = ("exercises", "emotions", "resources", "checklist_items")
 
 
 class StageDetailAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, stage_number: int):
-        stage = get_object_or_404(JourneyStage, number=stage_number, is_active=True)
-        _ensure_stage_progress(request.user, stage)
-        return Response(StageDetailSerializer(stage, context={"request": request}).data)
+        # content is cached; per-user state is a fixed 3 queries. No progress
+        # row is created here - the first toggle/progress write does that.
+        content = stage_detail(stage_number)
+        if content is None:
+            raise Http404
+        progress, completed, checked = user_stage_state(request.user, content["id"])
+
+        data = {k: v for k, v in content.items() if k not in STAGE_DETAIL_LISTS}
+        data["progress"] = progress
+        data["exercises"] = [
+            {**e, "user_status": {"is_completed": e["id"] in completed}} for e in content["exercises"]
+        ]
+        data["emotions"] = content["emotions"]
+        data["resources"] = [
+            {**r, "file_url": request.build_absolute_uri(r["file_url"]) if r["file_url"] else None}
+            for r in content["resources"]
+        ]
+        data["checklist_items"] = [
+            {**c, "user_status": {"is_checked": c["id"] in checked}} for c in content["checklist_items"]
+        ]
+        return Response(data)
 
 
 class UpdateStageProgressAPIView(APIView):
@@ -66,78 +123,60 @@ class ToggleExerciseCompletionAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, exercise_id: int):
-        exercise = get_object_or_404(GuidedExercise, id=exercise_id)
-        stage = exercise.stage
+        exercise = get_object_or_404(GuidedExercise.objects.only("id", "stage_id"), id=exercise_id)
 
         serializer = ToggleExerciseSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         is_completed = serializer.validated_data["is_completed"]
 
-        obj, _ = UserExerciseProgress.objects.get_or_create(user=request.user, exercise=exercise)
-        obj.is_completed = is_completed
-        obj.completed_at = timezone.now() if is_completed else None
-        obj.save()
-
-        # OPTIONAL: auto-recompute stage percent from exercises+checklist
-        self._recompute_stage_percent(request.user, stage)
+        set_exercise_completed(request.user, exercise, is_completed)
 
         return Response({
             "exercise_id": exercise.id,
-            "is_completed": obj.is_completed,
+            "is_completed": is_completed,
         }, status=200)
 
-    def _recompute_stage_percent(self, user, stage):
-        exercises = stage.exercises.count()
-        checklist = stage.checklist_items.count()
-        total = exercises + checklist
-        if total == 0:
-            return
-
-        done_ex = UserExerciseProgress.objects.filter(user=user, exercise__stage=stage, is_completed=True).count()
-        done_ck = UserChecklistProgress.objects.filter(user=user, item__stage=stage, is_checked=True).count()
-        percent = int(((done_ex + done_ck) / total) * 100)
-
-        prog = _ensure_stage_progress(user, stage)
-        prog.percent_complete = max(prog.percent_complete, percent)  # keep highest
-        if prog.percent_complete >= 100 and not prog.completed_at:
-            prog.completed_at = timezone.now()
-        prog.save()
-
 
 class ToggleChecklistItemAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, item_id: int):
-        item = get_object_or_404(ReadinessChecklistItem, id=item_id)
-        stage = item.stage
+        item = get_object_or_404(ReadinessChecklistItem.objects.only("id", "stage_id"), id=item_id)
 
         serializer = ToggleChecklistSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         is_checked = serializer.validated_data["is_checked"]
 
-        obj, _ = UserChecklistProgress.objects.get_or_create(user=request.user, item=item)
-        obj.is_checked = is_checked
-        obj.updated_at = timezone.now()
-        obj.save()
-
-        # OPTIONAL: same recompute logic
-        exercises = stage.exercises.count()
-        checklist = stage.checklist_items.count()
-        total = exercises + checklist
-        if total > 0:
-            done_ex = UserExerciseProgress.objects.filter(user=request.user, exercise__stage=stage, is_completed=True).count()
-            done_ck = UserChecklistProgress.objects.filter(user=request.user, item__stage=stage, is_checked=True).count()
-            percent = int(((done_ex + done_ck) / total) * 100)
-
-            prog = _ensure_stage_progress(request.user, stage)
-            prog.percent_complete = max(prog.percent_complete, percent)
-            if prog.percent_complete >= 100 and not prog.completed_at:
-                prog.completed_at = timezone.now()
-            if prog.percent_complete < 100:
-                prog.completed_at = None
-            prog.save()
+        set_checklist_checked(request.user, item, is_checked)
 
         return Response({
             "item_id": item.id,
-            "is_checked": obj.is_checked
+            "is_checked": is_checked
         }, status=200)
+
+
+class ProgressSyncAPIView(APIView):
+    """
+    POST /api/journey/progress/sync/
+    Replay toggles queued offline in one request. Each change carries the
+    device time it was made; the newest write per item wins.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = ProgressSyncSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        result = sync_progress(
+            request.user,
+            exercises=[
+                {"id": c["id"], "value": c["is_completed"], "updated_at": c["updated_at"]}
+                for c in data.get("exercises", [])
+            ],
+            checklist=[
+                {"id": c["id"], "value": c["is_checked"], "updated_at": c["updated_at"]}
+                for c in data.get("checklist", [])
+            ],
+        )
+        return Response(result, status=200)
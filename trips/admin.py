@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Trip, TripMember, TripDay, TripActivity, ActivityMessage, ActivityReaction
+from .models import (
+    Trip, TripMember, TripDay, TripActivity, ActivityMessage, ActivityReaction, TripChange,
+    TripInviteNotification,
+)
 
 admin.site.register(Trip)
 admin.site.register(TripMember)
@@ -7,3 +10,5 @@ admin.site.register(TripDay)
 admin.site.register(TripActivity)
 admin.site.register(ActivityMessage)
 admin.site.register(ActivityReaction)
+admin.site.register(TripChange)
+admin.site.register(TripInviteNotification)
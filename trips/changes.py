@@ -0,0 +1,162 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import (
+    Trip, TripMember, TripDay, TripActivity, ActivityMessage, ActivityReaction, TripChange
+)
+from .realtime import publish_trip_changes
+from .serializers import (
+    TripDaySerializer, TripActivitySerializer, ActivityMessageSerializer,
+    ActivityReactionSerializer, TripMemberSerializer,
+)
+
+
+# max change-log rows consumed per /changes/ call (client loops while has_more)
+CHANGES_PAGE_SIZE = 500
+
+
+def record_changes(trip_id, changes):
+    """
+    Append (entity, entity_id, op) tuples to the trip change log.
+    Trip.version is bumped once for the whole batch (the UPDATE also
+    serializes concurrent writers on the trip row). Returns the new version.
+    """
+    changes = list(changes)
+    if not changes:
+        return None
+
+    with transaction.atomic():
+        Trip.objects.filter(id=trip_id).update(version=F("version") + len(changes))
+        version = Trip.objects.filter(id=trip_id).values_list("version", flat=True).first()
+        if version is None:
+            return None
+
+        first = version - len(changes) + 1
+        rows = [
+            (first + i, entity, entity_id, op)
+            for i, (entity, entity_id, op) in enumerate(changes)
+        ]
+        TripChange.objects.bulk_create([
+            TripChange(trip_id=trip_id, version=v, entity=entity, entity_id=entity_id, op=op)
+            for v, entity, entity_id, op in rows
+        ])
+        publish_trip_changes(trip_id, version, rows)
+    return version
+
+
+def record_change(trip_id, entity, entity_id, op=TripChange.OP_UPSERT):
+    batch = _current_batch.get()
+    if batch is not None and batch.trip_id == trip_id:
+        batch.add(entity, entity_id, op)
+        return None
+    return record_changes(trip_id, [(entity, entity_id, op)])
+
+
+class ChangeBatch:
+    def __init__(self, trip_id):
+        self.trip_id = trip_id
+        self.changes = []
+        self.version = None
+
+    def add(self, entity, entity_id, op=TripChange.OP_UPSERT):
+        self.changes.append((entity, entity_id, op))
+
+
+_current_batch = ContextVar("trip_change_batch", default=None)
+
+
+@contextmanager
+def collect_changes(trip_id):
+    """
+    Group every change made to the trip inside the block (signals included)
+    into one record_changes() call, i.e. one version bump and one push event.
+    Use for bulk_create/bulk_update, which don't send signals: batch.add() them.
+    """
+    batch = ChangeBatch(trip_id)
+    token = _current_batch.set(batch)
+    try:
+        yield batch
+    finally:
+        _current_batch.reset(token)
+    batch.version = record_changes(trip_id, batch.changes)
+
+
+# -------------------------
+# Delta feed
+# -------------------------
+
+def _activities_payload(ids):
+    qs = (
+        TripActivity.objects.filter(id__in=ids)
+        .select_related("created_by")
+        .annotate(
+            likes_count=Count("reactions", distinct=True),
+            comments_count=Count("messages", distinct=True),
+        )
+    )
+    return TripActivitySerializer(qs, many=True).data
+
+
+# response key -> (entity, loader(ids) -> serialized rows)
+_ENTITY_LOADERS = {
+    "members": (
+        TripChange.ENTITY_MEMBER,
+        lambda ids: TripMemberSerializer(TripMember.objects.filter(id__in=ids).select_related("user"), many=True).data,
+    ),
+    "days": (
+        TripChange.ENTITY_DAY,
+        lambda ids: TripDaySerializer(TripDay.objects.filter(id__in=ids), many=True).data,
+    ),
+    "activities": (TripChange.ENTITY_ACTIVITY, _activities_payload),
+    "messages": (
+        TripChange.ENTITY_MESSAGE,
+        lambda ids: ActivityMessageSerializer(ActivityMessage.objects.filter(id__in=ids).select_related("user"), many=True).data,
+    ),
+    "reactions": (
+        TripChange.ENTITY_REACTION,
+        lambda ids: ActivityReactionSerializer(ActivityReaction.objects.filter(id__in=ids), many=True).data,
+    ),
+}
+
+
+def build_delta(trip, since, limit=CHANGES_PAGE_SIZE):
+    """
+    Everything that changed in the trip after `since`, collapsed to the latest
+    state per entity. Deletes come back as ids under "deleted"; children removed
+    by a cascade (e.g. activities of a deleted day) are implied by their parent.
+    """
+    rows = list(
+        TripChange.objects.filter(trip=trip, version__gt=since)
+        .order_by("version")
+        .values_list("version", "entity", "entity_id", "op")[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    latest = {}
+    for _, entity, entity_id, op in rows:
+        latest[(entity, entity_id)] = op
+
+    changes, deleted = {}, {}
+    for key, (entity, loader) in _ENTITY_LOADERS.items():
+        upsert_ids = {i for (e, i), op in latest.items() if e == entity and op == TripChange.OP_UPSERT}
+        deleted_ids = {i for (e, i), op in latest.items() if e == entity and op == TripChange.OP_DELETE}
+
+        data = loader(upsert_ids) if upsert_ids else []
+        # upserted but gone by now (deleted after this page's window)
+        deleted_ids |= upsert_ids - {row["id"] for row in data}
+
+        changes[key] = data
+        deleted[key] = sorted(deleted_ids)
+
+    return {
+        "trip_id": trip.id,
+        "since": since,
+        "version": rows[-1][0] if rows else max(since, trip.version),
+        "has_more": has_more,
+        "changes": changes,
+        "deleted": deleted,
+    }
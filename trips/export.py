@@ -0,0 +1,177 @@
+import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.utils.html import escape
+
+from .models import TripDay, TripActivity
+
+
+# Rendered exports are cached per trip version, so every member downloading
+# the same itinerary after the first one is served from cache.
+EXPORT_CACHE_TIMEOUT = 60 * 60 * 24
+EXPORT_KINDS = {
+    "ics": ("text/calendar; charset=utf-8", "ics"),
+    "print": ("text/html; charset=utf-8", "html"),
+}
+
+
+def _export_fingerprint(trip, kind):
+    # trip header fields aren't part of the change log, so fold them in
+    header = f"{trip.title}|{trip.destination}|{trip.start_date}|{trip.end_date}"
+    digest = hashlib.md5(header.encode()).hexdigest()[:8]
+    return f"{trip.id}-{trip.version}-{digest}-{kind}"
+
+
+def export_cache_key(trip, kind):
+    return f"trips:export:{_export_fingerprint(trip, kind)}"
+
+
+def export_etag(trip, kind):
+    return f'"{_export_fingerprint(trip, kind)}"'
+
+
+def _load_itinerary(trip):
+    days = list(TripDay.objects.filter(trip=trip).order_by("day_number"))
+    by_day = {d.id: [] for d in days}
+    for a in TripActivity.objects.filter(trip=trip).order_by("day__day_number", "sort_order", "start_time", "id"):
+        by_day[a.day_id].append(a)
+    return [(d, by_day[d.id]) for d in days]
+
+
+def _day_date(trip, day):
+    if day.date:
+        return day.date
+    if trip.start_date:
+        return trip.start_date + timedelta(days=day.day_number - 1)
+    return None
+
+
+# -------------------------
+# ICS (RFC 5545)
+# -------------------------
+
+def _ics_escape(value):
+    return (
+        (value or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _ics_line(line):
+    # fold at 75 octets
+    raw = line.encode("utf-8")
+    if len(raw) <= 75:
+        return line + "\r\n"
+    parts, chunk = [], b""
+    for ch in line:
+        b = ch.encode("utf-8")
+        if len(chunk) + len(b) > (75 if not parts else 74):
+            parts.append(chunk.decode("utf-8"))
+            chunk = b""
+        chunk += b
+    parts.append(chunk.decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def iter_ics(trip):
+    yield _ics_line("BEGIN:VCALENDAR")
+    yield _ics_line("VERSION:2.0")
+    yield _ics_line("PRODID:-//Our Roots//Trip Itinerary//EN")
+    yield _ics_line("CALSCALE:GREGORIAN")
+    yield _ics_line(f"X-WR-CALNAME:{_ics_escape(trip.title)}")
+
+    for day, activities in _load_itinerary(trip):
+        date = _day_date(trip, day)
+        if not date:
+            continue  # undated days can't be placed on a calendar
+        for a in activities:
+            stamp = a.created_at.astimezone(dt_timezone.utc)
+            lines = [
+                "BEGIN:VEVENT",
+                f"UID:trip{trip.id}-activity{a.id}@ourroots",
+                f"DTSTAMP:{stamp.strftime('%Y%m%dT%H%M%SZ')}",
+            ]
+            if a.start_time:
+                start = datetime.combine(date, a.start_time)
+                lines.append(f"DTSTART:{start.strftime('%Y%m%dT%H%M%S')}")
+                lines.append("DURATION:PT1H")
+            else:
+                lines.append(f"DTSTART;VALUE=DATE:{date.strftime('%Y%m%d')}")
+            lines.append(f"SUMMARY:{_ics_escape(a.title)}")
+            if a.location_name:
+                lines.append(f"LOCATION:{_ics_escape(a.location_name)}")
+            desc = f"Day {day.day_number}" + (f" - {day.title}" if day.title else "")
+            lines.append(f"DESCRIPTION:{_ics_escape(desc)}")
+            lines.append("END:VEVENT")
+            yield "".join(_ics_line(line) for line in lines)
+
+    yield _ics_line("END:VCALENDAR")
+
+
+# -------------------------
+# Printable document (HTML, print-to-PDF from the browser/app)
+# -------------------------
+
+def iter_print_html(trip):
+    dates = ""
+    if trip.start_date:
+        dates = f"{trip.start_date:%b %d, %Y}" + (f" &ndash; {trip.end_date:%b %d, %Y}" if trip.end_date else "")
+
+    yield (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+        f"<title>{escape(trip.title)}</title>"
+        "<style>body{font-family:Arial,sans-serif;margin:32px;color:#222}"
+        "h1{margin-bottom:4px}.meta{color:#666;margin-bottom:24px}"
+        "h2{border-bottom:1px solid #ddd;padding-bottom:4px;page-break-after:avoid}"
+        "ul{list-style:none;padding:0}li{padding:6px 0}"
+        ".time{display:inline-block;width:80px;color:#555}.loc{color:#777}"
+        "@media print{body{margin:0}}</style></head><body>"
+        f"<h1>{escape(trip.title)}</h1>"
+        f"<div class=\"meta\">{escape(trip.destination)}{' &middot; ' if trip.destination and dates else ''}{dates}</div>"
+    )
+
+    for day, activities in _load_itinerary(trip):
+        date = _day_date(trip, day)
+        heading = f"Day {day.day_number}"
+        if day.title:
+            heading += f" &middot; {escape(day.title)}"
+        if date:
+            heading += f" <small>({date:%a, %b %d})</small>"
+
+        items = []
+        for a in activities:
+            time = a.start_time.strftime("%I:%M %p") if a.start_time else ""
+            loc = f" <span class=\"loc\">&mdash; {escape(a.location_name)}</span>" if a.location_name else ""
+            items.append(f"<li><span class=\"time\">{time}</span>{escape(a.title)}{loc}</li>")
+        yield f"<h2>{heading}</h2><ul>{''.join(items) or '<li>No activities planned.</li>'}</ul>"
+
+    yield "</body></html>"
+
+
+_RENDERERS = {
+    "ics": iter_ics,
+    "print": iter_print_html,
+}
+
+
+def iter_export(trip, kind):
+    """
+    Stream the rendered export. A cache hit replays the stored document;
+    a miss renders chunk by chunk and stores the result once it's complete.
+    """
+    key = export_cache_key(trip, kind)
+    cached = cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    chunks = []
+    for chunk in _RENDERERS[kind](trip):
+        chunks.append(chunk)
+        yield chunk
+    cache.set(key, "".join(chunks), EXPORT_CACHE_TIMEOUT)
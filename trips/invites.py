@@ -0,0 +1,112 @@
+from email.utils import formataddr
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from function.outbox import deliver_outbox
+
+from .changes import collect_changes
+from .models import TripMember, TripChange, TripInviteNotification
+
+
+MAX_INVITES_PER_REQUEST = 200
+
+
+def bulk_invite(trip, inviter, user_ids=(), emails=()):
+    """
+    Invite many users (by id and/or email) with a fixed number of queries:
+    one user lookup, one membership lookup, one bulk insert, one re-read.
+    Notifications are queued in the outbox, not sent here.
+    Returns (pending invites, {"user_ids": [...], "emails": [...]} not found).
+    """
+    User = get_user_model()
+    user_ids = {uid for uid in user_ids if uid != inviter.id}
+    emails = {e.strip() for e in emails if e and e.strip()}
+    lowered = {e.lower() for e in emails}
+
+    users = list(
+        User.objects.annotate(email_l=Lower("email"))
+        .filter(Q(id__in=user_ids) | Q(email_l__in=lowered))
+        .exclude(id=inviter.id)
+        .only("id", "email")
+    )
+    found_emails = {u.email.lower() for u in users}
+    not_found = {
+        "user_ids": sorted(user_ids - {u.id for u in users}),
+        "emails": sorted(e for e in emails if e.lower() not in found_emails and e.lower() != inviter.email.lower()),
+    }
+
+    target_ids = {u.id for u in users}
+    with transaction.atomic():
+        existing = set(
+            TripMember.objects.filter(trip=trip, user_id__in=target_ids).values_list("user_id", flat=True)
+        )
+        new_ids = target_ids - existing
+
+        with collect_changes(trip.id) as batch:
+            TripMember.objects.bulk_create(
+                [
+                    TripMember(
+                        trip=trip,
+                        user_id=uid,
+                        role=TripMember.ROLE_EDITOR,  # default: editor
+                        status=TripMember.STATUS_INVITED,
+                        invited_by=inviter,
+                    )
+                    for uid in new_ids
+                ],
+                ignore_conflicts=True,  # a concurrent invite/join of the same user wins
+            )
+
+            invites = list(
+                TripMember.objects.filter(trip=trip, user_id__in=target_ids)
+                .exclude(status=TripMember.STATUS_ACCEPTED)
+                .select_related("user")
+                .order_by("id")
+            )
+            created = [m for m in invites if m.user_id in new_ids and m.invited_by_id == inviter.id]
+            for m in created:
+                batch.add(TripChange.ENTITY_MEMBER, m.id)
+
+        TripInviteNotification.objects.bulk_create(
+            [TripInviteNotification(member=m) for m in created]
+        )
+
+    return invites, not_found
+
+
+# -------------------------
+# Outbox delivery
+# -------------------------
+
+def _invite_email(member):
+    trip = member.trip
+    inviter = member.invited_by
+    inviter_name = (getattr(inviter, "full_name", "") or getattr(inviter, "email", "")) if inviter else "Someone"
+    body = (
+        f"{inviter_name} invited you to plan \"{trip.title}\" together on Our Roots.\n\n"
+        f"Open the app to accept the invite."
+    )
+    return EmailMessage(
+        subject=f"You're invited to {trip.title}",
+        body=body,
+        from_email=formataddr(("Our Roots", settings.EMAIL_HOST_USER)),
+        to=[member.user.email],
+    )
+
+
+def send_pending_invite_notifications(batch_size=100, max_attempts=5):
+    """
+    Deliver one batch of due invite notifications (see deliver_outbox()).
+    Returns the number of rows processed (0 = nothing due).
+    """
+    return deliver_outbox(
+        TripInviteNotification.objects.select_related("member__trip", "member__user", "member__invited_by"),
+        lambda batch: {n.id: _invite_email(n.member) for n in batch},
+        batch_size=batch_size,
+        max_attempts=max_attempts,
+    )
@@ -0,0 +1,183 @@
+from django.db import transaction
+
+from .changes import collect_changes
+from .models import Trip, TripDay, TripActivity, TripChange
+
+
+class ItineraryError(ValueError):
+    def __init__(self, message, op_index=None):
+        super().__init__(message)
+        self.op_index = op_index
+
+
+class _Itinerary:
+    """
+    In-memory copy of a trip's plan: day_number -> ordered list of activities.
+    Operations edit the lists; flush() writes only what moved.
+    """
+
+    def __init__(self, trip):
+        self.trip = trip
+        self.days = {d.day_number: d for d in TripDay.objects.filter(trip=trip)}
+        self.plan = {number: [] for number in self.days}
+        self.activities = {}
+        self.original = {}  # id -> (day_id, sort_order)
+
+        # default ordering = how the trip is displayed, so dense renumbering keeps it
+        for a in TripActivity.objects.filter(trip=trip).select_related("day"):
+            self.plan[a.day.day_number].append(a)
+            self.activities[a.id] = a
+            self.original[a.id] = (a.day_id, a.sort_order)
+
+        self.new_days = []
+        self.created = []
+        self.deleted = []
+        self.touched = set()
+
+    def _day(self, number):
+        if number not in self.days:
+            day = TripDay(trip=self.trip, day_number=number)
+            self.days[number] = day
+            self.plan[number] = []
+            self.new_days.append(day)
+        return self.days[number]
+
+    def _activity(self, activity_id):
+        activity = self.activities.get(activity_id)
+        if activity is None:
+            raise ItineraryError(f"Activity {activity_id} is not part of this trip.")
+        return activity
+
+    def _insert(self, number, activity, sort_order):
+        items = self.plan[number]
+        position = len(items) if sort_order is None else min(sort_order - 1, len(items))
+        items.insert(position, activity)
+        self.touched.add(number)
+
+    def _remove(self, activity):
+        for number, items in self.plan.items():
+            if activity in items:
+                items.remove(activity)
+                self.touched.add(number)
+                return
+
+    def create(self, op, user):
+        day = self._day(op["day"])
+        activity = TripActivity(
+            trip=self.trip,
+            day=day,
+            title=op["title"],
+            location_name=op.get("location_name", ""),
+            start_time=op.get("start_time"),
+            created_by=user,
+        )
+        self.created.append((op.get("client_id"), activity))
+        self._insert(op["day"], activity, op.get("sort_order"))
+
+    def move(self, op):
+        activity = self._activity(op["id"])
+        self._remove(activity)
+        activity.day = self._day(op["day"])
+        self._insert(op["day"], activity, op.get("sort_order"))
+
+    def reorder(self, op):
+        number = op["day"]
+        if number not in self.plan:
+            raise ItineraryError(f"Day {number} does not exist.")
+        if len(set(op["ids"])) != len(op["ids"]):
+            raise ItineraryError("ids must not contain duplicates.")
+        items = self.plan[number]
+        listed = [self._activity(i) for i in op["ids"]]
+        if any(a not in items for a in listed):
+            raise ItineraryError(f"ids must all belong to day {number}.")
+        # listed ids first, in that order; anything not listed keeps its relative order after them
+        self.plan[number] = listed + [a for a in items if a not in listed]
+        self.touched.add(number)
+
+    def delete(self, op):
+        activity = self._activity(op["id"])
+        self._remove(activity)
+        del self.activities[activity.id]
+        self.deleted.append(activity.id)
+
+    def flush(self, batch):
+        if self.new_days:
+            TripDay.objects.bulk_create(self.new_days)
+            for day in self.new_days:
+                batch.add(TripChange.ENTITY_DAY, day.id)
+
+        # renumber touched days densely (1..n)
+        for number in self.touched:
+            for i, activity in enumerate(self.plan[number], start=1):
+                activity.sort_order = i
+                activity.day = self.days[number]  # re-bind so day_id is set for new days
+
+        if self.deleted:
+            # signals (collected into the same batch) record the tombstones
+            TripActivity.objects.filter(id__in=self.deleted).delete()
+
+        new_activities = [a for _, a in self.created]
+        if new_activities:
+            TripActivity.objects.bulk_create(new_activities)
+            for a in new_activities:
+                batch.add(TripChange.ENTITY_ACTIVITY, a.id)
+
+        dirty = [
+            a for a in self.activities.values()
+            if self.original[a.id] != (a.day_id, a.sort_order)
+        ]
+        if dirty:
+            TripActivity.objects.bulk_update(dirty, ["day", "sort_order"])
+            for a in dirty:
+                batch.add(TripChange.ENTITY_ACTIVITY, a.id)
+
+    def ordering(self):
+        return [
+            {
+                "day_id": self.days[number].id,
+                "day_number": number,
+                "activity_ids": [a.id for a in self.plan[number]],
+            }
+            for number in sorted(self.plan)
+        ]
+
+
+def apply_itinerary_operations(trip, operations, user):
+    """
+    Apply create/move/reorder/delete operations to the trip's activities in one
+    transaction. Returns {"version", "days": ordering, "created": {client_id: id}}.
+    Raises ItineraryError (nothing is written) if any operation is invalid.
+    """
+    with transaction.atomic():
+        # serialize concurrent batch edits of the same trip
+        Trip.objects.select_for_update().filter(id=trip.id).values_list("id", flat=True).first()
+
+        itinerary = _Itinerary(trip)
+        for index, op in enumerate(operations):
+            try:
+                if op["op"] == "create":
+                    itinerary.create(op, user)
+                elif op["op"] == "move":
+                    itinerary.move(op)
+                elif op["op"] == "reorder":
+                    itinerary.reorder(op)
+                elif op["op"] == "delete":
+                    itinerary.delete(op)
+            except ItineraryError as e:
+                e.op_index = index
+                raise
+
+        with collect_changes(trip.id) as batch:
+            itinerary.flush(batch)
+
+    version = batch.version
+    if version is None:
+        version = Trip.objects.filter(id=trip.id).values_list("version", flat=True).first()
+
+    return {
+        "version": version,
+        "days": itinerary.ordering(),
+        "created": {
+            client_id: a.id for client_id, a in itinerary.created if client_id is not None
+        },
+    }
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.10 on 2026-10-19 03:16
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='TripChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField()),
+                ('entity', models.CharField(choices=[('day', 'Day'), ('activity', 'Activity'), ('message', 'Message'), ('reaction', 'Reaction'), ('member', 'Member')], max_length=20)),
+                ('entity_id', models.PositiveBigIntegerField()),
+                ('op', models.CharField(choices=[('upsert', 'Upsert'), ('delete', 'Delete')], default='upsert', max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='trips.trip')),
+            ],
+            options={
+                'ordering': ['version'],
+                'unique_together': {('trip', 'version')},
+            },
+        ),
+    ]
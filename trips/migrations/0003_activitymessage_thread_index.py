@@ -0,0 +1,19 @@
+# Generated by Django 5.2.10 on 2026-10-19 03:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0002_trip_version_tripchange'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activitymessage',
+            index=models.Index(fields=['activity', 'created_at', 'id'], name='trips_msg_thread_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.10 on 2026-10-19 03:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0003_activitymessage_thread_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tripmember',
+            index=models.Index(fields=['user', 'status'], name='trips_member_user_status_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.10 on 2026-10-19 03:21
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0004_tripmember_user_status_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TripInviteNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='trips.tripmember')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='trips_invite_outbox_idx')],
+            },
+        ),
+    ]
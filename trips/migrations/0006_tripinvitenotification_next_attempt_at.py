@@ -0,0 +1,19 @@
+# Generated by Django 5.2.10 on 2026-10-19 03:49
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0005_tripinvitenotification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tripinvitenotification',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.10 on 2026-10-19 04:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0006_tripinvitenotification_next_attempt_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='tripinvitenotification',
+            name='trips_invite_outbox_idx',
+        ),
+        migrations.AddIndex(
+            model_name='tripinvitenotification',
+            index=models.Index(fields=['status', 'next_attempt_at', 'id'], name='trips_invite_outbox_idx'),
+        ),
+    ]
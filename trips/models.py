@@ -18,6 +18,9 @@ class Trip(models.Model):
 
     share_token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
 
+    # bumped by trips.changes.record_changes (drives the incremental sync feed)
+    version = models.PositiveBigIntegerField(default=0, editable=False)
+
     created_at = models.DateTimeField(default=timezone.now)
 
     def __str__(self):
@@ -61,6 +64,10 @@ class TripMember(models.Model):
 
     class Meta:
         unique_together = ("trip", "user")
+        indexes = [
+            # "my trips": members__user=<me>, members__status=accepted
+            models.Index(fields=["user", "status"], name="trips_member_user_status_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user_id} in {self.trip_id} ({self.role}, {self.status})"
@@ -116,6 +123,10 @@ class ActivityMessage(models.Model):
 
     class Meta:
         ordering = ["created_at", "id"]
+        indexes = [
+            # keyset pagination of a thread: (activity, created_at, id)
+            models.Index(fields=["activity", "created_at", "id"], name="trips_msg_thread_idx"),
+        ]
 
     def __str__(self):
         return f"Msg {self.id} on activity {self.activity_id}"
@@ -132,3 +143,79 @@ class ActivityReaction(models.Model):
 
     def __str__(self):
         return f"Like {self.user_id} -> {self.activity_id}"
+
+
+class TripChange(models.Model):
+    """
+    Append-only change log behind GET /trips/<id>/changes/?since=<version>.
+    One row per Trip.version bump.
+    """
+    ENTITY_DAY = "day"
+    ENTITY_ACTIVITY = "activity"
+    ENTITY_MESSAGE = "message"
+    ENTITY_REACTION = "reaction"
+    ENTITY_MEMBER = "member"
+
+    OP_UPSERT = "upsert"
+    OP_DELETE = "delete"
+
+    ENTITY_CHOICES = [
+        (ENTITY_DAY, "Day"),
+        (ENTITY_ACTIVITY, "Activity"),
+        (ENTITY_MESSAGE, "Message"),
+        (ENTITY_REACTION, "Reaction"),
+        (ENTITY_MEMBER, "Member"),
+    ]
+
+    OP_CHOICES = [
+        (OP_UPSERT, "Upsert"),
+        (OP_DELETE, "Delete"),
+    ]
+
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name="changes")
+    version = models.PositiveBigIntegerField()
+
+    entity = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    entity_id = models.PositiveBigIntegerField()
+    op = models.CharField(max_length=10, choices=OP_CHOICES, default=OP_UPSERT)
+
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ("trip", "version")
+        ordering = ["version"]
+
+    def __str__(self):
+        return f"Trip {self.trip_id} v{self.version}: {self.op} {self.entity} {self.entity_id}"
+
+
+class TripInviteNotification(models.Model):
+    """
+    Outbox for invite notifications: TripInviteAPIView only queues rows,
+    `manage.py send_trip_invites` delivers them in batches.
+    """
+    STATUS_PENDING = "pending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    member = models.ForeignKey(TripMember, on_delete=models.CASCADE, related_name="notifications")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)  # pushed back after a failed send
+
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at", "id"], name="trips_invite_outbox_idx"),
+        ]
+
+    def __str__(self):
+        return f"Invite notification {self.id} ({self.status})"
@@ -1,5 +1,7 @@
+from django.db.models import BigIntegerField, CharField, F, FilteredRelation, Q, Value
+from django.http import Http404
 from rest_framework.permissions import BasePermission
-from .models import TripMember
+from .models import Trip, TripMember, TripActivity
 
 
 def get_membership(user, trip):
@@ -8,10 +10,114 @@ def get_membership(user, trip):
     return TripMember.objects.filter(trip=trip, user=user, status=TripMember.STATUS_ACCEPTED).first()
 
 
+# -------------------------
+# Per-request membership cache
+# -------------------------
+
+def _membership_cache(request):
+    """
+    {trip_id: TripMember | None} stored on the request, so permission checks
+    made during one API call never hit the DB twice for the same trip.
+    """
+    cache = getattr(request, "_trip_membership_cache", None)
+    if cache is None:
+        cache = {}
+        request._trip_membership_cache = cache
+    return cache
+
+
+def _membership_from_row(obj, trip_id, user):
+    """
+    Build the caller's TripMember from the columns annotated by the
+    resolvers below (None when the caller isn't an accepted member).
+    """
+    if obj._membership_id is None:
+        return None
+    return TripMember(
+        id=obj._membership_id,
+        trip_id=trip_id,
+        user=user,
+        role=obj._membership_role,
+        status=TripMember.STATUS_ACCEPTED,
+    )
+
+
+def _with_membership(qs, user, path):
+    """
+    LEFT JOIN the caller's accepted membership onto qs (path is the relation
+    from qs.model to TripMember, e.g. "members" or "trip__members").
+    """
+    if not user or not user.is_authenticated:
+        return qs.annotate(
+            _membership_id=Value(None, output_field=BigIntegerField()),
+            _membership_role=Value(None, output_field=CharField()),
+        )
+    return qs.annotate(
+        my_membership=FilteredRelation(
+            path,
+            condition=Q(**{f"{path}__user": user, f"{path}__status": TripMember.STATUS_ACCEPTED}),
+        ),
+        _membership_id=F("my_membership__id"),
+        _membership_role=F("my_membership__role"),
+    )
+
+
+def resolve_trip(request, trip_id):
+    """
+    Load a trip and the caller's accepted membership in one query.
+    Returns (trip, membership); raises Http404 if the trip doesn't exist.
+    """
+    trip = _with_membership(Trip.objects.filter(id=trip_id), request.user, "members").first()
+    if not trip:
+        raise Http404("No Trip matches the given query.")
+
+    membership = _membership_from_row(trip, trip.id, request.user)
+    _membership_cache(request)[trip.id] = membership
+    return trip, membership
+
+
+def resolve_activity(request, activity_id):
+    """
+    Load an activity, its trip/day and the caller's accepted membership in
+    one query. Returns (activity, membership); raises Http404 if missing.
+    """
+    activity = _with_membership(
+        TripActivity.objects.select_related("trip", "day").filter(id=activity_id),
+        request.user,
+        "trip__members",
+    ).first()
+    if not activity:
+        raise Http404("No TripActivity matches the given query.")
+
+    membership = _membership_from_row(activity, activity.trip_id, request.user)
+    _membership_cache(request)[activity.trip_id] = membership
+    return activity, membership
+
+
+def get_request_membership(request, trip):
+    """
+    Memoized get_membership(): uses whatever resolve_trip/resolve_activity
+    already loaded for this request, and queries at most once per trip otherwise.
+    """
+    trip_id = trip.pk if isinstance(trip, Trip) else trip
+    cache = _membership_cache(request)
+    if trip_id not in cache:
+        cache[trip_id] = get_membership(request.user, trip_id)
+    return cache[trip_id]
+
+
+def _trip_id_of(obj):
+    # supports Trip or related objects (day, activity...)
+    return getattr(obj, "trip_id", None) or obj.pk
+
+
+def can_edit(membership):
+    return bool(membership) and membership.role in (TripMember.ROLE_OWNER, TripMember.ROLE_EDITOR)
+
+
 class IsTripMember(BasePermission):
     def has_object_permission(self, request, view, obj):
-        trip = getattr(obj, "trip", None) or obj  # supports Trip or related objects
-        return get_membership(request.user, trip) is not None
+        return get_request_membership(request, _trip_id_of(obj)) is not None
 
 
 class CanEditTrip(BasePermission):
@@ -21,8 +127,4 @@ class CanEditTrip(BasePermission):
     """
 
     def has_object_permission(self, request, view, obj):
-        trip = getattr(obj, "trip", None) or obj
-        membership = get_membership(request.user, trip)
-        if not membership:
-            return False
-        return membership.role in (TripMember.ROLE_OWNER, TripMember.ROLE_EDITOR)
+        return can_edit(get_request_membership(request, _trip_id_of(obj)))
@@ -0,0 +1,183 @@
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+# Server-Sent Events push for trip collaboration.
+# broker: moves messages between processes (pluggable, settings.TRIPS_REALTIME_BROKER)
+# hub:    fans them out to the event streams open in *this* process
+
+LISTENER_QUEUE_SIZE = 100
+
+
+# -------------------------
+# Brokers
+# -------------------------
+
+class BaseBroker:
+    """
+    Transport interface. Messages are JSON strings; callbacks may be invoked
+    from any thread. A Redis/Postgres LISTEN implementation only has to
+    provide these three methods.
+    """
+
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel, callback):
+        raise NotImplementedError
+
+    def unsubscribe(self, channel, callback):
+        raise NotImplementedError
+
+
+class InMemoryBroker(BaseBroker):
+    """Single-process broker (dev server, one ASGI worker, tests)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callbacks = {}
+
+    def publish(self, channel, message):
+        with self._lock:
+            callbacks = list(self._callbacks.get(channel, ()))
+        for callback in callbacks:
+            callback(message)
+
+    def subscribe(self, channel, callback):
+        with self._lock:
+            self._callbacks.setdefault(channel, []).append(callback)
+
+    def unsubscribe(self, channel, callback):
+        with self._lock:
+            callbacks = self._callbacks.get(channel, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+            if not callbacks:
+                self._callbacks.pop(channel, None)
+
+
+# -------------------------
+# Hub
+# -------------------------
+
+class TripListener:
+    """One open event stream: a bounded queue bound to the stream's event loop."""
+
+    def __init__(self, hub, trip_id):
+        self.hub = hub
+        self.trip_id = trip_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=LISTENER_QUEUE_SIZE)
+        self.overflowed = False  # slow client dropped events -> must resync
+
+    def deliver(self, message):
+        # called from whatever thread the broker publishes on
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def next(self, timeout):
+        """Next decoded event, or None if nothing arrived within timeout seconds."""
+        try:
+            message = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return json.loads(message)
+
+    def close(self):
+        self.hub.remove(self)
+
+
+class TripEventHub:
+    """
+    Keeps one broker subscription per trip for this process, however many
+    members have that trip open, and copies each message to their listeners.
+    """
+
+    def __init__(self, broker):
+        self.broker = broker
+        self._lock = threading.Lock()
+        self._listeners = {}   # trip_id -> set of TripListener
+        self._callbacks = {}   # trip_id -> broker callback
+
+    @staticmethod
+    def channel(trip_id):
+        return f"trip:{trip_id}"
+
+    def publish(self, trip_id, event):
+        self.broker.publish(self.channel(trip_id), json.dumps(event))
+
+    def listen(self, trip_id):
+        listener = TripListener(self, trip_id)
+        subscribe = False
+        with self._lock:
+            listeners = self._listeners.setdefault(trip_id, set())
+            listeners.add(listener)
+            if trip_id not in self._callbacks:
+                self._callbacks[trip_id] = lambda message: self._dispatch(trip_id, message)
+                subscribe = True
+        if subscribe:
+            self.broker.subscribe(self.channel(trip_id), self._callbacks[trip_id])
+        return listener
+
+    def remove(self, listener):
+        callback = None
+        with self._lock:
+            listeners = self._listeners.get(listener.trip_id)
+            if listeners is None:
+                return
+            listeners.discard(listener)
+            if not listeners:
+                del self._listeners[listener.trip_id]
+                callback = self._callbacks.pop(listener.trip_id, None)
+        if callback:
+            self.broker.unsubscribe(self.channel(listener.trip_id), callback)
+
+    def _dispatch(self, trip_id, message):
+        with self._lock:
+            listeners = list(self._listeners.get(trip_id, ()))
+        for listener in listeners:
+            try:
+                listener.deliver(message)
+            except RuntimeError:
+                # the stream's loop is gone (worker shutting down)
+                self.remove(listener)
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub():
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                broker_path = getattr(settings, "TRIPS_REALTIME_BROKER", "trips.realtime.InMemoryBroker")
+                _hub = TripEventHub(import_string(broker_path)())
+    return _hub
+
+
+def publish_trip_changes(trip_id, version, changes):
+    """
+    Push a change-log batch to everyone streaming the trip. Sent on commit,
+    so listeners never see writes that were rolled back.
+    """
+    event = {
+        "trip_id": trip_id,
+        "version": version,
+        "changes": [
+            {"version": v, "entity": entity, "entity_id": entity_id, "op": op}
+            for v, entity, entity_id, op in changes
+        ],
+    }
+    transaction.on_commit(lambda: get_hub().publish(trip_id, event))
@@ -46,6 +46,7 @@ class TripCreateSerializer(serializers.ModelSerializer):
                 status=TripMember.STATUS_ACCEPTED,
                 invited_by=user,
             )
+        trip.refresh_from_db(fields=["version"])  # bumped by the owner membership change
         return trip
 
 
@@ -89,6 +90,12 @@ class ActivityMessageSerializer(serializers.ModelSerializer):
         return {"id": u.id, "email": getattr(u, "email", "")}
 
 
+class ActivityReactionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ActivityReaction
+        fields = ["id", "activity", "user", "created_at"]
+
+
 class TripDetailSerializer(serializers.ModelSerializer):
     members = TripMemberSerializer(many=True, read_only=True)
     days = TripDaySerializer(many=True, read_only=True)
@@ -98,7 +105,7 @@ class TripDetailSerializer(serializers.ModelSerializer):
         model = Trip
         fields = [
             "id", "title", "destination", "start_date", "end_date",
-            "created_by", "share_token", "created_at",
+            "created_by", "share_token", "version", "created_at",
             "members", "days", "activities",
         ]
 
@@ -122,3 +129,42 @@ class TripDetailSerializer(serializers.ModelSerializer):
                 "created_at": a.created_at,
             })
         return data
+
+
+class ItineraryOperationSerializer(serializers.Serializer):
+    """
+    One step of a batch itinerary edit (`day` is the day number, like activities/add/):
+      {"op": "create", "day": 1, "title": "...", "sort_order": 2, "client_id": "tmp-1"}
+      {"op": "move", "id": 5, "day": 2, "sort_order": 1}
+      {"op": "reorder", "day": 1, "ids": [7, 5, 6]}
+      {"op": "delete", "id": 9}
+    """
+    OP_CHOICES = ["create", "move", "reorder", "delete"]
+
+    op = serializers.ChoiceField(choices=OP_CHOICES)
+    id = serializers.IntegerField(required=False)
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    day = serializers.IntegerField(min_value=1, required=False)
+    sort_order = serializers.IntegerField(min_value=1, required=False)
+
+    title = serializers.CharField(max_length=255, required=False)
+    location_name = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    start_time = serializers.TimeField(required=False, allow_null=True)
+    client_id = serializers.CharField(max_length=64, required=False)
+
+    REQUIRED = {
+        "create": ["day", "title"],
+        "move": ["id", "day"],
+        "reorder": ["day", "ids"],
+        "delete": ["id"],
+    }
+
+    def validate(self, attrs):
+        missing = [f for f in self.REQUIRED[attrs["op"]] if f not in attrs]
+        if missing:
+            raise serializers.ValidationError(f"{attrs['op']} requires: {', '.join(missing)}")
+        return attrs
+
+
+class ItineraryBatchSerializer(serializers.Serializer):
+    operations = serializers.ListField(child=ItineraryOperationSerializer(), allow_empty=False, max_length=500)
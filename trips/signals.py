@@ -0,0 +1,44 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete
+
+from .changes import record_change
+from .models import (
+    Trip, TripMember, TripDay, TripActivity, ActivityMessage, ActivityReaction, TripChange
+)
+
+
+# model -> (change-log entity, how to get the trip id)
+TRACKED_MODELS = {
+    TripMember: (TripChange.ENTITY_MEMBER, lambda obj: obj.trip_id),
+    TripDay: (TripChange.ENTITY_DAY, lambda obj: obj.trip_id),
+    TripActivity: (TripChange.ENTITY_ACTIVITY, lambda obj: obj.trip_id),
+    ActivityMessage: (TripChange.ENTITY_MESSAGE, lambda obj: obj.activity.trip_id),
+    ActivityReaction: (TripChange.ENTITY_REACTION, lambda obj: obj.activity.trip_id),
+}
+
+# deleting one of these cascades down the itinerary; the parent's tombstone covers its children
+CASCADE_PARENTS = (Trip, TripDay, TripActivity)
+
+
+def _is_cascaded(sender, origin):
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin_model is not sender and issubclass(origin_model, CASCADE_PARENTS)
+
+
+def trip_entity_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    entity, trip_id_of = TRACKED_MODELS[sender]
+    record_change(trip_id_of(instance), entity, instance.pk, TripChange.OP_UPSERT)
+
+
+def trip_entity_deleted(sender, instance, origin=None, **kwargs):
+    if origin is not None and _is_cascaded(sender, origin):
+        return
+    entity, trip_id_of = TRACKED_MODELS[sender]
+    record_change(trip_id_of(instance), entity, instance.pk, TripChange.OP_DELETE)
+
+
+for _model in TRACKED_MODELS:
+    post_save.connect(trip_entity_saved, sender=_model, dispatch_uid=f"trips_change_saved_{_model.__name__}")
+    post_delete.connect(trip_entity_deleted, sender=_model, dispatch_uid=f"trips_change_deleted_{_model.__name__}")
@@ -1,3 +1,584 @@
-from django.test import TestCase
+import asyncio
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .changes import build_delta, record_changes
+from .invites import bulk_invite, send_pending_invite_notifications
+from .models import Trip, TripActivity, TripChange, TripDay, TripInviteNotification, TripMember
+from .permissions import get_request_membership, resolve_activity, resolve_trip
+from .realtime import LISTENER_QUEUE_SIZE, InMemoryBroker, TripEventHub
+
+
+class ItineraryBatchTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.owner = User.objects.create_user(email="owner@example.com", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+        self.trip_id = self.client.post("/api/trips/trips/create/", {"title": "Trip"}, format="json").data["id"]
+        # day 1: a0, a2; day 2: a1, a3
+        self.ids = [self.add_activity(1 + i % 2, f"A{i}") for i in range(4)]
+
+    def add_activity(self, day, title):
+        response = self.client.post(
+            f"/api/trips/trips/{self.trip_id}/activities/add/", {"day": day, "title": title}, format="json"
+        )
+        return response.data["id"]
+
+    def batch(self, operations, client=None):
+        return (client or self.client).post(
+            f"/api/trips/trips/{self.trip_id}/itinerary/batch/", {"operations": operations}, format="json"
+        )
+
+    def day_ids(self, number):
+        return list(
+            TripActivity.objects.filter(day__trip_id=self.trip_id, day__day_number=number)
+            .order_by("sort_order").values_list("id", flat=True)
+        )
+
+    def test_applies_operations_in_order(self):
+        a0, a1, a2, a3 = self.ids
+        version = Trip.objects.get(id=self.trip_id).version
+
+        response = self.batch([
+            {"op": "create", "day": 1, "title": "New", "sort_order": 1, "client_id": "tmp-1"},
+            {"op": "move", "id": a1, "day": 1, "sort_order": 2},
+            {"op": "reorder", "day": 2, "ids": [a3]},
+            {"op": "delete", "id": a2},
+            {"op": "create", "day": 3, "title": "Later", "client_id": "tmp-2"},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        created = response.data["created"]
+        self.assertEqual(self.day_ids(1), [created["tmp-1"], a1, a0])
+        self.assertEqual(self.day_ids(2), [a3])
+        self.assertEqual(self.day_ids(3), [created["tmp-2"]])
+        self.assertFalse(TripActivity.objects.filter(id=a2).exists())
+        self.assertGreater(response.data["version"], version)
+        self.assertEqual(
+            [d["activity_ids"] for d in response.data["days"]],
+            [self.day_ids(1), self.day_ids(2), self.day_ids(3)],
+        )
+
+    def test_renumbers_touched_days_densely(self):
+        a0, _, a2, _ = self.ids
+        self.batch([{"op": "reorder", "day": 1, "ids": [a2, a0]}])
+
+        orders = list(
+            TripActivity.objects.filter(id__in=[a0, a2]).order_by("sort_order").values_list("id", "sort_order")
+        )
+        self.assertEqual(orders, [(a2, 1), (a0, 2)])
+
+    def test_failing_operation_rolls_back_the_batch(self):
+        a0, a1, a2, a3 = self.ids
+
+        response = self.batch([
+            {"op": "move", "id": a1, "day": 1},
+            {"op": "delete", "id": 99999},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["op_index"], 1)
+        self.assertEqual(self.day_ids(1), [a0, a2])
+        self.assertEqual(self.day_ids(2), [a1, a3])
+
+    def test_reorder_rejects_duplicate_ids(self):
+        a0, _, a2, _ = self.ids
+
+        response = self.batch([{"op": "reorder", "day": 1, "ids": [a0, a0, a2]}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["op_index"], 0)
+        self.assertEqual(self.day_ids(1), [a0, a2])
+
+    def test_reorder_rejects_ids_from_another_day(self):
+        response = self.batch([{"op": "reorder", "day": 1, "ids": [self.ids[1]]}])
+        self.assertEqual(response.status_code, 400)
+
+    def test_viewers_cannot_edit(self):
+        viewer = get_user_model().objects.create_user(email="viewer@example.com", password="x")
+        TripMember.objects.create(
+            trip_id=self.trip_id, user=viewer, role=TripMember.ROLE_VIEWER, status=TripMember.STATUS_ACCEPTED
+        )
+        client = APIClient()
+        client.force_authenticate(viewer)
+
+        response = self.batch([{"op": "delete", "id": self.ids[0]}], client=client)
+
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(TripActivity.objects.filter(id=self.ids[0]).exists())
+
+
+class MembershipResolverTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.owner = User.objects.create_user(email="owner@example.com", password="x")
+        self.outsider = User.objects.create_user(email="outsider@example.com", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+        self.trip_id = self.client.post("/api/trips/trips/create/", {"title": "Trip"}, format="json").data["id"]
+        self.activity_id = self.client.post(
+            f"/api/trips/trips/{self.trip_id}/activities/add/", {"day": 1, "title": "A"}, format="json"
+        ).data["id"]
+
+    def request_for(self, user):
+        request = RequestFactory().get("/")
+        request.user = user
+        return request
+
+    def test_resolve_trip_loads_membership_in_one_query(self):
+        request = self.request_for(self.owner)
+
+        with self.assertNumQueries(1):
+            trip, membership = resolve_trip(request, self.trip_id)
+        self.assertEqual(trip.id, self.trip_id)
+        self.assertEqual(membership.role, TripMember.ROLE_OWNER)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_request_membership(request, trip), membership)
+
+    def test_resolve_activity_caches_non_membership(self):
+        request = self.request_for(self.outsider)
+
+        with self.assertNumQueries(1):
+            activity, membership = resolve_activity(request, self.activity_id)
+        self.assertEqual(activity.trip_id, self.trip_id)
+        self.assertIsNone(membership)
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_request_membership(request, self.trip_id))
+
+    def test_get_request_membership_queries_once_per_trip(self):
+        request = self.request_for(self.owner)
+
+        with self.assertNumQueries(1):
+            get_request_membership(request, self.trip_id)
+            get_request_membership(request, self.trip_id)
+
+    def test_missing_trip_or_activity_is_404(self):
+        request = self.request_for(self.owner)
+        with self.assertRaises(Http404):
+            resolve_trip(request, 99999)
+        with self.assertRaises(Http404):
+            resolve_activity(request, 99999)
+
+    def test_views_use_the_resolved_membership(self):
+        outsider = APIClient()
+        outsider.force_authenticate(self.outsider)
+
+        self.assertEqual(self.client.get(f"/api/trips/trips/{self.trip_id}/").status_code, 200)
+        self.assertEqual(outsider.get(f"/api/trips/trips/{self.trip_id}/").status_code, 403)
+        self.assertEqual(
+            outsider.post(f"/api/trips/activities/{self.activity_id}/messages/add/", {"message": "hi"}).status_code,
+            403,
+        )
+        self.assertEqual(self.client.get("/api/trips/trips/99999/").status_code, 404)
+
+
+class TripChangesTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.owner = User.objects.create_user(email="owner@example.com", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+        self.trip_id = self.client.post("/api/trips/trips/create/", {"title": "Trip"}, format="json").data["id"]
+        self.a1 = self.add_activity(1, "A1")
+        self.a2 = self.add_activity(2, "A2")
+
+    def add_activity(self, day, title):
+        response = self.client.post(
+            f"/api/trips/trips/{self.trip_id}/activities/add/", {"day": day, "title": title}, format="json"
+        )
+        return response.data["id"]
+
+    def changes(self, since):
+        return self.client.get(f"/api/trips/trips/{self.trip_id}/changes/", {"since": since})
+
+    def test_full_sync_returns_current_state(self):
+        data = self.changes(0).data
+
+        self.assertEqual(data["version"], Trip.objects.get(id=self.trip_id).version)
+        self.assertFalse(data["has_more"])
+        self.assertEqual(sorted(a["id"] for a in data["changes"]["activities"]), [self.a1, self.a2])
+        self.assertEqual(len(data["changes"]["days"]), 2)
+        self.assertEqual(len(data["changes"]["members"]), 1)
+
+    def test_delta_returns_only_later_changes_and_tombstones(self):
+        version = self.changes(0).data["version"]
+
+        self.client.patch(f"/api/trips/activities/{self.a2}/update/", {"title": "Renamed"}, format="json")
+        self.client.delete(f"/api/trips/activities/{self.a1}/delete/")
+        data = self.changes(version).data
+
+        self.assertEqual([a["title"] for a in data["changes"]["activities"]], ["Renamed"])
+        self.assertEqual(data["deleted"]["activities"], [self.a1])
+        self.assertEqual(data["changes"]["days"], [])
+        self.assertGreater(data["version"], version)
+
+    def test_created_then_deleted_entity_is_only_a_tombstone(self):
+        version = self.changes(0).data["version"]
+
+        activity_id = self.add_activity(1, "Short-lived")
+        self.client.delete(f"/api/trips/activities/{activity_id}/delete/")
+        data = self.changes(version).data
+
+        self.assertEqual(data["changes"]["activities"], [])
+        self.assertEqual(data["deleted"]["activities"], [activity_id])
+
+    def test_pages_through_the_change_log(self):
+        trip = Trip.objects.get(id=self.trip_id)
+        first = build_delta(trip, 0, limit=2)
+        rest = build_delta(trip, first["version"], limit=100)
+
+        self.assertTrue(first["has_more"])
+        self.assertEqual(first["version"], 2)
+        self.assertFalse(rest["has_more"])
+        self.assertEqual(rest["version"], trip.version)
+
+    def test_rejects_bad_since_and_non_members(self):
+        self.assertEqual(self.changes("abc").status_code, 400)
+
+        outsider = APIClient()
+        outsider.force_authenticate(get_user_model().objects.create_user(email="o@example.com", password="x"))
+        self.assertEqual(outsider.get(f"/api/trips/trips/{self.trip_id}/changes/").status_code, 403)
+
+
+class TripEventHubTests(SimpleTestCase):
+    def setUp(self):
+        self.broker = InMemoryBroker()
+        self.hub = TripEventHub(self.broker)
+
+    async def test_one_broker_subscription_per_trip(self):
+        first, second = self.hub.listen(1), self.hub.listen(1)
+        self.assertEqual(len(self.broker._callbacks["trip:1"]), 1)
+
+        self.hub.publish(1, {"version": 2})
+        self.assertEqual(await first.next(1), {"version": 2})
+        self.assertEqual(await second.next(1), {"version": 2})
+
+        first.close()
+        self.assertIn("trip:1", self.broker._callbacks)
+        second.close()
+        self.assertNotIn("trip:1", self.broker._callbacks)
+
+    async def test_listener_only_gets_its_trip(self):
+        listener = self.hub.listen(1)
+        self.hub.publish(2, {"version": 1})
+        self.assertIsNone(await listener.next(0.01))
+        listener.close()
+
+    async def test_full_queue_marks_the_listener_for_resync(self):
+        listener = self.hub.listen(1)
+        for version in range(LISTENER_QUEUE_SIZE + 1):
+            self.hub.publish(1, {"version": version})
+        await asyncio.sleep(0)  # let the queued deliveries run
+
+        self.assertTrue(listener.overflowed)
+        self.assertEqual(listener.queue.qsize(), LISTENER_QUEUE_SIZE)
+        listener.close()
+
+
+class TripEventStreamTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        # JWT authentication only accepts active users
+        self.owner = User.objects.create_user(email="owner@example.com", password="x", is_active=True)
+        self.outsider = User.objects.create_user(email="outsider@example.com", password="x", is_active=True)
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        self.trip_id = client.post("/api/trips/trips/create/", {"title": "Trip"}, format="json").data["id"]
+
+        self.hub = TripEventHub(InMemoryBroker())
+        patcher = mock.patch("trips.realtime._hub", self.hub)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def url(self, user=None):
+        url = f"/api/trips/trips/{self.trip_id}/events/"
+        return f"{url}?access_token={AccessToken.for_user(user)}" if user else url
+
+    async def test_requires_an_accepted_member(self):
+        self.assertEqual((await self.async_client.get(self.url())).status_code, 401)
+        self.assertEqual((await self.async_client.get(self.url(self.outsider))).status_code, 403)
+
+    async def test_streams_change_batches_and_cleans_up(self):
+        response = await self.async_client.get(self.url(self.owner))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        # nothing is registered until the stream is read
+        self.assertEqual(self.hub._listeners, {})
+
+        chunks = asyncio.Queue()
+
+        async def consume():
+            async for chunk in response.streaming_content:
+                await chunks.put(chunk)
+
+        task = asyncio.create_task(consume())
+        await chunks.get()  # retry
+        self.assertTrue((await chunks.get()).startswith(b"event: ready"))
+        self.assertIn(self.trip_id, self.hub._listeners)
+
+        def write():
+            with self.captureOnCommitCallbacks(execute=True):
+                record_changes(self.trip_id, [(TripChange.ENTITY_ACTIVITY, 1, TripChange.OP_UPSERT)])
+        await sync_to_async(write)()
+
+        event = await asyncio.wait_for(chunks.get(), 5)
+        self.assertTrue(event.startswith(b"event: changes"))
+        self.assertIn(b'"entity": "activity"', event)
+
+        # the server cancels the response task when the client disconnects
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(self.hub._listeners, {})
+
+
+class TripSummaryListTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.owner = User.objects.create_user(email="owner@example.com", password="x")
+        self.viewer = User.objects.create_user(email="viewer@example.com", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+        # trip i has i activities, one per day; odd trips are shared with the viewer
+        self.trip_ids = []
+        for i in range(4):
+            trip_id = self.client.post("/api/trips/trips/create/", {"title": f"T{i}"}, format="json").data["id"]
+            for day in range(1, i + 1):
+                self.client.post(
+                    f"/api/trips/trips/{trip_id}/activities/add/", {"day": day, "title": "A"}, format="json"
+                )
+            if i % 2:
+                TripMember.objects.create(
+                    trip_id=trip_id, user=self.viewer, role=TripMember.ROLE_VIEWER, status=TripMember.STATUS_ACCEPTED
+                )
+            self.trip_ids.append(trip_id)
+
+    def summary(self, client=None, **params):
+        return (client or self.client).get("/api/trips/trips/summary/", params)
+
+    def test_counts_do_not_multiply_each_other(self):
+        with self.assertNumQueries(1):
+            results = self.summary().data["results"]
+
+        by_title = {r["title"]: r for r in results}
+        self.assertEqual([by_title[f"T{i}"]["activity_count"] for i in range(4)], [0, 1, 2, 3])
+        self.assertEqual([by_title[f"T{i}"]["member_count"] for i in range(4)], [1, 2, 1, 2])
+        self.assertEqual({r["my_role"] for r in results}, {TripMember.ROLE_OWNER})
+
+    def test_next_day_is_the_earliest_upcoming_dated_day(self):
+        today = timezone.localdate()
+        trip_id = self.trip_ids[3]
+        TripDay.objects.filter(trip_id=trip_id, day_number=1).update(date=today - timedelta(days=1))
+        TripDay.objects.filter(trip_id=trip_id, day_number=2).update(date=today + timedelta(days=2))
+        TripDay.objects.filter(trip_id=trip_id, day_number=3).update(date=today + timedelta(days=1))
+
+        results = {r["id"]: r for r in self.summary().data["results"]}
+
+        self.assertEqual(results[trip_id]["next_day"], {"day_number": 3, "date": today + timedelta(days=1)})
+        self.assertIsNone(results[self.trip_ids[0]]["next_day"])
+
+    def test_pages_newest_first_and_only_accepted_trips(self):
+        first = self.summary(limit=3).data
+        second = self.summary(limit=3, cursor=first["next_cursor"]).data
+
+        ids = [r["id"] for r in first["results"] + second["results"]]
+        self.assertEqual(ids, self.trip_ids[::-1])
+        self.assertIsNone(second["next_cursor"])
+
+        viewer = APIClient()
+        viewer.force_authenticate(self.viewer)
+        results = self.summary(viewer).data["results"]
+        self.assertEqual([r["id"] for r in results], [self.trip_ids[3], self.trip_ids[1]])
+        self.assertEqual({r["my_role"] for r in results}, {TripMember.ROLE_VIEWER})
+
+    def test_rejects_a_bad_cursor(self):
+        self.assertEqual(self.summary(cursor="nope").status_code, 400)
+
+
+class BulkInviteTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.owner = User.objects.create_user(email="owner@example.com", password="x")
+        self.users = [User.objects.create_user(email=f"u{i}@example.com", password="x") for i in range(4)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.trip_id = self.client.post("/api/trips/trips/create/", {"title": "Trip"}, format="json").data["id"]
+        self.trip = Trip.objects.get(id=self.trip_id)
+
+    def invite(self, **data):
+        return self.client.post(f"/api/trips/trips/{self.trip_id}/invite/", data, format="json")
+
+    def test_invites_by_id_and_case_insensitive_email(self):
+        response = self.invite(
+            user_ids=[self.users[0].id, self.owner.id, 99999],
+            emails=["U1@Example.com", "nobody@example.com", "OWNER@example.com"],
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(i["user"]["id"] for i in response.data["invites"]), [self.users[0].id, self.users[1].id]
+        )
+        self.assertEqual(response.data["not_found"], {"user_ids": [99999], "emails": ["nobody@example.com"]})
+        self.assertEqual(TripInviteNotification.objects.count(), 2)
+
+    def test_reinvite_does_not_queue_another_notification(self):
+        self.invite(user_ids=[self.users[0].id])
+        response = self.invite(user_ids=[self.users[0].id])
+
+        self.assertEqual(len(response.data["invites"]), 1)
+        self.assertEqual(TripInviteNotification.objects.count(), 1)
+
+    def test_accepted_members_are_not_reinvited(self):
+        TripMember.objects.create(
+            trip=self.trip, user=self.users[0], role=TripMember.ROLE_VIEWER, status=TripMember.STATUS_ACCEPTED
+        )
+
+        response = self.invite(user_ids=[self.users[0].id])
+
+        self.assertEqual(response.data["invites"], [])
+        self.assertEqual(TripMember.objects.get(trip=self.trip, user=self.users[0]).role, TripMember.ROLE_VIEWER)
+
+    def test_query_count_does_not_grow_with_invitees(self):
+        with CaptureQueriesContext(connection) as one:
+            bulk_invite(self.trip, self.owner, user_ids=[self.users[0].id])
+        with CaptureQueriesContext(connection) as three:
+            bulk_invite(self.trip, self.owner, user_ids=[u.id for u in self.users[1:]])
+
+        self.assertEqual(len(one), len(three))
+
+    def test_rejects_malformed_payloads(self):
+        self.assertEqual(self.invite().status_code, 400)
+        self.assertEqual(self.invite(user_ids="1").status_code, 400)
+        self.assertEqual(self.invite(user_ids=["x"]).status_code, 400)
+
+
+class InviteOutboxTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.owner = User.objects.create_user(email="owner@example.com", password="x")
+        invitees = [User.objects.create_user(email=f"u{i}@example.com", password="x") for i in range(2)]
+        trip = Trip.objects.create(title="Trip", created_by=self.owner)
+        bulk_invite(trip, self.owner, user_ids=[u.id for u in invitees])
+
+    def test_sends_due_notifications_once(self):
+        self.assertEqual(send_pending_invite_notifications(), 2)
+        self.assertEqual(send_pending_invite_notifications(), 0)
+
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ["u0@example.com", "u1@example.com"])
+        self.assertEqual(
+            set(TripInviteNotification.objects.values_list("status", flat=True)), {TripInviteNotification.STATUS_SENT}
+        )
+
+    def test_failed_send_backs_off_then_gives_up(self):
+        with mock.patch("django.core.mail.backends.locmem.EmailBackend.send_messages", side_effect=OSError):
+            self.assertEqual(send_pending_invite_notifications(max_attempts=2), 2)
+            # not due again until the back-off has passed
+            self.assertEqual(send_pending_invite_notifications(max_attempts=2), 0)
+
+            TripInviteNotification.objects.update(next_attempt_at=timezone.now())
+            send_pending_invite_notifications(max_attempts=2)
+
+        self.assertEqual(
+            list(TripInviteNotification.objects.values_list("status", "attempts").distinct()),
+            [(TripInviteNotification.STATUS_FAILED, 2)],
+        )
+
+    def test_unavailable_connection_leaves_rows_untouched(self):
+        with mock.patch("django.core.mail.backends.locmem.EmailBackend.open", side_effect=OSError), \
+                self.assertLogs("function.outbox", "ERROR"):
+            self.assertEqual(send_pending_invite_notifications(), 0)
+
+        self.assertEqual(
+            list(TripInviteNotification.objects.values_list("status", "attempts").distinct()),
+            [(TripInviteNotification.STATUS_PENDING, 0)],
+        )
+
+
+class TripExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = get_user_model().objects.create_user(email="owner@example.com", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.trip_id = self.client.post(
+            "/api/trips/trips/create/",
+            {"title": "Ghana, Roots & Home", "destination": "Accra", "start_date": "2026-12-01"},
+            format="json",
+        ).data["id"]
+        self.add_activity(1, "Cape Coast Castle; a long title that has to be folded across several ICS lines", "09:00")
+        self.add_activity(2, "<b>Market</b>")
+
+    def add_activity(self, day, title, start_time=None):
+        data = {"day": day, "title": title}
+        if start_time:
+            data["start_time"] = start_time
+        self.client.post(f"/api/trips/trips/{self.trip_id}/activities/add/", data, format="json")
+
+    def export(self, kind, **headers):
+        response = self.client.get(f"/api/trips/trips/{self.trip_id}/export/{kind}/", headers=headers)
+        body = b"".join(response.streaming_content).decode() if response.status_code == 200 else ""
+        return response, body
+
+    def test_ics_places_activities_on_their_dates(self):
+        response, body = self.export("ics")
+
+        self.assertEqual(response["Content-Type"], "text/calendar; charset=utf-8")
+        self.assertEqual(body.count("BEGIN:VEVENT"), 2)
+        self.assertIn("DTSTART:20261201T090000\r\n", body)
+        self.assertIn("DTSTART;VALUE=DATE:20261202\r\n", body)
+        self.assertIn("X-WR-CALNAME:Ghana\\, Roots & Home\r\n", body)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in body.split("\r\n")))
+
+    def test_undated_days_are_left_out_of_the_calendar(self):
+        Trip.objects.filter(id=self.trip_id).update(start_date=None)
+        _, body = self.export("ics")
+        self.assertNotIn("BEGIN:VEVENT", body)
+
+    def test_print_escapes_user_text(self):
+        _, body = self.export("print")
+        self.assertIn("&lt;b&gt;Market&lt;/b&gt;", body)
+        self.assertNotIn("<b>Market", body)
+
+    def test_repeat_download_is_served_from_cache(self):
+        _, first = self.export("ics")
+
+        with self.assertNumQueries(1):  # the trip/membership lookup only
+            _, second = self.export("ics")
+        self.assertEqual(first, second)
+
+    def test_etag_follows_the_trip_version(self):
+        response, _ = self.export("ics")
+        etag = response["ETag"]
+
+        self.assertEqual(self.export("ics", if_none_match=etag)[0].status_code, 304)
+
+        self.add_activity(3, "Later")
+        response, body = self.export("ics", if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertIn("SUMMARY:Later", body)
+
+    def test_unknown_kind_and_non_members(self):
+        self.assertEqual(self.export("pdf")[0].status_code, 404)
+
+        outsider = APIClient()
+        outsider.force_authenticate(get_user_model().objects.create_user(email="o@example.com", password="x"))
+        self.assertEqual(outsider.get(f"/api/trips/trips/{self.trip_id}/export/ics/").status_code, 403)
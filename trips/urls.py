@@ -3,8 +3,12 @@ from . import views
 
 urlpatterns = [
     path("trips/", views.TripListAPIView.as_view()),
+    path("trips/summary/", views.TripSummaryListAPIView.as_view()),
     path("trips/create/", views.TripCreateAPIView.as_view()),
     path("trips/<int:trip_id>/", views.TripDetailAPIView.as_view()),
+    path("trips/<int:trip_id>/changes/", views.TripChangesAPIView.as_view()),
+    path("trips/<int:trip_id>/events/", views.TripEventStreamView.as_view()),
+    path("trips/<int:trip_id>/export/<str:kind>/", views.TripExportAPIView.as_view()),
 
     path("trips/<int:trip_id>/invite/", views.TripInviteAPIView.as_view()),
     path("trips/<int:trip_id>/accept-invite/", views.TripAcceptInviteAPIView.as_view()),
@@ -12,6 +16,7 @@ urlpatterns = [
 
     path("trips/<int:trip_id>/days/add/", views.TripDayAddAPIView.as_view()),
     path("trips/<int:trip_id>/activities/add/", views.TripActivityAddAPIView.as_view()),
+    path("trips/<int:trip_id>/itinerary/batch/", views.TripItineraryBatchAPIView.as_view()),
 
     path("activities/<int:activity_id>/update/", views.TripActivityUpdateAPIView.as_view()),
     path("activities/<int:activity_id>/delete/", views.TripActivityDeleteAPIView.as_view()),
@@ -1,30 +1,128 @@
-from django.db import transaction
+import json
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.views import View
 from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from function.pagination import (
+    InvalidCursor, cursor_for, cursor_values, get_page_size, keyset_filter, paginate_keyset
+)
 
-from .models import Trip, TripMember, TripDay, TripActivity, ActivityMessage, ActivityReaction
+from .models import Trip, TripMember, TripDay, TripActivity, ActivityMessage, ActivityReaction, TripChange
 from .serializers import (
     TripCreateSerializer, TripDetailSerializer,
     TripDaySerializer, TripActivitySerializer,
-    ActivityMessageSerializer, TripMemberSerializer,
+    ActivityMessageSerializer, TripMemberSerializer, ItineraryBatchSerializer,
 )
-from .permissions import get_membership, CanEditTrip
+from .changes import build_delta
+from .invites import MAX_INVITES_PER_REQUEST, bulk_invite
+from .export import EXPORT_KINDS, export_etag, iter_export
+from .itinerary import ItineraryError, apply_itinerary_operations
+from .realtime import get_hub
+from .permissions import get_membership, resolve_trip, resolve_activity, CanEditTrip
 
 
 class TripListAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
+        # (trip, user) is unique, so the membership join can't duplicate trips
         trips = Trip.objects.filter(
             members__user=request.user,
             members__status=TripMember.STATUS_ACCEPTED
-        ).distinct().order_by("-created_at")
+        ).order_by("-created_at")
         data = [{"id": t.id, "title": t.title, "destination": t.destination, "share_token": str(t.share_token)} for t in trips]
         return Response(data)
 
+
+TRIP_SUMMARY_ORDERING = ["-created_at", "-id"]
+
+
+def _trip_summaries(user):
+    """
+    Caller's trips with list-card aggregates, one SQL statement: each aggregate
+    is a correlated subquery, so the counts don't multiply each other's rows.
+    """
+    def count_of(qs):
+        return Coalesce(
+            Subquery(qs.order_by().values("trip").annotate(c=Count("id")).values("c")[:1]),
+            0,
+        )
+
+    upcoming_days = TripDay.objects.filter(
+        trip=OuterRef("pk"), date__gte=timezone.localdate()
+    ).order_by("date", "day_number")
+
+    return (
+        Trip.objects.filter(
+            members__user=user,
+            members__status=TripMember.STATUS_ACCEPTED,
+        )
+        .annotate(
+            my_role=F("members__role"),
+            member_count=count_of(TripMember.objects.filter(trip=OuterRef("pk"), status=TripMember.STATUS_ACCEPTED)),
+            activity_count=count_of(TripActivity.objects.filter(trip=OuterRef("pk"))),
+            next_day_date=Subquery(upcoming_days.values("date")[:1]),
+            next_day_number=Subquery(upcoming_days.values("day_number")[:1]),
+            last_activity_at=Subquery(
+                TripChange.objects.filter(trip=OuterRef("pk")).order_by("-version").values("created_at")[:1]
+            ),
+        )
+    )
+
+
+class TripSummaryListAPIView(APIView):
+    """
+    GET /api/trips/trips/summary/?cursor=<cursor>&limit=20
+    Trip cards with member/activity counts, next dated day and last change time.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            trips, next_cursor = paginate_keyset(
+                _trip_summaries(request.user),
+                TRIP_SUMMARY_ORDERING,
+                cursor=request.query_params.get("cursor"),
+                page_size=get_page_size(request),
+            )
+        except InvalidCursor as e:
+            return Response({"detail": str(e)}, status=400)
+
+        results = []
+        for t in trips:
+            results.append({
+                "id": t.id,
+                "title": t.title,
+                "destination": t.destination,
+                "start_date": t.start_date,
+                "end_date": t.end_date,
+                "share_token": str(t.share_token),
+                "version": t.version,
+                "my_role": t.my_role,
+                "member_count": t.member_count,
+                "activity_count": t.activity_count,
+                "next_day": (
+                    {"day_number": t.next_day_number, "date": t.next_day_date}
+                    if t.next_day_date else None
+                ),
+                "last_activity_at": t.last_activity_at or t.created_at,
+                "created_at": t.created_at,
+            })
+
+        return Response({"results": results, "next_cursor": next_cursor})
+
+
 class TripCreateAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -39,50 +137,92 @@ class TripDetailAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, trip_id: int):
-        trip = get_object_or_404(Trip, id=trip_id)
-        if not get_membership(request.user, trip):
+        trip, membership = resolve_trip(request, trip_id)
+        if not membership:
             return Response({"detail": "Not a trip member."}, status=403)
         return Response(TripDetailSerializer(trip).data)
 
 
+class TripChangesAPIView(APIView):
+    """
+    GET /api/trips/trips/<id>/changes/?since=<version>
+    Incremental sync for offline clients: what changed after `since`
+    (start from the `version` returned by trip detail), deletes as tombstones.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, trip_id: int):
+        trip, membership = resolve_trip(request, trip_id)
+        if not membership:
+            return Response({"detail": "Not a trip member."}, status=403)
+
+        try:
+            since = max(int(request.query_params.get("since", 0)), 0)
+        except (TypeError, ValueError):
+            return Response({"detail": "since must be an integer version."}, status=400)
+
+        return Response(build_delta(trip, since))
+
+
+def _export_response(request, trip, kind):
+    content_type, extension = EXPORT_KINDS[kind]
+    etag = export_etag(trip, kind)
+    if request.headers.get("If-None-Match") == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = StreamingHttpResponse(iter_export(trip, kind), content_type=content_type)
+        if kind == "ics":
+            response["Content-Disposition"] = f'attachment; filename="trip-{trip.id}.{extension}"'
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+class TripExportAPIView(APIView):
+    """
+    GET /api/trips/trips/<id>/export/ics/    -> calendar (.ics)
+    GET /api/trips/trips/<id>/export/print/  -> printable itinerary (HTML, print to PDF)
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, trip_id: int, kind: str):
+        if kind not in EXPORT_KINDS:
+            return Response({"detail": "Unknown export type."}, status=404)
+        trip, membership = resolve_trip(request, trip_id)
+        if not membership:
+            return Response({"detail": "Not a trip member."}, status=403)
+        return _export_response(request, trip, kind)
+
+
 class TripInviteAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, trip_id: int):
-        trip = get_object_or_404(Trip, id=trip_id)
-        membership = get_membership(request.user, trip)
+        trip, membership = resolve_trip(request, trip_id)
         if not membership or membership.role not in (TripMember.ROLE_OWNER, TripMember.ROLE_EDITOR):
             return Response({"detail": "You don't have permission to invite."}, status=403)
 
         user_ids = request.data.get("user_ids", [])
-        if not isinstance(user_ids, list) or not user_ids:
-            return Response({"detail": "user_ids must be a non-empty list."}, status=400)
-
-        # Try to use your AUTH_USER_MODEL
-        User = request.user.__class__
-
-        created = []
-        with transaction.atomic():
-            for uid in set(user_ids):
-                if uid == request.user.id:
-                    continue
-                u = User.objects.filter(id=uid).first()
-                if not u:
-                    continue
-                tm, _ = TripMember.objects.get_or_create(
-                    trip=trip, user=u,
-                    defaults={
-                        "role": TripMember.ROLE_EDITOR,  # default: editor
-                        "status": TripMember.STATUS_INVITED,
-                        "invited_by": request.user,
-                    }
-                )
-                if tm.status != TripMember.STATUS_ACCEPTED:
-                    created.append(tm)
+        emails = request.data.get("emails", [])
+        if not isinstance(user_ids, list) or not isinstance(emails, list) or not (user_ids or emails):
+            return Response({"detail": "user_ids or emails must be a non-empty list."}, status=400)
+        if len(user_ids) + len(emails) > MAX_INVITES_PER_REQUEST:
+            return Response({"detail": f"At most {MAX_INVITES_PER_REQUEST} invites per request."}, status=400)
+        try:
+            user_ids = [int(uid) for uid in user_ids]
+        except (TypeError, ValueError):
+            return Response({"detail": "user_ids must be integers."}, status=400)
+
+        invites, not_found = bulk_invite(
+            trip, request.user,
+            user_ids=user_ids,
+            emails=[e for e in emails if isinstance(e, str)],
+        )
 
         return Response({
             "share_token": str(trip.share_token),
-            "invites": TripMemberSerializer(created, many=True).data
+            "invites": TripMemberSerializer(invites, many=True).data,
+            "not_found": not_found,
         })
 
 
@@ -132,7 +272,7 @@ class TripDayAddAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, trip_id: int):
-        trip = get_object_or_404(Trip, id=trip_id)
+        trip, _ = resolve_trip(request, trip_id)
         if not CanEditTrip().has_object_permission(request, self, trip):
             return Response({"detail": "No edit permission."}, status=403)
 
@@ -168,7 +308,7 @@ class TripActivityAddAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, trip_id: int):
-        trip = get_object_or_404(Trip, id=trip_id)
+        trip, _ = resolve_trip(request, trip_id)
         if not CanEditTrip().has_object_permission(request, self, trip):
             return Response({"detail": "No edit permission."}, status=403)
 
@@ -207,11 +347,35 @@ class TripActivityAddAPIView(APIView):
         return Response(out, status=201)
 
 
+class TripItineraryBatchAPIView(APIView):
+    """
+    POST /api/trips/trips/<id>/itinerary/batch/
+    {"operations": [...]} -> create/move/reorder/delete activities in one
+    transaction; returns the new per-day ordering and trip version.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, trip_id: int):
+        trip, _ = resolve_trip(request, trip_id)
+        if not CanEditTrip().has_object_permission(request, self, trip):
+            return Response({"detail": "No edit permission."}, status=403)
+
+        serializer = ItineraryBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            result = apply_itinerary_operations(trip, serializer.validated_data["operations"], request.user)
+        except ItineraryError as e:
+            return Response({"detail": str(e), "op_index": e.op_index}, status=400)
+
+        return Response(result)
+
+
 class TripActivityUpdateAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def patch(self, request, activity_id: int):
-        activity = get_object_or_404(TripActivity, id=activity_id)
+        activity, _ = resolve_activity(request, activity_id)
         if not CanEditTrip().has_object_permission(request, self, activity):
             return Response({"detail": "No edit permission."}, status=403)
 
@@ -231,7 +395,7 @@ class TripActivityDeleteAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def delete(self, request, activity_id: int):
-        activity = get_object_or_404(TripActivity, id=activity_id)
+        activity, _ = resolve_activity(request, activity_id)
         if not CanEditTrip().has_object_permission(request, self, activity):
             return Response({"detail": "No edit permission."}, status=403)
 
@@ -239,24 +403,81 @@ class TripActivityDeleteAPIView(APIView):
         return Response(status=204)
 
 
+MESSAGE_ORDERING = ["created_at", "id"]
+MESSAGES_PAGE_SIZE = 30
+
+
 class ActivityMessagesAPIView(APIView):
+    """
+    GET /api/trips/activities/<id>/messages/?before=<cursor>|after=<cursor>&limit=30&compact=1
+    Cursor-paginated thread over (created_at, id). No cursor -> latest page.
+    compact=1 returns user ids plus one `users` map instead of nested users.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request, activity_id: int):
-        activity = get_object_or_404(TripActivity, id=activity_id)
-        if not get_membership(request.user, activity.trip):
+        activity, membership = resolve_activity(request, activity_id)
+        if not membership:
             return Response({"detail": "Not a trip member."}, status=403)
 
-        msgs = ActivityMessage.objects.filter(activity=activity).select_related("user")
-        return Response(ActivityMessageSerializer(msgs, many=True).data)
+        before = request.query_params.get("before")
+        after = request.query_params.get("after")
+        limit = get_page_size(request, default=MESSAGES_PAGE_SIZE)
+
+        qs = ActivityMessage.objects.filter(activity=activity)
+        try:
+            if after:
+                # newer than the cursor (polling for new messages), oldest first
+                qs = qs.filter(keyset_filter(MESSAGE_ORDERING, cursor_values(qs, MESSAGE_ORDERING, after))).order_by(*MESSAGE_ORDERING)
+            elif before:
+                # older than the cursor (scrolling back), fetched newest first
+                qs = qs.filter(keyset_filter(MESSAGE_ORDERING, cursor_values(qs, MESSAGE_ORDERING, before), after=False))
+                qs = qs.order_by("-created_at", "-id")
+            else:
+                # latest page
+                qs = qs.order_by("-created_at", "-id")
+        except InvalidCursor as e:
+            return Response({"detail": str(e)}, status=400)
+
+        compact = request.query_params.get("compact") in ("1", "true", "yes")
+        if compact:
+            rows = list(qs.values("id", "user_id", "user__email", "message", "created_at")[:limit + 1])
+        else:
+            rows = list(qs.select_related("user")[:limit + 1])
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if not after:
+            rows.reverse()  # threads always read oldest -> newest
+
+        if rows:
+            older_cursor = cursor_for(rows[0], MESSAGE_ORDERING)
+            newer_cursor = cursor_for(rows[-1], MESSAGE_ORDERING)
+        else:
+            older_cursor, newer_cursor = before, after
+
+        data = {
+            "has_more": has_more,
+            "older_cursor": older_cursor,  # ?before= to load older messages
+            "newer_cursor": newer_cursor,  # ?after= to poll for newer ones
+        }
+        if compact:
+            data["users"] = {r["user_id"]: {"id": r["user_id"], "email": r["user__email"]} for r in rows}
+            data["results"] = [
+                {"id": r["id"], "user": r["user_id"], "message": r["message"], "created_at": r["created_at"]}
+                for r in rows
+            ]
+        else:
+            data["results"] = ActivityMessageSerializer(rows, many=True).data
+        return Response(data)
 
 
 class ActivityMessageAddAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, activity_id: int):
-        activity = get_object_or_404(TripActivity, id=activity_id)
-        if not CanEditTrip().has_object_permission(request, self, activity.trip):
+        activity, _ = resolve_activity(request, activity_id)
+        if not CanEditTrip().has_object_permission(request, self, activity):
             return Response({"detail": "No edit permission."}, status=403)
 
         message = request.data.get("message", "").strip()
@@ -271,8 +492,8 @@ class ActivityLikeToggleAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, activity_id: int):
-        activity = get_object_or_404(TripActivity, id=activity_id)
-        if not get_membership(request.user, activity.trip):
+        activity, membership = resolve_activity(request, activity_id)
+        if not membership:
             return Response({"detail": "Not a trip member."}, status=403)
 
         obj = ActivityReaction.objects.filter(activity=activity, user=request.user).first()
@@ -287,3 +508,92 @@ class ActivityLikeToggleAPIView(APIView):
             "liked": liked,
             "likes_count": activity.reactions.count()
         })
+
+
+# -------------------------
+# Real-time push (Server-Sent Events, served by the ASGI app)
+# -------------------------
+
+STREAM_HEARTBEAT_SECONDS = 15
+
+
+def _stream_user(request):
+    """
+    JWT from the Authorization header, or ?access_token= for browser
+    EventSource clients (which can't set headers).
+    """
+    auth = JWTAuthentication()
+    try:
+        result = auth.authenticate(request)
+        if result:
+            return result[0]
+        raw = request.GET.get("access_token")
+        if raw:
+            return auth.get_user(auth.get_validated_token(raw))
+    except AuthenticationFailed:
+        pass
+    return None
+
+
+def _sse(event, data, event_id=None):
+    out = f"event: {event}\n"
+    if event_id is not None:
+        out += f"id: {event_id}\n"
+    return out + f"data: {json.dumps(data)}\n\n"
+
+
+async def _trip_event_stream(user, trip):
+    # registered here, not in the view, so the finally below always runs for it
+    listener = get_hub().listen(trip.id)
+    try:
+        # read after listening: changes past this version reach the listener
+        version = await Trip.objects.filter(id=trip.id).values_list("version", flat=True).afirst()
+        yield "retry: 3000\n\n"
+        yield _sse("ready", {"trip_id": trip.id, "version": version}, version)
+
+        while True:
+            event = await listener.next(STREAM_HEARTBEAT_SECONDS)
+            if listener.overflowed:
+                # client fell behind; it catches up through /changes/
+                listener.overflowed = False
+                yield _sse("resync", {"trip_id": trip.id})
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+
+            if any(c["entity"] == "member" for c in event["changes"]):
+                if not await sync_to_async(get_membership)(user, trip.id):
+                    yield _sse("revoked", {"trip_id": trip.id})
+                    return
+
+            yield _sse("changes", event, event["version"])
+    finally:
+        listener.close()
+
+
+class TripEventStreamView(View):
+    """
+    GET /api/trips/trips/<id>/events/
+    text/event-stream of change-log batches (activities, messages, reactions,
+    days, members) for accepted members; fetch the data via /changes/?since=.
+    Needs the ASGI app (core.asgi) - under WSGI every open stream holds a worker.
+    """
+
+    async def get(self, request, trip_id: int):
+        user = await sync_to_async(_stream_user)(request)
+        if not user:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+        trip = await Trip.objects.filter(id=trip_id).afirst()
+        if not trip:
+            return JsonResponse({"detail": "Not found."}, status=404)
+        if not await sync_to_async(get_membership)(user, trip.id):
+            return JsonResponse({"detail": "Not a trip member."}, status=403)
+
+        response = StreamingHttpResponse(
+            _trip_event_stream(user, trip),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response